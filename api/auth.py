@@ -1,5 +1,6 @@
 # Python
-import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Union
 
@@ -14,45 +15,98 @@ from passlib.context import CryptContext
 # JWT
 from jose import jwt, JWTError
 
+# cache
+from cache import TTLCache
+
+# config
+from config import settings
+
 # db
-from db.mongo_client import db_client
+from db.client import db_client
 
 # models
-from db.models.user import UserIn
 from db.models.token import TokenData
 
 
-JWT_SECRETKEY = os.getenv("JWT_SECRETKEY")
+JWT_SECRETKEY = settings.jwt_secretkey
 ALGORITHM = "HS256"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# token subject -> UserDB, saves one DB round trip per authenticated request
+user_cache = TTLCache(
+    maxsize = settings.user_cache_size,
+    ttl = settings.user_cache_ttl
+)
+
 pwd_context = CryptContext(
     schemes = ["bcrypt"],
-    deprecated = "auto"
+    deprecated = "auto",
+    bcrypt__rounds = settings.bcrypt_rounds
     )
 
+# bcrypt releases the GIL, so a thread pool keeps hashing off the event loop
+password_pool = ThreadPoolExecutor(
+    max_workers = settings.password_workers,
+    thread_name_prefix = "password"
+)
+password_jobs = 0
+
+
+async def run_password_job(func, *args):
+    """
+    Runs a bcrypt call in password_pool. When the workers and the queue are
+    full the request is rejected at once instead of waiting behind the burst.
+    """
+    global password_jobs
+    if password_jobs >= settings.password_workers + settings.password_queue_depth:
+        raise HTTPException(
+            status_code = status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers = {"Retry-After": "1"},
+            detail = {
+                "errmsg": "Too many password operations, try again later"
+            }
+        )
+    
+    password_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            password_pool, func, *args
+        )
+    finally:
+        password_jobs -= 1
 
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str):
+    return await run_password_job(pwd_context.verify, plain_password, hashed_password)
 
-def get_password_hash(password: str):
-    return pwd_context.hash(password)
+async def get_password_hash(password: str):
+    return await run_password_job(pwd_context.hash, password)
 
-def authenticate_user(username: str, password: str):
-    if not db_client.exist_user(username):
+async def authenticate_user(username: str, password: str):
+    user = await db_client.get_user_with_password(username)
+    if not user:
         return False
     
-    user = db_client.users_mongo_db.find_one({"username": username})
-    user = UserIn(**user)
-    
-    if not verify_password(password, user.password):
+    valid, new_hash = await run_password_job(
+        pwd_context.verify_and_update, password, user.password
+    )
+    if not valid:
         return False
     
+    # the bcrypt cost changed since the hash was made
+    if new_hash:
+        await db_client.get_user_with_username_and_update(
+            username = username,
+            updates = [{"password": new_hash}]
+        )
+    
     del user.password
 
     return user
 
+def invalidate_user(username: str) -> None:
+    user_cache.pop(username)
+
 def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None):
     to_encode = data.copy()
 
@@ -67,7 +121,6 @@ def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None
 
 
 async def get_current_user(token = Depends(oauth2_scheme)):
-    print("En get_current_user")
     credentials_exception = HTTPException(
         status_code = status.HTTP_400_BAD_REQUEST,
         headers = {"WWW-Authenticate": "Bearer"},
@@ -79,7 +132,6 @@ async def get_current_user(token = Depends(oauth2_scheme)):
     try:
         payload = jwt.decode(token, JWT_SECRETKEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
-        print(username)
         if username is None:
             raise credentials_exception
         
@@ -91,13 +143,17 @@ async def get_current_user(token = Depends(oauth2_scheme)):
     # if not db_client.exist_user(token_data.username):
     #     raise credentials_exception
     
-    user = db_client.get_user_with_username(
-        username = token_data.username,
-        full_user = True
-    )
+    user = user_cache.get(token_data.username)
+    if user is None:
+        user = await db_client.get_user_with_username(
+            username = token_data.username,
+            full_user = True
+        )
 
-    if not user:
-        raise credentials_exception
+        if not user:
+            raise credentials_exception
+        
+        user_cache.set(token_data.username, user)
     
     if user.disabled:
         raise HTTPException(
@@ -1,9 +1,77 @@
+import os
+import tempfile
+from typing import Optional
+
 from pydantic import BaseSettings
 
 class Settings(BaseSettings):
     app_name: str = "Super Control"
     jwt_secretkey: str
 
+    # db
+    db_backend: str = "mongo" # mongo | deta | memory
+    db_test: bool = False
+    mongo_url: Optional[str] = None
+    db_mongo_user: Optional[str] = None
+    db_mongo_passw: Optional[str] = None
+    deta_project_key: Optional[str] = None
+    page_size: int = 50
+    page_max_size: int = 500
+
+    # e-ticket fetching
+    fetch_connect_timeout: float = 5.0
+    fetch_read_timeout: float = 10.0
+    fetch_max_bytes: int = 2_000_000
+    fetch_max_connections: int = 20
+    fetch_retries: int = 2
+    fetch_backoff: float = 0.5
+    fetch_per_host_limit: int = 4
+    parse_workers: int = 2
+    bulk_max_tickets: int = 100
+    ticket_cache_size: int = 1024
+    ticket_cache_fresh: float = 600 # seconds served without revalidation
+    ticket_cache_ttl: float = 86400
+
+    # price history analytics
+    price_history_cache_size: int = 256
+    price_history_cache_ttl: float = 300
+
+    # receipt OCR
+    ocr_workers: int = os.cpu_count() or 1
+    ocr_queue_depth: int = 8
+    ocr_max_bytes: int = 10_000_000
+    ocr_max_width: int = 1600 # pixels, wider photos are downscaled
+    ocr_lang: Optional[str] = None # tesseract languages, e.g. "spa+eng"
+    ocr_cache_path: str = os.path.join(tempfile.gettempdir(), "super-control-ocr.sqlite3")
+    ocr_cache_max_bytes: int = 50_000_000 # stored texts
+
+    # background jobs
+    job_queue_path: str = os.path.join(tempfile.gettempdir(), "super-control-jobs.sqlite3")
+    job_workers: int = 4 # per app process
+    job_poll_interval: float = 1.0 # seconds, for jobs enqueued by other processes
+    job_retention: int = 86400 # seconds finished jobs are kept
+    event_queue_size: int = 100 # job events buffered per WebSocket connection
+
+    # rate limiting, token buckets per user (JWT sub) or client IP
+    rate_limit_enabled: bool = True
+    rate_limit_rate: float = 10 # tokens per second, routes without a budget
+    rate_limit_burst: int = 20
+    rate_limit_exempt: set[str] = {"/metrics", "/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json"}
+    rate_limit_budgets: dict[str, tuple[float, int]] = {
+        "POST /login/token": (10 / 60, 10), # bcrypt
+        "POST /users/signup": (5 / 60, 5), # bcrypt
+        "GET /users": (1, 30)
+    }
+    rate_limit_max_clients: int = 100_000
+    rate_limit_trust_forwarded: bool = False # behind a proxy that sets X-Forwarded-For
+
+    # auth
+    user_cache_size: int = 10_000
+    user_cache_ttl: float = 30
+    bcrypt_rounds: int = 12
+    password_workers: int = 4
+    password_queue_depth: int = 32
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,91 @@
+# Python
+import asyncio
+import os
+import sys
+import tempfile
+
+# pytest
+import pytest
+
+os.environ.setdefault("JWT_SECRETKEY", "test")
+# the API tests run on the in-process backend, no database server needed
+os.environ.setdefault("DB_BACKEND", "memory")
+_state = tempfile.mkdtemp(prefix="super-control-tests-")
+os.environ.setdefault("JOB_QUEUE_PATH", os.path.join(_state, "jobs.sqlite3"))
+os.environ.setdefault("OCR_CACHE_PATH", os.path.join(_state, "ocr.sqlite3"))
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark", action="store_true", default=False, help="run the benchmarks too"
+    )
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: timing test, skipped unless pytest runs with --benchmark"
+    )
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+
+    skip = pytest.mark.skip(reason="benchmark, run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+class APIClient:
+    """
+    TestClient of the app on a fresh MemoryDB, with helpers to create users.
+    """
+
+    def __init__(self, client, db) -> None:
+        self.client = client
+        self.db = db
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def create_user(self, username: str = "ironman", password: str = "not a bcrypt hash") -> dict:
+        """
+        Inserts the user straight into the db, skipping signup and its bcrypt
+        cost, and returns the headers to authenticate as it.
+        """
+        from auth import create_access_token
+
+        asyncio.run(
+            self.db.insert_user({
+                "username": username,
+                "name": "Anthony",
+                "lastname": "Stark",
+                "email": f"{username}@starkindustries.com",
+                "birth_date": "2000-12-25",
+                "password": password
+            })
+        )
+
+        return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import auth
+    import price_history
+    from db.client import db_client
+    from db.memory_db import MemoryDB
+    from main import app
+
+    db = MemoryDB()
+    for module in list(sys.modules.values()):
+        if getattr(module, "db_client", None) is db_client:
+            monkeypatch.setattr(module, "db_client", db)
+    auth.user_cache.clear()
+    price_history.price_histories.clear()
+    # rebuilt on the next request: fresh rate limit buckets
+    app.middleware_stack = None
+
+    with TestClient(app) as client:
+        yield APIClient(client, db)
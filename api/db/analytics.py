@@ -0,0 +1,106 @@
+# Python
+from datetime import date
+
+# typing
+from typing import Iterable, Optional
+
+# models
+from .models.analytics import ProductMetrics
+
+
+def product_metrics_pipeline(
+    username: str,
+    start: date,
+    end: date,
+    product_id: Optional[int] = None,
+    limit: int = 20
+) -> list[dict]:
+    """
+    Aggregation over the 'super_rollups' collection (see db.rollups) that returns
+    one ProductMetrics document per product bought by the user between start and
+    end, sorted by total spend, with the product_id instead of the description.
+    It reads one document per product and day, so its cost does not grow with
+    the number of tickets in the period.
+    """
+    match = {
+        "username": username,
+        "day": {"$gte": str(start), "$lte": str(end)},
+        "count": {"$gt": 0}
+    }
+    if product_id is not None:
+        match["product_id"] = product_id
+
+    return [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": "$product_id",
+                "quantity": {"$sum": "$units"},
+                "total_spend": {"$sum": "$spend"},
+                "purchases": {"$sum": "$count"},
+                "min_price": {"$min": "$min_price"},
+                "max_price": {"$max": "$max_price"}
+            }
+        },
+        {"$sort": {"total_spend": -1, "_id": 1}},
+        {"$limit": limit},
+        {
+            "$project": {
+                "_id": 0,
+                "product_id": "$_id",
+                "quantity": 1,
+                "total_spend": 1,
+                "purchases": 1,
+                "min_price": 1,
+                "max_price": 1,
+                "average_price": {
+                    "$cond": [
+                        {"$gt": ["$quantity", 0]},
+                        {"$divide": ["$total_spend", "$quantity"]},
+                        0
+                    ]
+                }
+            }
+        }
+    ]
+
+def product_metrics_from_lists(
+    super_lists: Iterable[dict],
+    start: date,
+    end: date,
+    product_description: Optional[str] = None,
+    limit: int = 20
+) -> list[ProductMetrics]:
+    """
+    Same metrics as product_metrics_pipeline, keyed by description and computed
+    in process from the super lists, for the backends without rollups.
+    """
+    metrics: dict[str, ProductMetrics] = {}
+    for super_list in super_lists:
+        if not str(start) <= str(super_list["issue_date"]) <= str(end):
+            continue
+
+        for product in super_list["products"]:
+            description = product["description"]
+            if product_description and description != product_description:
+                continue
+
+            product_metrics = metrics.setdefault(
+                description, ProductMetrics(description=description)
+            )
+            product_metrics.quantity += product["units"]
+            product_metrics.total_spend += product["units"] * product["price"]
+            product_metrics.purchases += 1
+            if product_metrics.min_price is None or product["price"] < product_metrics.min_price:
+                product_metrics.min_price = product["price"]
+            if product_metrics.max_price is None or product["price"] > product_metrics.max_price:
+                product_metrics.max_price = product["price"]
+
+    for product_metrics in metrics.values():
+        if product_metrics.quantity:
+            product_metrics.average_price = product_metrics.total_spend / product_metrics.quantity
+
+    return sorted(
+        metrics.values(),
+        key = lambda product_metrics: (-product_metrics.total_spend, product_metrics.description)
+    )[:limit]
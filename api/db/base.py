@@ -0,0 +1,253 @@
+# Python
+from abc import ABC, abstractmethod
+from datetime import date
+
+# typing
+from typing import AsyncIterator, Optional, Union
+
+# FastAPI
+from fastapi import HTTPException, status
+
+# db
+from .analytics import product_metrics_from_lists
+
+# models
+from .models.analytics import ProductMetrics
+from .models.user import User, UserDB, UserIn
+from .models.supermarket_list import SuperList
+from .models.page import Page
+
+
+def db_error(message: str, err: Exception) -> HTTPException:
+    return HTTPException(
+        status_code = status.HTTP_409_CONFLICT,
+        detail = {
+            "errmsg": message,
+            "errdetail": str(err)
+        }
+    )
+
+def merge_updates(updates: list[dict]) -> dict:
+    merged = {}
+    for update in updates:
+        merged.update(update)
+
+    return merged
+
+
+class Database(ABC):
+    """
+    Storage interface used by the routers.
+
+    Every backend (MongoDB, Deta Base, in-memory) implements these coroutines with the
+    same inputs, outputs and HTTPException errors, so the backend can be swapped
+    with the DB_BACKEND setting without touching the path operations.
+    """
+
+    async def setup(self) -> None:
+        """
+        Prepares the backend when the app starts (indexes, tables...).
+        """
+
+    # USERS #
+    @abstractmethod
+    async def get_available_users(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[list[str]] = None
+    ) -> Page:
+        """
+        Returns a page of the users that are not disabled, sorted by username.
+        fields restricts the returned User fields.
+        """
+
+    @abstractmethod
+    async def get_user_with_username(
+        self,
+        username: str,
+        full_user: bool = False
+    ) -> Union[User, UserDB]:
+        """
+        Returns the user with the specified username as a User, or as a UserDB
+        if full_user is True.
+        """
+
+    @abstractmethod
+    async def get_user_with_password(
+        self,
+        username: str
+    ) -> Optional[UserIn]:
+        """
+        Returns the user with the specified username including the password hash,
+        or None if the user does not exist.
+        """
+
+    @abstractmethod
+    async def get_user_with_username_and_update(
+        self,
+        username: str,
+        updates: list[dict]
+    ) -> User:
+        """
+        Applies the updates to the user and returns the updated user.
+        """
+
+    @abstractmethod
+    async def exist_user(
+        self,
+        username: str
+    ) -> bool:
+        """
+        Returns True if a user with the specified username exists.
+        """
+
+    @abstractmethod
+    async def insert_user(
+        self,
+        data: dict
+    ) -> User:
+        """
+        Inserts a new user and returns it. Raises a 409 HTTPException with
+        "Username exists" if the username is taken.
+        """
+
+    # SUPER LISTS #
+    @abstractmethod
+    async def get_available_superlist_for_user(
+        self,
+        username: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[list[str]] = None
+    ) -> Page:
+        """
+        Returns a page of the supermarket lists of the user that are not disabled,
+        newest first. fields restricts the returned SuperList fields.
+        """
+
+    async def iter_superlists_for_user(
+        self,
+        username: str,
+        fields: Optional[list[str]] = None
+    ) -> AsyncIterator[dict]:
+        """
+        Yields every available supermarket list of the user, newest first, without
+        loading the whole history in memory.
+
+        This fallback walks the pages of get_available_superlist_for_user;
+        backends with server side cursors override it.
+        """
+        cursor = None
+        while True:
+            page = await self.get_available_superlist_for_user(
+                username = username,
+                limit = 500,
+                cursor = cursor,
+                fields = fields
+            )
+            for super_list in page.items:
+                yield super_list
+
+            cursor = page.next_cursor
+            if not cursor:
+                break
+
+    @abstractmethod
+    async def get_superlist_with_orderid(
+        self,
+        username: str,
+        order_id: str
+    ) -> SuperList:
+        """
+        Returns the supermarket list of the user with the specified order ID.
+        """
+
+    @abstractmethod
+    async def get_superlist_with_orderid_and_update(
+        self,
+        username: str,
+        order_id: str,
+        updates: list[dict]
+    ) -> SuperList:
+        """
+        Applies the updates to the supermarket list and returns the updated list.
+        """
+
+    @abstractmethod
+    async def exist_superlist(
+        self,
+        username: str,
+        order_id: str
+    ) -> bool:
+        """
+        Returns True if the user has an available supermarket list with the order ID.
+        """
+
+    @abstractmethod
+    async def insert_superlist(
+        self,
+        data: SuperList
+    ) -> SuperList:
+        """
+        Inserts a new supermarket list and returns it. Raises a 400 HTTPException
+        with "Order exists" if the user has an available list with the same order.
+        """
+
+    async def insert_superlists(
+        self,
+        data: list[SuperList]
+    ) -> list[Optional[str]]:
+        """
+        Inserts many supermarket lists. Returns, in the same order, None for each
+        inserted list or the error message of the ones that were not inserted.
+
+        Backends with a bulk write override this one-by-one fallback.
+        """
+        errors = []
+        for super_list in data:
+            try:
+                await self.insert_superlist(super_list)
+                errors.append(None)
+            except HTTPException as err:
+                errors.append(err.detail["errmsg"])
+
+        return errors
+
+    async def product_metrics(
+        self,
+        username: str,
+        start: date,
+        end: date,
+        product_description: Optional[str] = None,
+        limit: int = 20
+    ) -> list[ProductMetrics]:
+        """
+        Returns quantity, total spend, average price and purchases per product
+        bought by the user between start and end (both included), sorted by total
+        spend. product_description restricts the result to one product.
+
+        This fallback reads the history in process; MongoDB runs it as a pipeline.
+        """
+        return product_metrics_from_lists(
+            super_lists = [
+                super_list async for super_list in self.iter_superlists_for_user(username)
+            ],
+            start = start,
+            end = end,
+            product_description = product_description,
+            limit = limit
+        )
+
+    @abstractmethod
+    async def count_superlists_with_product(
+        self,
+        username: str,
+        product_description: str,
+        start: date,
+        end: date
+    ) -> int:
+        """
+        Returns how many supermarket lists of the user between start and end
+        (both included) contain the product.
+        """
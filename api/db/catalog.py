@@ -0,0 +1,203 @@
+"""
+Product catalog: normalized product descriptions <-> compact integer IDs.
+
+MongoDB stores the products of a super list as {product_id, units, price} and
+the descriptions once, in the 'products' collection ({_id: product_id,
+description}). IDs are allocated in blocks from the 'counters' collection and
+never change, so every mapping the process has seen is kept in memory and most
+encodes and decodes cost no round trip.
+
+Convert the super lists stored with descriptions, then rebuild the rollups:
+    python -m db.catalog migrate
+    python -m db.rollups rebuild
+"""
+# Python
+import asyncio
+import sys
+
+# typing
+from typing import Iterable
+
+# pymongo
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+# models
+from .models.supermarket_list import normalize_description
+
+
+class ProductCatalog:
+    """
+    Interning cache in front of the 'products' collection of a motor database.
+    Descriptions passed in must already be normalized (see normalize_description).
+    """
+
+    def __init__(self, database) -> None:
+        self.products = database.products
+        self.counters = database.counters
+        self._ids: dict[str, int] = {}
+        self._descriptions: dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _remember(self, product: dict) -> None:
+        self._ids[product["description"]] = product["_id"]
+        self._descriptions[product["_id"]] = product["description"]
+
+    async def _load(self, query: dict) -> None:
+        async for product in self.products.find(query):
+            self._remember(product)
+
+    async def ids(self, descriptions: Iterable[str], create: bool = True) -> dict[str, int]:
+        """
+        Returns description -> product ID. Unknown descriptions get a new ID when
+        create is True, and are left out of the result otherwise.
+        """
+        descriptions = set(descriptions)
+        missing = [description for description in descriptions if description not in self._ids]
+        if missing:
+            await self._load({"description": {"$in": missing}})
+            missing = [description for description in missing if description not in self._ids]
+
+        if missing and create:
+            counter = await self.counters.find_one_and_update(
+                {"_id": "products"},
+                {"$inc": {"seq": len(missing)}},
+                upsert = True,
+                return_document = ReturnDocument.AFTER
+            )
+            first = counter["seq"] - len(missing) + 1
+            new_products = [
+                {"_id": first + offset, "description": description}
+                for offset, description in enumerate(missing)
+            ]
+            try:
+                await self.products.insert_many(new_products, ordered=False)
+                taken = []
+            except BulkWriteError as err:
+                # interned concurrently by another process: keep its ID
+                taken = [
+                    new_products[write_error["index"]]["description"]
+                    for write_error in err.details["writeErrors"]
+                ]
+
+            for product in new_products:
+                if product["description"] not in taken:
+                    self._remember(product)
+            if taken:
+                await self._load({"description": {"$in": taken}})
+
+        return {
+            description: self._ids[description]
+            for description in descriptions
+            if description in self._ids
+        }
+
+    async def descriptions(self, product_ids: Iterable[int]) -> dict[int, str]:
+        product_ids = set(product_ids)
+        missing = [product_id for product_id in product_ids if product_id not in self._descriptions]
+        if missing:
+            await self._load({"_id": {"$in": missing}})
+
+        return {
+            product_id: self._descriptions[product_id]
+            for product_id in product_ids
+            if product_id in self._descriptions
+        }
+
+    async def encode(self, super_lists: list[dict]) -> list[dict]:
+        """
+        Replaces, in place, the description of the products of the super lists
+        with their product_id, with at most one lookup for all of them.
+        """
+        ids = await self.ids(
+            product["description"]
+            for super_list in super_lists
+            for product in super_list.get("products") or []
+            if "description" in product
+        )
+        for super_list in super_lists:
+            for product in super_list.get("products") or []:
+                if "description" in product:
+                    product["product_id"] = ids[product.pop("description")]
+
+        return super_lists
+
+    async def decode(self, super_lists: list[dict]) -> list[dict]:
+        """
+        The inverse of encode: puts back the description of the products.
+        """
+        descriptions = await self.descriptions(
+            product["product_id"]
+            for super_list in super_lists
+            for product in super_list.get("products") or []
+            if "product_id" in product
+        )
+        for super_list in super_lists:
+            for product in super_list.get("products") or []:
+                if "product_id" in product:
+                    product["description"] = descriptions.get(product.pop("product_id"), "")
+
+        return super_lists
+
+
+async def migrate(database, batch_size: int = 500) -> int:
+    """
+    Encodes the super lists whose products are still stored with descriptions.
+    Returns the number of converted super lists.
+    """
+    catalog = ProductCatalog(database)
+    converted = 0
+    batch = []
+    async for super_list in database.super_list.find(
+        {"products.description": {"$exists": True}},
+        {"products": 1}
+    ):
+        for product in super_list["products"]:
+            if "description" in product:
+                product["description"] = normalize_description(product["description"])
+        batch.append(super_list)
+
+        if len(batch) == batch_size:
+            converted += await _save_encoded(database, catalog, batch)
+            batch = []
+
+    if batch:
+        converted += await _save_encoded(database, catalog, batch)
+
+    return converted
+
+async def _save_encoded(database, catalog: ProductCatalog, batch: list[dict]) -> int:
+    await catalog.encode(batch)
+    result = await database.super_list.bulk_write(
+        [
+            UpdateOne({"_id": super_list["_id"]}, {"$set": {"products": super_list["products"]}})
+            for super_list in batch
+        ],
+        ordered = False
+    )
+
+    return result.modified_count
+
+
+async def main(args: list[str]) -> None:
+    # config
+    from config import settings
+
+    # db
+    from db.client import get_db_client
+
+    db_client = get_db_client(settings)
+    if not hasattr(db_client, "database"):
+        sys.exit(f"The product catalog is only stored in MongoDB, not {settings.db_backend}")
+
+    command = args[0] if args else "migrate"
+    if command == "migrate":
+        print(f"{await migrate(db_client.database)} super lists converted")
+    else:
+        sys.exit(f"Unknown command: {command}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
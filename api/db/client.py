@@ -0,0 +1,42 @@
+# config
+from config import Settings, settings
+
+# db
+from .base import Database
+
+
+def get_db_client(settings: Settings) -> Database:
+    """
+    Builds the storage backend selected by settings.db_backend.
+
+    The backend modules are imported lazily, so the memory backend runs
+    without the Motor or Deta packages being reachable.
+    """
+    if settings.db_backend == "mongo":
+        from .mongo_client import MongoDB
+        from metrics import MongoCommandMetrics
+
+        url = settings.mongo_url or (
+            f"mongodb+srv://{settings.db_mongo_user}:{settings.db_mongo_passw}"
+            "@main.utvbo6g.mongodb.net/?retryWrites=true&w=majority"
+        )
+        return MongoDB(
+            url = url,
+            test = settings.db_test,
+            event_listeners = [MongoCommandMetrics()]
+        )
+
+    if settings.db_backend == "deta":
+        from .deta_db import DetaDB
+
+        return DetaDB(project_key=settings.deta_project_key, test=settings.db_test)
+
+    if settings.db_backend == "memory":
+        from .memory_db import MemoryDB
+
+        return MemoryDB()
+
+    raise ValueError(f"Unknown db backend: {settings.db_backend}")
+
+
+db_client = get_db_client(settings)
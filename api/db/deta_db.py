@@ -1,11 +1,305 @@
-import os
+# Python
+from datetime import date
+
+# typing
+from typing import Optional, Union
+
+# FastAPI
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+
+# Deta
 from deta import Deta
 
-deta = Deta(os.getenv("DETA_PROJECT_KEY"))
+# db
+from .base import Database, db_error, merge_updates
+from .pagination import paginate
+
+# serializers
+from .serializers.super_list import super_list_serializer
+from .serializers.user import user_db_serializer, user_in_serializer, user_serializer
+
+# models
+from .models.user import User, UserDB, UserIn
+from .models.supermarket_list import SuperList
+from .models.page import Page
+
+
+def fetch_all(base, query: dict) -> list[dict]:
+    response = base.fetch(query)
+    items = response.items
+    while response.last:
+        response = base.fetch(query, last=response.last)
+        items += response.items
+
+    return items
+
+def superlist_key(username: str, order_id: str) -> str:
+    return f"{username}:{order_id}"
+
+
+class DetaDB(Database):
+    """
+    Deta Base storage backend.
+
+    Users are keyed by username and supermarket lists by "username:order".
+    The Deta SDK is synchronous, so every call runs in the threadpool to keep
+    the event loop free.
+    """
+
+    def __init__(self, project_key: str, test: bool = False) -> None:
+        deta = Deta(project_key)
+        prefix = "test_" if test else ""
+
+        self.db_users = deta.Base(f"{prefix}users")
+        self.db_super = deta.Base(f"{prefix}super_lists")
+
+    # USERS #
+    async def get_available_users(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[list[str]] = None
+    ) -> Page:
+        try:
+            users = await run_in_threadpool(
+                fetch_all, self.db_users, {"disabled": False}
+            )
+        except Exception as err:
+            raise db_error("DB error: users not found", err)
+
+        return paginate(
+            docs = [user_serializer(user).dict() for user in users],
+            sort_key = lambda user: [user["username"]],
+            limit = limit,
+            cursor = cursor,
+            fields = fields
+        )
+
+    async def get_user_with_username(
+        self,
+        username: str,
+        full_user: bool = False
+    ) -> Union[User, UserDB]:
+        try:
+            user = await run_in_threadpool(self.db_users.get, username)
+            if full_user:
+                user = user_db_serializer(user)
+            else:
+                user = user_serializer(user)
+        except Exception as err:
+            raise db_error("DB error: user not found", err)
+
+        return user
+
+    async def get_user_with_password(
+        self,
+        username: str
+    ) -> Optional[UserIn]:
+        try:
+            user = await run_in_threadpool(self.db_users.get, username)
+        except Exception as err:
+            raise db_error("DB error: user not found", err)
+
+        if not user:
+            return None
+
+        return user_in_serializer(user)
+
+    async def get_user_with_username_and_update(
+        self,
+        username: str,
+        updates: list[dict]
+    ) -> User:
+        try:
+            await run_in_threadpool(
+                self.db_users.update,
+                jsonable_encoder(merge_updates(updates)),
+                username
+            )
+            user_updated = await self.get_user_with_username(username)
+        except Exception as err:
+            raise db_error("DB error: user not updated", err)
+
+        return user_updated
+
+    async def exist_user(
+        self,
+        username: str
+    ) -> bool:
+        try:
+            user = await run_in_threadpool(self.db_users.get, username)
+        except:
+            return False
+
+        return bool(user)
+
+    async def insert_user(
+        self,
+        data: dict
+    ) -> User:
+        # Deta Base has no unique indexes
+        if await self.exist_user(data.get("username")):
+            raise HTTPException(
+                status_code = status.HTTP_409_CONFLICT,
+                detail = {
+                    "errmsg": "Username exists"
+                }
+            )
+
+        try:
+            user = UserIn(**data)
+            await run_in_threadpool(
+                self.db_users.insert, jsonable_encoder(user), user.username
+            )
+        except Exception as err:
+            raise db_error("DB error: user not inserted", err)
+
+        return User(**user.dict())
+
+    # SUPER LISTS #
+    async def get_available_superlist_for_user(
+        self,
+        username: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[list[str]] = None
+    ) -> Page:
+        try:
+            super_lists = await run_in_threadpool(
+                fetch_all,
+                self.db_super,
+                {"username": username, "disabled": False}
+            )
+        except Exception as err:
+            raise db_error("DB error: super lists not found", err)
+
+        for super_list in super_lists:
+            del super_list["key"]
+
+        return paginate(
+            docs = super_lists,
+            sort_key = lambda super_list: [super_list["issue_date"], super_list["order"]],
+            limit = limit,
+            cursor = cursor,
+            fields = fields,
+            descending = True
+        )
+
+    async def get_superlist_with_orderid(
+        self,
+        username: str,
+        order_id: str
+    ) -> SuperList:
+        try:
+            super_list = await run_in_threadpool(
+                self.db_super.get, superlist_key(username, order_id)
+            )
+            super_list = super_list_serializer(super_list)
+        except Exception as err:
+            raise db_error("DB error: super lists not found", err)
+
+        if super_list.disabled:
+            raise HTTPException(
+                status_code = status.HTTP_400_BAD_REQUEST,
+                detail = {
+                    "errmsg": "Supermarket list was deleted"
+                }
+            )
+
+        return super_list
+
+    async def get_superlist_with_orderid_and_update(
+        self,
+        username: str,
+        order_id: str,
+        updates: list[dict]
+    ) -> SuperList:
+        if not await self.exist_superlist(username=username, order_id=order_id):
+            raise HTTPException(
+                status_code = status.HTTP_400_BAD_REQUEST,
+                detail = {
+                    "errmsg": "Supermarket list does not exist"
+                }
+            )
+
+        try:
+            key = superlist_key(username, order_id)
+            await run_in_threadpool(
+                self.db_super.update,
+                jsonable_encoder(merge_updates(updates)),
+                key
+            )
+            super_list_updated = SuperList(
+                **await run_in_threadpool(self.db_super.get, key)
+            )
+        except Exception as err:
+            raise db_error("DB error: supermarket list not updated", err)
+
+        return super_list_updated
+
+    async def exist_superlist(
+        self,
+        username: str,
+        order_id: str
+    ) -> bool:
+        try:
+            super_list = await run_in_threadpool(
+                self.db_super.get, superlist_key(username, order_id)
+            )
+        except:
+            return False
+
+        return bool(super_list) and not super_list["disabled"]
+
+    async def insert_superlist(
+        self,
+        data: SuperList
+    ) -> SuperList:
+        if await self.exist_superlist(username=data.username, order_id=data.order):
+            raise HTTPException(
+                status_code = status.HTTP_400_BAD_REQUEST,
+                detail = {
+                    "errmsg": "Order exists"
+                }
+            )
+
+        try:
+            await run_in_threadpool(
+                self.db_super.put,
+                jsonable_encoder(data),
+                superlist_key(data.username, data.order)
+            )
+        except Exception as err:
+            raise db_error("DB error: super list not inserted", err)
+
+        return data
 
-# BASE #
-db_users = deta.Base("users")
-db_super = deta.Base("super_lists")
+    async def count_superlists_with_product(
+        self,
+        username: str,
+        product_description: str,
+        start: date,
+        end: date
+    ) -> int:
+        try:
+            super_lists = await run_in_threadpool(
+                fetch_all,
+                self.db_super,
+                {
+                    "username": username,
+                    "disabled": False,
+                    "issue_date?r": [str(start), str(end)]
+                }
+            )
+        except Exception as err:
+            raise db_error("DB error: super lists not found", err)
 
-# DRIVE #
-drive_super_lists = deta.Drive("super_lists")
\ No newline at end of file
+        return sum(
+            1 for super_list in super_lists
+            if any(
+                product["description"] == product_description
+                for product in super_list["products"]
+            )
+        )
@@ -0,0 +1,186 @@
+"""
+Declarative MongoDB indexes.
+
+Apply them (idempotent, also done at app startup):
+    python -m db.indexes apply
+
+Print the winning plan of every query the MongoDB class issues:
+    python -m db.indexes explain [username]
+"""
+# Python
+import asyncio
+import sys
+from datetime import date, timedelta
+
+# pymongo
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# db
+from .analytics import product_metrics_pipeline
+
+
+INDEXES: dict[str, list[IndexModel]] = {
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True)
+    ],
+    # product catalog, see db.catalog
+    "products": [
+        IndexModel([("description", ASCENDING)], unique=True)
+    ],
+    "super_list": [
+        IndexModel(
+            [("username", ASCENDING), ("order", ASCENDING)],
+            unique = True,
+            partialFilterExpression = {"disabled": False}
+        ),
+        # keyset pagination, newest first
+        IndexModel(
+            [("username", ASCENDING), ("issue_date", DESCENDING), ("_id", DESCENDING)]
+        ),
+        # multikey: one entry per product of the list
+        IndexModel(
+            [
+                ("username", ASCENDING),
+                ("products.product_id", ASCENDING),
+                ("issue_date", ASCENDING)
+            ]
+        )
+    ],
+    # one document per user, product and day, see db.rollups
+    "super_rollups": [
+        IndexModel(
+            [("username", ASCENDING), ("product_id", ASCENDING), ("day", ASCENDING)],
+            unique = True
+        ),
+        IndexModel([("username", ASCENDING), ("day", ASCENDING)])
+    ]
+}
+
+
+def sample_queries(username: str) -> dict[str, dict]:
+    """
+    The queries issued by the MongoDB class, with sample values, as
+    method name -> command to explain.
+    """
+    today = date.today()
+
+    return {
+        "get_available_users": {
+            "find": "users",
+            "filter": {"disabled": False, "username": {"$gt": username}},
+            "sort": {"username": 1},
+            "limit": 51
+        },
+        "get_user_with_username": {
+            "find": "users",
+            "filter": {"username": username}
+        },
+        "get_available_superlist_for_user": {
+            "find": "super_list",
+            "filter": {
+                "username": username,
+                "disabled": False,
+                "issue_date": {"$lt": str(today)}
+            },
+            "sort": {"issue_date": -1, "_id": -1},
+            "limit": 51
+        },
+        "get_superlist_with_orderid": {
+            "find": "super_list",
+            "filter": {"username": username, "order": "0001", "disabled": False}
+        },
+        "get_superlist_with_orderid_and_update": {
+            "find": "super_list",
+            "filter": {"username": username, "order": "0001", "disabled": False}
+        },
+        "product_metrics": {
+            "aggregate": "super_rollups",
+            "pipeline": product_metrics_pipeline(
+                username = username,
+                start = today - timedelta(days=30),
+                end = today,
+                product_id = 1
+            ),
+            "cursor": {}
+        },
+        "count_superlists_with_product": {
+            "count": "super_list",
+            "query": {
+                "username": username,
+                "disabled": False,
+                "products.product_id": 1,
+                "issue_date": {
+                    "$gte": str(today - timedelta(days=30)),
+                    "$lte": str(today)
+                }
+            }
+        }
+    }
+
+
+async def apply_indexes(database) -> dict[str, list[str]]:
+    """
+    Creates every index of INDEXES in the motor database. Existing indexes with
+    the same specification are left untouched.
+    """
+    created = {}
+    for collection, indexes in INDEXES.items():
+        created[collection] = await database[collection].create_indexes(indexes)
+
+    return created
+
+def winning_plan(explain: dict) -> dict:
+    if "queryPlanner" in explain:
+        return explain["queryPlanner"]["winningPlan"]
+
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            return stage["$cursor"]["queryPlanner"]["winningPlan"]
+
+    return {}
+
+def plan_summary(plan: dict) -> str:
+    stages = []
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage = f"{stage}({plan['indexName']})"
+        stages.append(stage)
+        plan = plan.get("inputStage") or plan.get("queryPlan") or {}
+
+    return " <- ".join(stages)
+
+async def explain_queries(database, username: str) -> dict[str, str]:
+    plans = {}
+    for name, command in sample_queries(username).items():
+        explain = await database.command("explain", command, verbosity="queryPlanner")
+        plans[name] = plan_summary(winning_plan(explain))
+
+    return plans
+
+
+async def main(args: list[str]) -> None:
+    # config
+    from config import settings
+
+    # db
+    from db.client import get_db_client
+
+    db_client = get_db_client(settings)
+    if not hasattr(db_client, "database"):
+        sys.exit(f"Indexes are only managed for MongoDB, not {settings.db_backend}")
+
+    command = args[0] if args else "apply"
+    if command == "apply":
+        for collection, names in (await apply_indexes(db_client.database)).items():
+            print(f"{collection}: {', '.join(names)}")
+    elif command == "explain":
+        username = args[1] if len(args) > 1 else "testuser"
+        for name, plan in (await explain_queries(db_client.database, username)).items():
+            print(f"{name}: {plan}")
+    else:
+        sys.exit(f"Unknown command: {command}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,229 @@
+# Python
+from copy import deepcopy
+from datetime import date
+
+# typing
+from typing import Optional, Union
+
+# FastAPI
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+
+# db
+from .base import Database, db_error, merge_updates
+from .pagination import paginate
+
+# serializers
+from .serializers.super_list import super_list_serializer
+from .serializers.user import user_db_serializer, user_in_serializer, user_serializer
+
+# models
+from .models.user import User, UserDB, UserIn
+from .models.supermarket_list import SuperList
+from .models.page import Page
+
+
+class MemoryDB(Database):
+    """
+    In-process storage backend.
+
+    Documents are kept in plain dicts, encoded the same way the MongoDB backend
+    stores them, so the API and the load tests can run on one machine with no
+    network and no database server. Data is lost when the process exits.
+    """
+
+    def __init__(self) -> None:
+        self.users: dict[str, dict] = {}
+        self.super_lists: dict[tuple[str, str], dict] = {}
+
+    # USERS #
+    async def get_available_users(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[list[str]] = None
+    ) -> Page:
+        return paginate(
+            docs = [
+                user_serializer(user).dict() for user in self.users.values()
+                if not user["disabled"]
+            ],
+            sort_key = lambda user: [user["username"]],
+            limit = limit,
+            cursor = cursor,
+            fields = fields
+        )
+
+    async def get_user_with_username(
+        self,
+        username: str,
+        full_user: bool = False
+    ) -> Union[User, UserDB]:
+        try:
+            user = self.users[username]
+            if full_user:
+                user = user_db_serializer(user)
+            else:
+                user = user_serializer(user)
+        except Exception as err:
+            raise db_error("DB error: user not found", err)
+
+        return user
+
+    async def get_user_with_password(
+        self,
+        username: str
+    ) -> Optional[UserIn]:
+        user = self.users.get(username)
+        if not user:
+            return None
+
+        return user_in_serializer(user)
+
+    async def get_user_with_username_and_update(
+        self,
+        username: str,
+        updates: list[dict]
+    ) -> User:
+        try:
+            self.users[username].update(
+                jsonable_encoder(merge_updates(updates))
+            )
+            user_updated = User(**self.users[username])
+        except Exception as err:
+            raise db_error("DB error: user not updated", err)
+
+        return user_updated
+
+    async def exist_user(
+        self,
+        username: str
+    ) -> bool:
+        return username in self.users
+
+    async def insert_user(
+        self,
+        data: dict
+    ) -> User:
+        if data.get("username") in self.users:
+            raise HTTPException(
+                status_code = status.HTTP_409_CONFLICT,
+                detail = {
+                    "errmsg": "Username exists"
+                }
+            )
+
+        try:
+            user = UserIn(**data)
+            self.users[user.username] = jsonable_encoder(user)
+        except Exception as err:
+            raise db_error("DB error: user not inserted", err)
+
+        return User(**self.users[user.username])
+
+    # SUPER LISTS #
+    def available_superlists(self, username: str) -> list[dict]:
+        return [
+            deepcopy(super_list) for (owner, _), super_list in self.super_lists.items()
+            if owner == username and not super_list["disabled"]
+        ]
+
+    async def get_available_superlist_for_user(
+        self,
+        username: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[list[str]] = None
+    ) -> Page:
+        return paginate(
+            docs = self.available_superlists(username),
+            sort_key = lambda super_list: [super_list["issue_date"], super_list["order"]],
+            limit = limit,
+            cursor = cursor,
+            fields = fields,
+            descending = True
+        )
+
+    async def get_superlist_with_orderid(
+        self,
+        username: str,
+        order_id: str
+    ) -> SuperList:
+        try:
+            super_list = super_list_serializer(self.super_lists[(username, order_id)])
+        except Exception as err:
+            raise db_error("DB error: super lists not found", err)
+
+        if super_list.disabled:
+            raise HTTPException(
+                status_code = status.HTTP_400_BAD_REQUEST,
+                detail = {
+                    "errmsg": "Supermarket list was deleted"
+                }
+            )
+
+        return super_list
+
+    async def get_superlist_with_orderid_and_update(
+        self,
+        username: str,
+        order_id: str,
+        updates: list[dict]
+    ) -> SuperList:
+        if not await self.exist_superlist(username=username, order_id=order_id):
+            raise HTTPException(
+                status_code = status.HTTP_400_BAD_REQUEST,
+                detail = {
+                    "errmsg": "Supermarket list does not exist"
+                }
+            )
+
+        try:
+            super_list = self.super_lists[(username, order_id)]
+            super_list.update(jsonable_encoder(merge_updates(updates)))
+            super_list_updated = SuperList(**super_list)
+        except Exception as err:
+            raise db_error("DB error: supermarket list not updated", err)
+
+        return super_list_updated
+
+    async def exist_superlist(
+        self,
+        username: str,
+        order_id: str
+    ) -> bool:
+        super_list = self.super_lists.get((username, order_id))
+
+        return bool(super_list) and not super_list["disabled"]
+
+    async def insert_superlist(
+        self,
+        data: SuperList
+    ) -> SuperList:
+        if await self.exist_superlist(username=data.username, order_id=data.order):
+            raise HTTPException(
+                status_code = status.HTTP_400_BAD_REQUEST,
+                detail = {
+                    "errmsg": "Order exists"
+                }
+            )
+
+        self.super_lists[(data.username, data.order)] = jsonable_encoder(data)
+
+        return SuperList(**self.super_lists[(data.username, data.order)])
+
+    async def count_superlists_with_product(
+        self,
+        username: str,
+        product_description: str,
+        start: date,
+        end: date
+    ) -> int:
+        return sum(
+            1 for super_list in self.available_superlists(username)
+            if str(start) <= super_list["issue_date"] <= str(end)
+            and any(
+                product["description"] == product_description
+                for product in super_list["products"]
+            )
+        )
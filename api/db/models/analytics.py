@@ -0,0 +1,41 @@
+# Python
+from datetime import date
+
+# typing
+from typing import Optional
+
+# Pydantic
+from pydantic import BaseModel, Field
+
+
+class ProductMetrics(BaseModel):
+    description: str = Field(...)
+    quantity: float = Field(default=0, description="Units bought")
+    total_spend: float = Field(default=0, description="Sum of units * price")
+    average_price: float = Field(default=0, description="total_spend / quantity")
+    purchases: int = Field(default=0, description="Ticket lines with the product")
+    min_price: Optional[float] = Field(default=None, description="Lowest unit price paid")
+    max_price: Optional[float] = Field(default=None, description="Highest unit price paid")
+
+
+class InflationPoint(BaseModel):
+    month: str = Field(..., example="2023-12")
+    index: float = Field(..., description="Chained price index, 100 on the first month")
+    products: int = Field(..., description="Products priced in this and the previous month")
+
+class PriceVolatility(BaseModel):
+    description: str = Field(...)
+    purchases: int = Field(...)
+    mean_price: float = Field(...)
+    std_price: float = Field(...)
+    coefficient_of_variation: float = Field(..., description="std_price / mean_price")
+
+class MovingAveragePoint(BaseModel):
+    day: date = Field(...)
+    price: float = Field(..., description="Average unit price paid that day")
+    moving_average: float = Field(...)
+
+class ProductMatch(BaseModel):
+    description: str = Field(...)
+    score: float = Field(..., description="1 for prefix matches, else trigram similarity")
+    match: str = Field(...) # prefix | word | fuzzy
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+# typing
+from typing import Any, Optional
+
+# pydantic
+from pydantic import BaseModel, Field
+
+
+class Job(BaseModel):
+    id: str = Field(...)
+    kind: str = Field(...) # ticket | ocr | receipt
+    status: str = Field(...) # queued | running | done | failed
+    stage: Optional[str] = Field(default=None) # fetched | parsed | inserted | read
+    result: Optional[Any] = Field(default=None)
+    errmsg: Optional[str] = Field(default=None)
+    created: datetime = Field(...)
+    updated: datetime = Field(...)
+
+class JobEvent(BaseModel):
+    id: int = Field(...)
+    job_id: str = Field(...)
+    kind: str = Field(...)
+    event: str = Field(...) # fetched | parsed | inserted | read | done | failed
+    errmsg: Optional[str] = Field(default=None)
+    created: datetime = Field(...)
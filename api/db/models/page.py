@@ -0,0 +1,13 @@
+# Python
+from typing import Optional
+
+# Pydantic
+from pydantic import BaseModel, Field
+
+
+class Page(BaseModel):
+    items: list[dict] = Field(...)
+    next_cursor: Optional[str] = Field(
+        default = None,
+        description = "Pass it as cursor to get the next page, null on the last page"
+    )
@@ -4,7 +4,15 @@ from datetime import date
 from typing import Optional
 
 # pydantic
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, validator
+
+
+def normalize_description(description: str) -> str:
+    """
+    The canonical form of a product description, used as the product key by the
+    catalog and the analytics: lowercase with single spaces.
+    """
+    return " ".join(description.split()).lower()
 
 
 class Products(BaseModel):
@@ -12,6 +20,8 @@ class Products(BaseModel):
     units: float = Field(...)
     price: float = Field(...)
 
+    _normalize_description = validator("description", allow_reuse=True)(normalize_description)
+
 class BaseSuperList(BaseModel):
     order: str = Field(...)
     issue_date: date = Field(
@@ -52,4 +62,10 @@ class SuperList(BaseSuperList):
                     }
                 ]
             }
-        }
\ No newline at end of file
+        }
+
+class ImportStatus(BaseModel):
+    order: Optional[str] = Field(default=None)
+    url: Optional[str] = Field(default=None)
+    status: str = Field(...) # inserted | failed
+    errmsg: Optional[str] = Field(default=None)
\ No newline at end of file
@@ -0,0 +1,102 @@
+# Python
+import base64
+import json
+
+# typing
+from typing import Callable, Optional
+
+# FastAPI
+from fastapi import HTTPException, status
+
+# Pydantic
+from pydantic import BaseModel
+
+# models
+from .models.page import Page
+
+
+def encode_cursor(values: list) -> str:
+    """
+    Packs the sort key of the last item of a page into an opaque cursor.
+    """
+    return base64.urlsafe_b64encode(
+        json.dumps(values, separators=(",", ":")).encode()
+    ).decode()
+
+def decode_cursor(cursor: str, types: tuple[type, ...] = (str,)) -> list:
+    """
+    Unpacks a cursor into its sort key, which must have one value of each of
+    types, so a crafted cursor can't smuggle query operators into a filter.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(f"cursor is not a list of {len(types)} values")
+        for value, value_type in zip(values, types):
+            if not isinstance(value, value_type):
+                raise ValueError(f"cursor value {value!r} is not a {value_type.__name__}")
+    except Exception as err:
+        raise HTTPException(
+            status_code = status.HTTP_400_BAD_REQUEST,
+            detail = {
+                "errmsg": "Invalid cursor",
+                "errdetail": str(err)
+            }
+        )
+
+    return values
+
+def parse_fields(fields: Optional[str], model: type[BaseModel]) -> Optional[list[str]]:
+    """
+    Parses a comma separated fields query parameter against the model fields.
+    """
+    if not fields:
+        return None
+
+    fields = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = set(fields) - set(model.__fields__)
+    if unknown:
+        raise HTTPException(
+            status_code = status.HTTP_400_BAD_REQUEST,
+            detail = {
+                "errmsg": f"Unknown fields: {', '.join(sorted(unknown))}"
+            }
+        )
+
+    return fields
+
+def select_fields(doc: dict, fields: Optional[list[str]]) -> dict:
+    if not fields:
+        return doc
+
+    return {field: doc[field] for field in fields if field in doc}
+
+def paginate(
+    docs: list[dict],
+    sort_key: Callable[[dict], list],
+    limit: int,
+    cursor: Optional[str] = None,
+    fields: Optional[list[str]] = None,
+    descending: bool = False
+) -> Page:
+    """
+    Keyset pagination of documents already in memory, for the backends that
+    cannot sort and filter on the server.
+    """
+    docs = sorted(docs, key=sort_key, reverse=descending)
+    if cursor and docs:
+        after = decode_cursor(cursor, types=tuple(map(type, sort_key(docs[0]))))
+        if descending:
+            docs = [doc for doc in docs if sort_key(doc) < after]
+        else:
+            docs = [doc for doc in docs if sort_key(doc) > after]
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(sort_key(docs[-1]))
+
+    return Page(
+        items = [select_fields(doc, fields) for doc in docs],
+        next_cursor = next_cursor
+    )
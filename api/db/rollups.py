@@ -0,0 +1,241 @@
+"""
+Per user, product and day rollups of the supermarket lists.
+
+The 'super_rollups' collection holds one document per (username, product_id, day)
+with units, spend, count and min/max price. The MongoDB write paths keep it up to
+date with deltas; the analytics read it, so their cost depends on the days in the
+range and not on the number of tickets.
+
+Recompute the rollups from the super lists (all users or one):
+    python -m db.rollups rebuild [username]
+
+Compare the stored rollups with a fresh computation without writing:
+    python -m db.rollups verify [username]
+"""
+# Python
+import asyncio
+import sys
+
+# typing
+from typing import Optional
+
+# pymongo
+from pymongo import UpdateOne
+
+
+def rollup_deltas(super_list: Optional[dict], sign: int) -> dict[tuple[int, str], dict]:
+    """
+    The contribution of an available super list, as stored (products encoded
+    with db.catalog), to its rollups, multiplied by sign. Products still stored
+    with their description, from before the catalog, are not in the rollups
+    until the list is migrated and they are rebuilt, so they are skipped.
+    """
+    deltas = {}
+    if not super_list or super_list.get("disabled"):
+        return deltas
+
+    day = str(super_list["issue_date"])
+    for product in super_list["products"]:
+        if "product_id" not in product:
+            continue
+
+        delta = deltas.setdefault(
+            (product["product_id"], day),
+            {"units": 0, "spend": 0, "count": 0, "prices": []}
+        )
+        delta["units"] += sign * product["units"]
+        delta["spend"] += sign * product["units"] * product["price"]
+        delta["count"] += sign
+        delta["prices"].append(product["price"])
+
+    return deltas
+
+def rollup_updates(
+    username: str,
+    before: Optional[dict],
+    after: Optional[dict]
+) -> tuple[list[UpdateOne], set[tuple[int, str]]]:
+    """
+    The rollup writes for a super list that changed from before to after (None when
+    it did not exist). Returns the updates and the (product_id, day) keys that
+    lost lines: min/max price cannot be decremented, so those are recomputed with
+    price_bounds_pipeline.
+    """
+    deltas = rollup_deltas(after, 1)
+    removed = set()
+    for key, delta in rollup_deltas(before, -1).items():
+        removed.add(key)
+        total = deltas.setdefault(key, {"units": 0, "spend": 0, "count": 0, "prices": []})
+        total["units"] += delta["units"]
+        total["spend"] += delta["spend"]
+        total["count"] += delta["count"]
+
+    updates = []
+    for (product_id, day), delta in deltas.items():
+        if not delta["count"] and not delta["units"] and not delta["spend"] and not delta["prices"]:
+            continue
+
+        update = {
+            "$inc": {
+                "units": delta["units"],
+                "spend": delta["spend"],
+                "count": delta["count"]
+            }
+        }
+        if delta["prices"]:
+            update["$min"] = {"min_price": min(delta["prices"])}
+            update["$max"] = {"max_price": max(delta["prices"])}
+
+        updates.append(
+            UpdateOne(
+                {"username": username, "product_id": product_id, "day": day},
+                update,
+                upsert = True
+            )
+        )
+
+    return updates, removed
+
+def price_bounds_pipeline(username: str, keys: set[tuple[int, str]]) -> list[dict]:
+    """
+    Aggregation over 'super_list' with the min/max price of the given
+    (product_id, day) keys of the user.
+    """
+    return [
+        {
+            "$match": {
+                "username": username,
+                "disabled": False,
+                "issue_date": {"$in": sorted({day for _, day in keys})},
+                "products.product_id": {"$in": sorted({product_id for product_id, _ in keys})}
+            }
+        },
+        {"$unwind": "$products"},
+        {
+            "$group": {
+                "_id": {"product_id": "$products.product_id", "day": "$issue_date"},
+                "min_price": {"$min": "$products.price"},
+                "max_price": {"$max": "$products.price"}
+            }
+        }
+    ]
+
+def rebuild_pipeline(username: Optional[str] = None) -> list[dict]:
+    """
+    Aggregation over 'super_list' that computes the rollups from scratch.
+    Like rollup_deltas, it skips the products without a product_id, from
+    before the catalog, instead of grouping them under a null product_id.
+    """
+    match = {"disabled": False}
+    if username:
+        match["username"] = username
+
+    return [
+        {"$match": match},
+        {"$unwind": "$products"},
+        {"$match": {"products.product_id": {"$exists": True}}},
+        {
+            "$group": {
+                "_id": {
+                    "username": "$username",
+                    "product_id": "$products.product_id",
+                    "day": "$issue_date"
+                },
+                "units": {"$sum": "$products.units"},
+                "spend": {"$sum": {"$multiply": ["$products.units", "$products.price"]}},
+                "count": {"$sum": 1},
+                "min_price": {"$min": "$products.price"},
+                "max_price": {"$max": "$products.price"}
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "username": "$_id.username",
+                "product_id": "$_id.product_id",
+                "day": "$_id.day",
+                "units": 1,
+                "spend": 1,
+                "count": 1,
+                "min_price": 1,
+                "max_price": 1
+            }
+        }
+    ]
+
+
+async def rebuild(database, username: Optional[str] = None) -> int:
+    query = {"username": username} if username else {}
+    await database.super_rollups.delete_many(query)
+    await database.super_list.aggregate(
+        rebuild_pipeline(username) + [
+            {
+                "$merge": {
+                    "into": "super_rollups",
+                    "on": ["username", "product_id", "day"],
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert"
+                }
+            }
+        ]
+    ).to_list(length=None)
+
+    return await database.super_rollups.count_documents(query)
+
+async def verify(database, username: Optional[str] = None) -> list[str]:
+    """
+    Returns the differences between the stored rollups and a fresh computation.
+    """
+    def key(rollup: dict) -> tuple:
+        return (rollup["username"], rollup["product_id"], rollup["day"])
+
+    query = {"username": username} if username else {}
+    stored = {
+        key(rollup): rollup
+        async for rollup in database.super_rollups.find(query, {"_id": 0})
+    }
+    expected = {
+        key(rollup): rollup
+        async for rollup in database.super_list.aggregate(rebuild_pipeline(username))
+    }
+
+    differences = []
+    for rollup_key in sorted(stored.keys() | expected.keys()):
+        stored_rollup = stored.get(rollup_key, {})
+        expected_rollup = expected.get(rollup_key, {})
+        for field in ("units", "spend", "count", "min_price", "max_price"):
+            if abs((stored_rollup.get(field) or 0) - (expected_rollup.get(field) or 0)) > 1e-6:
+                differences.append(
+                    f"{rollup_key} {field}: stored {stored_rollup.get(field)}, "
+                    f"expected {expected_rollup.get(field)}"
+                )
+
+    return differences
+
+
+async def main(args: list[str]) -> None:
+    # config
+    from config import settings
+
+    # db
+    from db.client import get_db_client
+
+    db_client = get_db_client(settings)
+    if not hasattr(db_client, "database"):
+        sys.exit(f"Rollups are only stored in MongoDB, not {settings.db_backend}")
+
+    command = args[0] if args else "verify"
+    username = args[1] if len(args) > 1 else None
+    if command == "rebuild":
+        print(f"{await rebuild(db_client.database, username)} rollups rebuilt")
+    elif command == "verify":
+        differences = await verify(db_client.database, username)
+        for difference in differences:
+            print(difference)
+        print(f"{len(differences)} differences")
+    else:
+        sys.exit(f"Unknown command: {command}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
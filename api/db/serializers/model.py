@@ -0,0 +1,20 @@
+# typing
+from typing import TypeVar
+
+# Pydantic
+from pydantic import BaseModel
+
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+def trusted_model(model: type[Model], document: dict) -> Model:
+    """
+    Builds model from a document read from the database without validating it:
+    everything stored went through the model on the way in, so the read path
+    does not pay for validation again. Keys that are not fields of the model
+    (_id, key, password for User...) are left out.
+    """
+    return model.construct(
+        **{field: document[field] for field in model.__fields__ if field in document}
+    )
@@ -0,0 +1,22 @@
+# models
+from db.models.supermarket_list import SuperList, Products
+
+# serializers
+from .model import trusted_model
+
+
+def super_list_serializer(super_list: dict) -> SuperList:
+    """
+    Builds a SuperList from a document read from the database (products already
+    decoded) without validating it. Dates stay as the stored ISO strings, which
+    is what the responses render anyway.
+    """
+    super_list = trusted_model(SuperList, super_list)
+    super_list.products = [
+        trusted_model(Products, product) for product in super_list.products or []
+    ]
+
+    return super_list
+
+def super_lists_serializer(super_lists: list) -> list[SuperList]:
+    return [super_list_serializer(super_list) for super_list in super_lists]
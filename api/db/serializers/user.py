@@ -1,24 +1,24 @@
-# FastAPI
-from fastapi.encoders import jsonable_encoder
-
 # models
 from db.models.user import User, UserDB, UserIn
 
+# serializers
+from .model import trusted_model
+
 
 def user_serializer(user: dict) -> User:
-    user["email"] = str(user["email"])
-    user["birth_date"] = str(user["birth_date"])
-    del user["password"]
-    del user["disabled"]
-    del user["created"]
+    return trusted_model(User, user)
+
+def user_db_serializer(user: dict) -> UserDB:
+    return trusted_model(UserDB, user)
 
-    return user
+def user_in_serializer(user: dict) -> UserIn:
+    return trusted_model(UserIn, user)
 
 def users_serializer(users: list) -> list[User]:
-    return [User(**user) for user in users]
+    return [user_serializer(user) for user in users]
 
 def users_in_serializer(users: list) -> list[UserIn]:
-    return [UserIn(**user) for user in users]
+    return [user_in_serializer(user) for user in users]
 
 def users_db_serializer(users: list) -> list[UserDB]:
-    return [UserDB(**user) for user in users]
\ No newline at end of file
+    return [user_db_serializer(user) for user in users]
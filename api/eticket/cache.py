@@ -0,0 +1,124 @@
+# Python
+import hashlib
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# typing
+from typing import NamedTuple, Optional
+
+# cache
+from cache import TTLCache
+
+# config
+from config import settings
+
+# e-ticket
+from .fetcher import FetchResult
+from .parsers import normalize_supermarket
+
+# models
+from db.models.supermarket_list import Products
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Lowercases scheme and host, drops default ports and fragments and sorts
+    the query string, so equivalent ticket urls share a cache entry.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+def body_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class CachedTicket(NamedTuple):
+    products: list[Products]
+    body_hash: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh_until: float
+
+    def is_fresh(self) -> bool:
+        return self.fresh_until >= time.monotonic()
+
+    def validators(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+
+class TicketCache:
+    """
+    Cache of scraped e-tickets.
+
+    Entries are keyed by the normalized url and served without any request
+    while fresh. Once stale they are revalidated with ETag/Last-Modified, and a
+    304 or an unchanged body hash reuses the parsed products. Parsed products
+    are also indexed by body hash, so the same ticket under another url is not
+    parsed again.
+    """
+
+    def __init__(self, maxsize: int, fresh: float, ttl: float) -> None:
+        self.fresh = fresh
+        self.by_url = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.by_body = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def lookup(self, url: str, supermarket: Optional[str]) -> Optional[CachedTicket]:
+        return self.by_url.get((normalize_supermarket(supermarket), normalize_url(url)))
+
+    def revalidated(
+        self,
+        url: str,
+        supermarket: Optional[str],
+        ticket: CachedTicket
+    ) -> CachedTicket:
+        ticket = ticket._replace(fresh_until=time.monotonic() + self.fresh)
+        self.by_url.set((normalize_supermarket(supermarket), normalize_url(url)), ticket)
+
+        return ticket
+
+    def parsed(self, page: FetchResult, supermarket: Optional[str]) -> Optional[list[Products]]:
+        return self.by_body.get(
+            (normalize_supermarket(supermarket), body_hash(page.content))
+        )
+
+    def store(
+        self,
+        url: str,
+        supermarket: Optional[str],
+        page: FetchResult,
+        products: list[Products]
+    ) -> CachedTicket:
+        content_hash = body_hash(page.content)
+        ticket = CachedTicket(
+            products = products,
+            body_hash = content_hash,
+            etag = page.headers.get("etag"),
+            last_modified = page.headers.get("last-modified"),
+            fresh_until = time.monotonic() + self.fresh
+        )
+        self.by_url.set((normalize_supermarket(supermarket), normalize_url(url)), ticket)
+        self.by_body.set((normalize_supermarket(supermarket), content_hash), products)
+
+        return ticket
+
+
+ticket_cache = TicketCache(
+    maxsize = settings.ticket_cache_size,
+    fresh = settings.ticket_cache_fresh,
+    ttl = settings.ticket_cache_ttl
+)
@@ -0,0 +1,149 @@
+# Python
+import asyncio
+
+# typing
+from typing import NamedTuple, Optional
+
+# httpx
+import httpx
+
+# config
+from config import settings
+
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    pass
+
+
+class FetchResult(NamedTuple):
+    url: str
+    status_code: int
+    headers: dict
+    content: bytes
+    encoding: str
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+
+async def close_client(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except RuntimeError:
+        # opened in a loop that is closed now, and so are its sockets
+        pass
+
+
+class TicketFetcher:
+    """
+    Downloads e-tickets with a shared httpx.AsyncClient.
+
+    The client keeps a pool of keep-alive connections, every request has
+    connect/read timeouts, bodies bigger than max_bytes are rejected while
+    streaming and transient failures are retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float,
+        read_timeout: float,
+        max_bytes: int,
+        max_connections: int,
+        retries: int,
+        backoff: float
+    ) -> None:
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections = max_connections,
+            max_keepalive_connections = max_connections
+        )
+        self.max_bytes = max_bytes
+        self.retries = retries
+        self.backoff = backoff
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def get_client(self) -> httpx.AsyncClient:
+        # pooled connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        client = self._client
+        if client is None or client.is_closed or self._loop is not loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                timeout = self.timeout,
+                limits = self.limits,
+                follow_redirects = True
+            )
+            if client is not None:
+                await close_client(client)
+
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            client, self._client = self._client, None
+            await close_client(client)
+
+    async def _get(self, url: str, headers: Optional[dict]) -> FetchResult:
+        client = await self.get_client()
+        async with client.stream("GET", url, headers=headers) as response:
+            content_length = response.headers.get("content-length")
+            if content_length and int(content_length) > self.max_bytes:
+                raise FetchError(f"Ticket bigger than {self.max_bytes} bytes")
+
+            chunks = []
+            size = 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise FetchError(f"Ticket bigger than {self.max_bytes} bytes")
+                chunks.append(chunk)
+
+            return FetchResult(
+                url = str(response.url),
+                status_code = response.status_code,
+                headers = dict(response.headers),
+                content = b"".join(chunks),
+                encoding = response.encoding or "utf-8"
+            )
+
+    async def fetch(self, url: str, headers: Optional[dict] = None) -> FetchResult:
+        """
+        Returns the ticket at url. Raises FetchError when the host keeps failing,
+        answers with an error status or the body exceeds the size cap, and at
+        once when the url can't be requested (no scheme, malformed).
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                result = await self._get(url, headers)
+            except (httpx.UnsupportedProtocol, httpx.InvalidURL) as err:
+                raise FetchError(f"Invalid ticket url: {err}")
+            except httpx.TransportError as err:
+                if attempt == self.retries:
+                    raise FetchError(f"Ticket host unreachable: {err!r}")
+            else:
+                if result.status_code not in RETRY_STATUS_CODES:
+                    break
+                if attempt == self.retries:
+                    break
+
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+
+        if result.status_code >= 400:
+            raise FetchError(f"Ticket host answered {result.status_code}")
+
+        return result
+
+
+fetcher = TicketFetcher(
+    connect_timeout = settings.fetch_connect_timeout,
+    read_timeout = settings.fetch_read_timeout,
+    max_bytes = settings.fetch_max_bytes,
+    max_connections = settings.fetch_max_connections,
+    retries = settings.fetch_retries,
+    backoff = settings.fetch_backoff
+)
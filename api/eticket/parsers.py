@@ -0,0 +1,121 @@
+# Python
+from html.parser import HTMLParser
+
+# typing
+from typing import Callable, Optional
+
+# models
+from db.models.supermarket_list import Products
+
+
+TicketParser = Callable[[str], list[Products]]
+
+PARSERS: dict[str, TicketParser] = {}
+DEFAULT_PARSER = "default"
+
+
+def normalize_supermarket(supermarket: Optional[str]) -> str:
+    if not supermarket:
+        return DEFAULT_PARSER
+
+    return supermarket.strip().lower()
+
+def register_parser(*supermarkets: str) -> Callable[[TicketParser], TicketParser]:
+    """
+    Registers the decorated function as the parser for the e-tickets of the
+    given supermarkets (matched against BaseSuperList.supermarket).
+    """
+    def decorator(parser: TicketParser) -> TicketParser:
+        for supermarket in supermarkets:
+            PARSERS[normalize_supermarket(supermarket)] = parser
+
+        return parser
+
+    return decorator
+
+def get_parser(supermarket: Optional[str]) -> TicketParser:
+    return PARSERS.get(normalize_supermarket(supermarket), PARSERS[DEFAULT_PARSER])
+
+def parse_ticket(html: str, supermarket: Optional[str] = None) -> list[Products]:
+    return get_parser(supermarket)(html)
+
+
+class TableRowsParser(HTMLParser):
+    """
+    Streaming parser for tickets laid out as <tr class="font table-full-alt">
+    rows of <div>s. It keeps only the top-level div texts of the matching rows,
+    so no document tree is built.
+    """
+
+    ROW_CLASSES = {"font", "table-full-alt"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.rows: list[list[tuple[bool, str]]] = []
+        self._row: Optional[list[tuple[bool, str]]] = None
+        self._div: Optional[tuple[bool, list[str]]] = None
+        self._div_depth = 0
+
+    def _close_row(self) -> None:
+        if self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+            self._div = None
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag == "tr":
+            self._close_row()
+            classes = set((dict(attrs).get("class") or "").split())
+            if self.ROW_CLASSES <= classes:
+                self._row = []
+
+        elif tag == "div" and self._row is not None:
+            if self._div is None:
+                classes = (dict(attrs).get("class") or "").split()
+                self._div = ("center" in classes, [])
+                self._div_depth = 1
+            else:
+                self._div_depth += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "div" and self._div is not None:
+            self._div_depth -= 1
+            if self._div_depth == 0:
+                is_center, text = self._div
+                self._row.append((is_center, "".join(text)))
+                self._div = None
+
+        elif tag in ("tr", "table"):
+            self._close_row()
+
+    def handle_data(self, data: str) -> None:
+        if self._div is not None:
+            self._div[1].append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._close_row()
+
+
+@register_parser(DEFAULT_PARSER)
+def parse_table_rows(html: str) -> list[Products]:
+    parser = TableRowsParser()
+    parser.feed(html)
+    parser.close()
+
+    products = []
+    for row in parser.rows:
+        if not row:
+            continue
+
+        description = row[0][1]
+        units_and_price = [text for is_center, text in row if is_center]
+        products.append(
+            Products(
+                description = description,
+                units = float(units_and_price[0]),
+                price = float(units_and_price[1])
+            )
+        )
+
+    return products
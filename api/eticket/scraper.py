@@ -0,0 +1,108 @@
+# Python
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+# typing
+from typing import AsyncIterator, Awaitable, Callable, Optional, Union
+
+# config
+from config import settings
+
+# e-ticket
+from .cache import ticket_cache
+from .fetcher import fetcher
+from .parsers import parse_ticket
+
+# models
+from db.models.supermarket_list import BaseSuperList, Products
+
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+# host -> [semaphore, coroutines using it], shared by all the requests
+_host_limits: dict[str, list] = {}
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(max_workers=settings.parse_workers)
+
+    return _parse_pool
+
+def close_parse_pool() -> None:
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(cancel_futures=True)
+        _parse_pool = None
+
+@asynccontextmanager
+async def host_limit(url: str) -> AsyncIterator[None]:
+    """
+    Holds one of the settings.fetch_per_host_limit slots of the url's host,
+    across every request in this process. A host's semaphore only lives while
+    someone uses it, so the map doesn't grow with every host ever seen.
+    """
+    host = urlsplit(url).netloc.lower()
+    limit = _host_limits.get(host)
+    if limit is None:
+        limit = _host_limits[host] = [asyncio.Semaphore(settings.fetch_per_host_limit), 0]
+    limit[1] += 1
+    try:
+        async with limit[0]:
+            yield
+    finally:
+        limit[1] -= 1
+        if not limit[1]:
+            del _host_limits[host]
+
+async def scrape_products(
+    url: str,
+    supermarket: Optional[str] = None,
+    on_fetched: Optional[Callable[[], Awaitable[None]]] = None
+) -> list[Products]:
+    """
+    Returns the products of the e-ticket at url. Fresh cached tickets cost no
+    request; stale ones are revalidated with a conditional request. New bodies
+    are parsed in the parse worker pool, so parsing never runs on the event loop.
+    on_fetched is awaited once the ticket is fetched, before parsing it.
+    """
+    cached = ticket_cache.lookup(url, supermarket)
+    if cached and cached.is_fresh():
+        if on_fetched:
+            await on_fetched()
+        return cached.products
+
+    headers = cached.validators() if cached else None
+    async with host_limit(url):
+        page = await fetcher.fetch(url, headers)
+    if on_fetched:
+        await on_fetched()
+
+    if page.status_code == 304 and cached:
+        return ticket_cache.revalidated(url, supermarket, cached).products
+
+    products = ticket_cache.parsed(page, supermarket)
+    if products is None:
+        products = await asyncio.get_running_loop().run_in_executor(
+            get_parse_pool(), parse_ticket, page.text, supermarket
+        )
+
+    return ticket_cache.store(url, supermarket, page, products).products
+
+async def scrape_many(
+    tickets: list[BaseSuperList]
+) -> list[Union[list[Products], Exception]]:
+    """
+    Scrapes all the tickets concurrently, within the per host limits shared
+    with the other requests. Returns the products of each ticket, or the
+    exception raised while scraping it, in the same order as tickets.
+    """
+    return await asyncio.gather(
+        *[
+            scrape_products(url=ticket.url, supermarket=ticket.supermarket)
+            for ticket in tickets
+        ],
+        return_exceptions = True
+    )
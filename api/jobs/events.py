@@ -0,0 +1,87 @@
+# Python
+import asyncio
+import logging
+from contextlib import contextmanager
+
+# typing
+from typing import Iterator, Optional
+
+# starlette
+from starlette.concurrency import run_in_threadpool
+
+# config
+from config import settings
+
+# jobs
+from .queue import job_queue
+
+# models
+from db.models.job import JobEvent
+
+
+class EventBroker:
+    """
+    Fans job events out to the subscribers of each user in this process.
+
+    A subscriber is a bounded asyncio.Queue, so an idle connection costs a
+    queue and a suspended coroutine, and publishing touches only the queues
+    of the event's user. A subscriber that falls behind loses its oldest
+    events instead of growing without limit.
+    """
+
+    def __init__(self, queue_size: int) -> None:
+        self.queue_size = queue_size
+        self.subscribers: dict[str, set[asyncio.Queue]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(queues) for queues in self.subscribers.values())
+
+    @contextmanager
+    def subscribe(self, username: str) -> Iterator[asyncio.Queue]:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.setdefault(username, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self.subscribers[username]
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[username]
+
+    @staticmethod
+    def put(queue: asyncio.Queue, event: Optional[JobEvent]) -> None:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def publish(self, username: str, event: JobEvent) -> None:
+        for queue in self.subscribers.get(username, ()):
+            self.put(queue, event)
+
+
+logger = logging.getLogger(__name__)
+
+broker = EventBroker(queue_size=settings.event_queue_size)
+
+
+async def poll_events() -> None:
+    """
+    Publishes the events recorded by the other app processes, whose jobs may
+    belong to users connected to this one. One task per process reads them
+    from the job queue every job_poll_interval seconds, and only while
+    someone is subscribed.
+    """
+    last_id = None
+    while True:
+        try:
+            if last_id is None or not broker.subscribers:
+                last_id = await run_in_threadpool(job_queue.last_event_id)
+            else:
+                last_id, events = await run_in_threadpool(job_queue.events_since, last_id)
+                for username, event in events:
+                    broker.publish(username, event)
+        except Exception:
+            # e.g. the queue database is locked: the events are read next time
+            logger.exception("Job events poll error")
+
+        await asyncio.sleep(settings.job_poll_interval)
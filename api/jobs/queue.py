@@ -0,0 +1,256 @@
+# Python
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+# typing
+from typing import Any, Optional
+
+# orjson
+import orjson
+
+# config
+from config import settings
+
+# models
+from db.models.job import Job, JobEvent
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    result BLOB,
+    errmsg TEXT,
+    owner INTEGER,
+    created TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created);
+CREATE TABLE IF NOT EXISTS job_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    event TEXT NOT NULL,
+    errmsg TEXT,
+    origin INTEGER NOT NULL,
+    created TEXT NOT NULL
+);
+"""
+COLUMNS = "id, kind, status, stage, result, errmsg, created, updated"
+EVENT_COLUMNS = "username, id, job_id, kind, event, errmsg, created"
+
+
+def process_alive(pid: Optional[int]) -> bool:
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+def event_from_row(row: tuple) -> tuple[str, JobEvent]:
+    username, id, job_id, kind, event, errmsg, created = row
+
+    return username, JobEvent(
+        id = id,
+        job_id = job_id,
+        kind = kind,
+        event = event,
+        errmsg = errmsg,
+        created = datetime.fromisoformat(created)
+    )
+
+def job_from_row(row: tuple) -> Job:
+    id, kind, status, stage, result, errmsg, created, updated = row
+
+    return Job(
+        id = id,
+        kind = kind,
+        status = status,
+        stage = stage,
+        result = orjson.loads(result) if result is not None else None,
+        errmsg = errmsg,
+        created = datetime.fromisoformat(created),
+        updated = datetime.fromisoformat(updated)
+    )
+
+
+class JobQueue:
+    """
+    Persistent queue of background jobs in a SQLite file. Every app process
+    (uvicorn worker) can enqueue and claim jobs from the same file: a claim
+    takes the oldest queued job inside a write transaction, so each job runs
+    once.
+
+    The methods block on disk, callers on the event loop run them in the
+    threadpool.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+
+        return connection
+
+    def enqueue(self, username: str, kind: str, payload: dict) -> Job:
+        now = datetime.utcnow().isoformat()
+        job_id = uuid.uuid4().hex
+        self.connection.execute(
+            "INSERT INTO jobs (id, username, kind, payload, status, created, updated) "
+            "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+            (job_id, username, kind, orjson.dumps(payload), now, now)
+        )
+
+        return self.get(job_id)
+
+    def claim(self) -> Optional[tuple[Job, str, dict]]:
+        """
+        Marks the oldest queued job as running and returns it with its username
+        and payload, or None when the queue is empty.
+        """
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            row = self.connection.execute(
+                "SELECT id, username, payload FROM jobs WHERE status = 'queued' "
+                "ORDER BY created LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+
+            job_id, username, payload = row
+            self.connection.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, updated = ? WHERE id = ?",
+                (os.getpid(), datetime.utcnow().isoformat(), job_id)
+            )
+
+        return self.get(job_id), username, orjson.loads(payload)
+
+    def update(
+        self,
+        job_id: str,
+        status: Optional[str] = None,
+        stage: Optional[str] = None,
+        result: Any = None,
+        errmsg: Optional[str] = None
+    ) -> Optional[tuple[str, JobEvent]]:
+        """
+        Updates the job. A new stage or a finished status is also recorded as
+        an event, returned with the username it is for.
+        """
+        now = datetime.utcnow().isoformat()
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            row = self.connection.execute(
+                "UPDATE jobs SET status = COALESCE(?, status), stage = COALESCE(?, stage), "
+                "result = COALESCE(?, result), errmsg = COALESCE(?, errmsg), updated = ? "
+                "WHERE id = ? RETURNING username, kind",
+                (
+                    status,
+                    stage,
+                    orjson.dumps(result) if result is not None else None,
+                    errmsg,
+                    now,
+                    job_id
+                )
+            ).fetchone()
+            event = status if status in ("done", "failed") else stage
+            if row is None or event is None:
+                return None
+
+            username, kind = row
+            event_id = self.connection.execute(
+                "INSERT INTO job_events (username, job_id, kind, event, errmsg, origin, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (username, job_id, kind, event, errmsg, os.getpid(), now)
+            ).lastrowid
+
+        return event_from_row((username, event_id, job_id, kind, event, errmsg, now))
+
+    def last_event_id(self) -> int:
+        return self.connection.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM job_events"
+        ).fetchone()[0]
+
+    def events_since(self, event_id: int) -> tuple[int, list[tuple[str, JobEvent]]]:
+        """
+        Returns the id of the last event after event_id and, in order, the ones
+        recorded by the other app processes.
+        """
+        rows = self.connection.execute(
+            f"SELECT origin, {EVENT_COLUMNS} FROM job_events WHERE id > ? ORDER BY id",
+            (event_id,)
+        ).fetchall()
+        if not rows:
+            return event_id, []
+
+        return rows[-1][2], [
+            event_from_row(row[1:]) for row in rows if row[0] != os.getpid()
+        ]
+
+    def get(self, job_id: str, username: Optional[str] = None) -> Optional[Job]:
+        query = f"SELECT {COLUMNS} FROM jobs WHERE id = ?"
+        params = (job_id,)
+        if username is not None:
+            query += " AND username = ?"
+            params += (username,)
+        row = self.connection.execute(query, params).fetchone()
+
+        return job_from_row(row) if row else None
+
+    def requeue_running(self) -> int:
+        """
+        Puts back in the queue the jobs left running by app processes that are
+        gone, or by this one if it is the same pid after a restart.
+        """
+        owners = [
+            owner for (owner,) in self.connection.execute(
+                "SELECT DISTINCT owner FROM jobs WHERE status = 'running'"
+            )
+            if owner == os.getpid() or not process_alive(owner)
+        ]
+
+        return self.connection.execute(
+            "UPDATE jobs SET status = 'queued', owner = NULL, updated = ? "
+            f"WHERE status = 'running' AND owner IN ({', '.join('?' * len(owners))})",
+            (datetime.utcnow().isoformat(), *owners)
+        ).rowcount
+
+    def purge(self, older_than: timedelta) -> int:
+        """
+        Deletes the finished jobs last updated, and the events recorded, before
+        older_than ago. Returns the number of deleted jobs.
+        """
+        before = (datetime.utcnow() - older_than).isoformat()
+        self.connection.execute("DELETE FROM job_events WHERE created < ?", (before,))
+
+        return self.connection.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated < ?",
+            (before,)
+        ).rowcount
+
+
+job_queue = JobQueue(settings.job_queue_path)
@@ -0,0 +1,192 @@
+# Python
+import asyncio
+import logging
+import os
+import time
+from datetime import timedelta
+
+# typing
+from typing import Optional
+
+# FastAPI
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+# starlette
+from starlette.concurrency import run_in_threadpool
+
+# exceptions
+from exceptions import HTTPError
+
+# config
+from config import settings
+
+# db
+from db.client import db_client
+
+# e-ticket
+from eticket.scraper import scrape_products
+
+# OCR
+from ocr.pipeline import read_spooled
+from ocr.receipt import parse_receipt_text
+
+# analytics
+from price_history import invalidate_price_history
+
+# jobs
+from .events import broker, poll_events
+from .queue import job_queue
+
+# models
+from db.models.job import Job
+from db.models.supermarket_list import BaseSuperList, SuperList
+
+
+logger = logging.getLogger(__name__)
+
+_workers: list[asyncio.Task] = []
+_wakeup: Optional[asyncio.Event] = None
+
+
+async def report(job: Job, **fields) -> None:
+    """
+    Updates the job and pushes the event it records to the user's subscribers
+    in this process; the other processes pick it up with poll_events.
+    """
+    recorded = await run_in_threadpool(job_queue.update, job.id, **fields)
+    if recorded:
+        broker.publish(*recorded)
+
+async def run_ticket(job: Job, username: str, payload: dict) -> dict:
+    ticket = BaseSuperList(**payload)
+    products = await scrape_products(
+        url = ticket.url,
+        supermarket = ticket.supermarket,
+        on_fetched = lambda: report(job, stage="fetched")
+    )
+    await report(job, stage="parsed")
+
+    inserted = await db_client.insert_superlist(
+        SuperList(
+            username = username,
+            order = ticket.order,
+            issue_date = ticket.issue_date,
+            supermarket = ticket.supermarket,
+            url = ticket.url,
+            products = products
+        )
+    )
+    if not inserted:
+        raise HTTPError().not_found(message="Data not inserted")
+    invalidate_price_history(username)
+    await report(job, stage="inserted")
+
+    return jsonable_encoder(inserted)
+
+async def run_ocr(job: Job, username: str, payload: dict):
+    try:
+        text = await read_spooled(payload["path"], payload["size"], payload["digest"])
+    except asyncio.CancelledError:
+        # the app is stopping: the image is kept for the next run of the job
+        raise
+    except Exception:
+        os.unlink(payload["path"])
+        raise
+    os.unlink(payload["path"])
+    await report(job, stage="read")
+
+    if job.kind == "receipt":
+        return jsonable_encoder(parse_receipt_text(text))
+
+    return text
+
+HANDLERS = {
+    "ticket": run_ticket,
+    "ocr": run_ocr,
+    "receipt": run_ocr
+}
+
+def error_message(err: Exception) -> str:
+    if isinstance(err, HTTPException) and isinstance(err.detail, dict):
+        return ": ".join(
+            str(err.detail[key]) for key in ("errmsg", "errdetail", "err") if key in err.detail
+        )
+
+    return str(err) or type(err).__name__
+
+async def run_job(job: Job, username: str, payload: dict) -> None:
+    try:
+        result = await HANDLERS[job.kind](job, username, payload)
+    except asyncio.CancelledError:
+        raise
+    except Exception as err:
+        await report(job, status="failed", errmsg=error_message(err))
+    else:
+        await report(job, status="done", result=result)
+
+async def job_worker() -> None:
+    """
+    Runs queued jobs one at a time. When the queue is empty it waits to be
+    woken by an enqueue in this process, or polls every job_poll_interval
+    seconds for jobs enqueued by the other app processes. Errors of the queue
+    itself, e.g. its database locked by another process, are logged and the
+    worker tries again after job_poll_interval.
+    """
+    next_purge = time.monotonic()
+    while True:
+        try:
+            claimed = await run_in_threadpool(job_queue.claim)
+            if claimed:
+                await run_job(*claimed)
+                continue
+
+            if time.monotonic() >= next_purge:
+                await run_in_threadpool(
+                    job_queue.purge, timedelta(seconds=settings.job_retention)
+                )
+                next_purge = time.monotonic() + settings.job_retention / 24
+        except Exception:
+            # a job whose result could not be recorded stays running until
+            # the next start queues it again
+            logger.exception("Job worker error, retrying in %s s", settings.job_poll_interval)
+            await asyncio.sleep(settings.job_poll_interval)
+            continue
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), settings.job_poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+def wake_job_workers() -> None:
+    if _wakeup is not None:
+        _wakeup.set()
+
+async def start_job_workers() -> None:
+    global _wakeup
+    if _workers:
+        return
+
+    await run_in_threadpool(job_queue.requeue_running)
+    _wakeup = asyncio.Event()
+    _workers.extend(
+        asyncio.create_task(job_worker()) for _ in range(settings.job_workers)
+    )
+    _workers.append(asyncio.create_task(poll_events()))
+
+async def stop_job_workers() -> None:
+    """
+    Cancels the workers; the jobs they were running are queued again on the
+    next start.
+    """
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+async def enqueue_job(username: str, kind: str, payload: dict) -> Job:
+    job = await run_in_threadpool(job_queue.enqueue, username, kind, payload)
+    wake_job_workers()
+
+    return job
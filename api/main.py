@@ -2,16 +2,50 @@
 from dotenv import load_dotenv
 
 # FastAPI
-from fastapi import FastAPI, status
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi import FastAPI, Response, status
+from fastapi.responses import HTMLResponse, FileResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
+# config
+from config import settings
+
 # Routers
-from routers import users, token, super_list
+from routers import users, token, super_list, image, jobs
+
+# db
+from db.client import db_client
+
+# e-ticket
+from eticket.fetcher import fetcher
+from eticket.scraper import close_parse_pool
+
+# OCR
+from ocr.pipeline import close_ocr_pool
+
+# jobs
+from jobs.worker import start_job_workers, stop_job_workers
+
+# rate limiting
+from ratelimit import RateLimitMiddleware
+
+# metrics
+from metrics import MetricsMiddleware, render_metrics, track_cache
+
+# caches
+from auth import user_cache
+from price_history import price_histories
 
 load_dotenv()
 
-app = FastAPI()
+# orjson renders dates/datetimes as ISO 8601, the same as jsonable_encoder
+app = FastAPI(default_response_class=ORJSONResponse)
+
+if settings.rate_limit_enabled:
+    app.add_middleware(RateLimitMiddleware)
+# outermost, so rate limited requests are counted too
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+track_cache("users", user_cache)
+track_cache("price_histories", price_histories)
 
 app.mount(
     path = "/docs",
@@ -23,6 +57,23 @@ app.mount(
 app.include_router(token.router)
 app.include_router(users.router)
 app.include_router(super_list.router)
+app.include_router(image.router)
+app.include_router(jobs.router)
+
+
+### EVENTS ###
+
+@app.on_event("startup")
+async def setup_db():
+    await db_client.setup()
+    await start_job_workers()
+
+@app.on_event("shutdown")
+async def close_fetcher():
+    await stop_job_workers()
+    await fetcher.close()
+    close_parse_pool()
+    close_ocr_pool()
 
 
 ### PATH OPERATIONS ###
@@ -35,4 +86,13 @@ async def root():
     return FileResponse(
         path = "./docs/index.html",
         status_code = status.HTTP_200_OK
-    )
\ No newline at end of file
+    )
+
+@app.get(
+        path = "/metrics",
+        include_in_schema = False
+)
+async def metrics():
+    content, media_type = render_metrics()
+
+    return Response(content=content, media_type=media_type)
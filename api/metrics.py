@@ -0,0 +1,203 @@
+# Python
+import os
+import time
+from http import HTTPStatus
+
+# typing
+from typing import Callable, Iterator
+
+# Prometheus
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# pymongo
+from pymongo import monitoring
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to answer an HTTP request",
+    ["method", "route"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests being answered",
+    ["method"],
+    multiprocess_mode = "livesum"
+)
+REQUEST_ERRORS = Counter(
+    "http_request_errors_total",
+    "HTTP requests answered with an error, by status and HTTPError type",
+    ["method", "route", "status", "error"]
+)
+MONGO_LATENCY = Histogram(
+    "mongo_command_duration_seconds",
+    "Time to run a MongoDB command",
+    ["collection", "command"],
+    buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+MONGO_FAILURES = Counter(
+    "mongo_command_failures_total",
+    "MongoDB commands that failed",
+    ["collection", "command"]
+)
+
+UNMATCHED = "unmatched"
+
+
+class CacheCollector:
+    """
+    Exports the hits, misses and size of the in-process TTLCaches registered
+    with track_cache. Each app process reports its own caches.
+    """
+
+    def __init__(self) -> None:
+        self.caches: dict = {}
+
+    def collect(self) -> Iterator:
+        hits = CounterMetricFamily("cache_hits", "Cache lookups that hit", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache lookups that missed", labels=["cache"])
+        size = GaugeMetricFamily("cache_entries", "Entries in the cache", labels=["cache"])
+        for name, cache in self.caches.items():
+            hits.add_metric([name], cache.hits)
+            misses.add_metric([name], cache.misses)
+            size.add_metric([name], len(cache))
+
+        yield from (hits, misses, size)
+
+
+CACHES = CacheCollector()
+REGISTRY.register(CACHES)
+
+
+def track_cache(name: str, cache) -> None:
+    CACHES.caches[name] = cache
+
+
+def error_type(status_code: int) -> str:
+    # the names of the HTTPError helpers: bad_request, not_found, conflict...
+    try:
+        return HTTPStatus(status_code).name.lower()
+    except ValueError:
+        return str(status_code)
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    The metrics in the Prometheus text format. When the app runs in several
+    processes with PROMETHEUS_MULTIPROC_DIR set, they are aggregated over all
+    of them, except the caches: those are the answering process'.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(CACHES)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that times every HTTP request and counts the error
+    responses. Requests are labelled with the path template of the route
+    that answered them, taken from the endpoint the router leaves in the
+    scope, so order ids or descriptions in paths don't make new series.
+    Requests answered before routing (404s, rate limited) are "unmatched".
+    """
+
+    def __init__(self, app, routes: list) -> None:
+        self.app = app
+        self.routes = routes
+        self.paths: dict[Callable, str] = {}
+
+    def route(self, scope: dict) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED
+
+        path = self.paths.get(endpoint)
+        if path is None:
+            # routes are included after the middleware is built
+            self.paths = {
+                getattr(route, "endpoint", None) or getattr(route, "app", None): route.path
+                for route in self.routes
+            }
+            path = self.paths.get(endpoint, UNMATCHED)
+
+        return path
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_status(message: dict) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        error = None
+        try:
+            await self.app(scope, receive, send_status)
+        except Exception as err:
+            error = type(err).__name__
+            raise
+        finally:
+            in_flight.dec()
+            route = self.route(scope)
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            if error or status_code >= 400:
+                REQUEST_ERRORS.labels(
+                    method, route, str(status_code), error or error_type(status_code)
+                ).inc()
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    pymongo command listener, passed to the client in event_listeners, that
+    times every command by collection and command name.
+    """
+
+    def __init__(self) -> None:
+        self.collections: dict[tuple, str] = {}
+
+    @staticmethod
+    def key(event) -> tuple:
+        return event.connection_id, event.request_id
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        # getMore names the cursor id, the collection is apart
+        collection = event.command.get(
+            "collection" if event.command_name == "getMore" else event.command_name
+        )
+        self.collections[self.key(event)] = (
+            collection if isinstance(collection, str) else event.database_name
+        )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection = self.collections.pop(self.key(event), event.database_name)
+        MONGO_LATENCY.labels(collection, event.command_name).observe(
+            event.duration_micros / 1e6
+        )
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection = self.collections.pop(self.key(event), event.database_name)
+        MONGO_LATENCY.labels(collection, event.command_name).observe(
+            event.duration_micros / 1e6
+        )
+        MONGO_FAILURES.labels(collection, event.command_name).inc()
@@ -0,0 +1,158 @@
+# Python
+import os
+import sqlite3
+import threading
+import time
+
+# typing
+from typing import Optional
+
+# Pydantic
+from pydantic import BaseModel
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_results (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ocr_results_last_used ON ocr_results (last_used);
+CREATE TABLE IF NOT EXISTS ocr_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS ocr_results_insert AFTER INSERT ON ocr_results BEGIN
+    UPDATE ocr_stats SET value = value + new.size WHERE name = 'size_bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS ocr_results_update AFTER UPDATE OF size ON ocr_results BEGIN
+    UPDATE ocr_stats SET value = value + new.size - old.size WHERE name = 'size_bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS ocr_results_delete AFTER DELETE ON ocr_results BEGIN
+    UPDATE ocr_stats SET value = value - old.size WHERE name = 'size_bytes';
+END;
+INSERT OR IGNORE INTO ocr_stats (name, value)
+    SELECT 'size_bytes', COALESCE(SUM(size), 0) FROM ocr_results;
+"""
+
+# the least recently used results, until size_bytes - ? bytes are freed
+EVICT = """
+DELETE FROM ocr_results WHERE key IN (
+    SELECT key FROM (
+        SELECT key, SUM(size) OVER (ORDER BY last_used, key) - size AS freed
+        FROM ocr_results
+    )
+    WHERE freed < ?
+)
+"""
+
+
+class OCRCacheStats(BaseModel):
+    entries: int
+    size_bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    hit_rate: float
+    bytes_saved: int # uploads answered without running OCR
+
+
+class OCRCache:
+    """
+    Persistent OCR results in a SQLite file, keyed by image hash:
+        raw:<sha256 of the uploaded bytes>      the same file uploaded again
+        img:<sha256 of the preprocessed image>  the same photo re-encoded,
+                                                resized or with other metadata
+    When the stored texts exceed max_bytes the least recently used ones are
+    evicted. Hits, misses, the upload bytes that skipped OCR and the size of the
+    stored texts, kept by triggers, are counted in the same file, so they
+    survive restarts and add up across processes.
+
+    The OCR workers only read (get); the API process writes.
+    """
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+
+        return connection
+
+    def get(self, key: str) -> Optional[str]:
+        row = self.connection.execute(
+            "SELECT text FROM ocr_results WHERE key = ?", (key,)
+        ).fetchone()
+
+        return row[0] if row else None
+
+    def set(self, keys: list[str], text: str) -> None:
+        size = len(text.encode())
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO ocr_results (key, text, size, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET "
+                "text = excluded.text, size = excluded.size, last_used = excluded.last_used",
+                [(key, text, size, now) for key in keys]
+            )
+        self.evict()
+
+    def touch(self, key: str) -> None:
+        self.connection.execute(
+            "UPDATE ocr_results SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+
+    def size(self) -> int:
+        return self.connection.execute(
+            "SELECT value FROM ocr_stats WHERE name = 'size_bytes'"
+        ).fetchone()[0]
+
+    def evict(self) -> int:
+        """
+        Deletes the least recently used results until the texts fit in max_bytes.
+        Returns the number of deleted results.
+        """
+        total = self.size()
+        if total <= self.max_bytes:
+            return 0
+
+        with self.connection:
+            return self.connection.execute(EVICT, (total - self.max_bytes,)).rowcount
+
+    def record(self, hit: bool, upload_bytes: int) -> None:
+        counters = [("hits", 1), ("bytes_saved", upload_bytes)] if hit else [("misses", 1)]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO ocr_stats (name, value) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                counters
+            )
+
+    def stats(self) -> OCRCacheStats:
+        counters = dict(self.connection.execute("SELECT name, value FROM ocr_stats"))
+        entries = self.connection.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+
+        return OCRCacheStats(
+            entries = entries,
+            size_bytes = counters["size_bytes"],
+            max_bytes = self.max_bytes,
+            hits = hits,
+            misses = misses,
+            hit_rate = hits / (hits + misses) if hits + misses else 0.0,
+            bytes_saved = counters.get("bytes_saved", 0)
+        )
@@ -0,0 +1,138 @@
+# Python
+import hashlib
+from functools import lru_cache
+
+# typing
+from typing import Optional
+
+# Pillow
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# PyTesseract
+import pytesseract
+
+# OCR
+from .cache import OCRCache
+
+
+ORIENTATION = 0x0112 # EXIF tag
+
+
+class InvalidImage(Exception):
+    pass
+
+class OCRUnavailable(Exception):
+    pass
+
+
+def otsu_threshold(image: Image.Image) -> int:
+    """
+    The gray level that best splits the histogram of image into ink and paper.
+    """
+    histogram = image.histogram()
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+
+    best_level, best_variance = 127, -1.0
+    background = weighted_background = 0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+
+    return best_level
+
+def preprocess(image: Image.Image, max_width: int) -> Image.Image:
+    """
+    Prepares a receipt photo for Tesseract: upright, at most max_width pixels
+    wide, grayscale with stretched contrast and binarized with Otsu's threshold.
+    """
+    if image.getexif().get(ORIENTATION, 1) != 1:
+        image = ImageOps.exif_transpose(image)
+
+    image = ImageOps.grayscale(image)
+    if image.width > max_width:
+        # box filter: every output pixel averages the area it covers
+        image = image.resize(
+            (max_width, max(1, round(image.height * max_width / image.width))),
+            Image.Resampling.BOX
+        )
+
+    image = ImageOps.autocontrast(image)
+    threshold = otsu_threshold(image)
+
+    return image.point([0 if level <= threshold else 255 for level in range(256)], mode="1")
+
+def load_image(path: str, max_width: int) -> Image.Image:
+    """
+    Decodes and preprocesses the image at path.
+    """
+    try:
+        with Image.open(path) as image:
+            # JPEG: let the decoder downscale while reading
+            image.draft("L", (max_width, max_width * 8))
+            return preprocess(image, max_width)
+    except UnidentifiedImageError:
+        raise InvalidImage("Unknown image format")
+    except (Image.DecompressionBombError, OSError) as err:
+        raise InvalidImage(str(err))
+
+def image_key(image: Image.Image, lang: Optional[str] = None) -> str:
+    """
+    Cache key of a preprocessed image: photos that only differ in encoding,
+    metadata, orientation tag or size above max_width binarize to the same
+    pixels.
+    """
+    digest = hashlib.sha256(f"{lang}:{image.width}x{image.height}:".encode())
+    digest.update(image.tobytes())
+
+    return f"img:{digest.hexdigest()}"
+
+def image_to_text(image: Image.Image, lang: Optional[str] = None) -> str:
+    try:
+        return pytesseract.image_to_string(image, lang=lang, config="--psm 6")
+    except pytesseract.TesseractNotFoundError:
+        raise OCRUnavailable("tesseract is not installed")
+    except pytesseract.TesseractError as err:
+        raise OCRUnavailable(f"tesseract failed: {err.message}")
+
+def ocr_file(path: str, max_width: int, lang: Optional[str] = None) -> str:
+    """
+    Decodes, preprocesses and reads the image at path. Runs in the OCR worker
+    processes, so it only raises exceptions that can be pickled back.
+    """
+    return image_to_text(load_image(path, max_width), lang)
+
+@lru_cache
+def worker_cache(cache_path: str) -> OCRCache:
+    # the workers only read, eviction is up to the API process
+    return OCRCache(cache_path, max_bytes=0)
+
+def ocr_file_cached(
+    path: str,
+    max_width: int,
+    lang: Optional[str],
+    cache_path: str
+) -> tuple[str, str, bool]:
+    """
+    Like ocr_file, but looks the preprocessed image up in the OCR cache before
+    running Tesseract. Returns the text, the image cache key and whether it
+    was a hit; storing new results is left to the caller.
+    """
+    image = load_image(path, max_width)
+    key = image_key(image, lang)
+    text = worker_cache(cache_path).get(key)
+    if text is not None:
+        return text, key, True
+
+    return image_to_text(image, lang), key, False
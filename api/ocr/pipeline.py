@@ -0,0 +1,152 @@
+# Python
+import asyncio
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+# typing
+from typing import Optional
+
+# FastAPI
+from fastapi import HTTPException, UploadFile, status
+
+# starlette
+from starlette.concurrency import run_in_threadpool
+
+# config
+from config import settings
+
+# OCR
+from .cache import OCRCache
+from .images import InvalidImage, OCRUnavailable, ocr_file_cached
+
+
+CHUNK_SIZE = 64 * 1024
+
+_ocr_pool: Optional[ProcessPoolExecutor] = None
+_ocr_cache: Optional[OCRCache] = None
+ocr_jobs = 0
+
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    global _ocr_pool
+    if _ocr_pool is None:
+        _ocr_pool = ProcessPoolExecutor(max_workers=settings.ocr_workers)
+
+    return _ocr_pool
+
+def close_ocr_pool() -> None:
+    global _ocr_pool
+    if _ocr_pool is not None:
+        _ocr_pool.shutdown(cancel_futures=True)
+        _ocr_pool = None
+
+def get_ocr_cache() -> OCRCache:
+    global _ocr_cache
+    if _ocr_cache is None:
+        _ocr_cache = OCRCache(settings.ocr_cache_path, settings.ocr_cache_max_bytes)
+
+    return _ocr_cache
+
+async def spool_upload(upload: UploadFile) -> tuple[str, int, str]:
+    """
+    Copies the upload, chunk by chunk, to a named temporary file, so the OCR
+    workers read the image from disk instead of receiving it pickled, and
+    returns its path, size and SHA-256. Uploads over settings.ocr_max_bytes
+    are rejected with a 413.
+    """
+    spool = tempfile.NamedTemporaryFile(prefix="receipt-", delete=False)
+    digest = hashlib.sha256()
+    try:
+        size = 0
+        while chunk := await upload.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > settings.ocr_max_bytes:
+                raise HTTPException(
+                    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail = {
+                        "errmsg": f"Images up to {settings.ocr_max_bytes} bytes"
+                    }
+                )
+            digest.update(chunk)
+            await run_in_threadpool(spool.write, chunk)
+    except BaseException:
+        spool.close()
+        os.unlink(spool.name)
+        raise
+
+    spool.close()
+
+    return spool.name, size, digest.hexdigest()
+
+async def read_spooled(path: str, size: int, digest: str) -> str:
+    """
+    Returns the text of a spooled receipt image. Decoding, preprocessing and
+    Tesseract run in the OCR process pool.
+
+    Results are cached by the hash of the uploaded bytes, so a duplicate upload
+    skips the pool, and by the hash of the preprocessed image, so the same
+    photo sent again re-encoded skips Tesseract.
+    """
+    cache = get_ocr_cache()
+    raw_key = f"raw:{settings.ocr_lang}:{settings.ocr_max_width}:{digest}"
+    text = await run_in_threadpool(cache.get, raw_key)
+    if text is not None:
+        await run_in_threadpool(cache.touch, raw_key)
+        await run_in_threadpool(cache.record, True, size)
+        return text
+
+    text, image_key, hit = await asyncio.get_running_loop().run_in_executor(
+        get_ocr_pool(),
+        ocr_file_cached,
+        path,
+        settings.ocr_max_width,
+        settings.ocr_lang,
+        settings.ocr_cache_path
+    )
+    await run_in_threadpool(cache.set, [raw_key, image_key], text)
+    await run_in_threadpool(cache.record, hit, size)
+
+    return text
+
+async def read_text(upload: UploadFile) -> str:
+    """
+    Returns the text of an uploaded receipt image. When the OCR workers and
+    queue are full the request is rejected at once with a 503.
+    """
+    global ocr_jobs
+    if ocr_jobs >= settings.ocr_workers + settings.ocr_queue_depth:
+        raise HTTPException(
+            status_code = status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers = {"Retry-After": "5"},
+            detail = {
+                "errmsg": "Too many images being read, try again later"
+            }
+        )
+
+    ocr_jobs += 1
+    path = None
+    try:
+        path, size, digest = await spool_upload(upload)
+        return await read_spooled(path, size, digest)
+    except InvalidImage as err:
+        raise HTTPException(
+            status_code = status.HTTP_400_BAD_REQUEST,
+            detail = {
+                "errmsg": "Invalid image",
+                "errdetail": str(err)
+            }
+        )
+    except OCRUnavailable as err:
+        raise HTTPException(
+            status_code = status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail = {
+                "errmsg": "OCR not available",
+                "errdetail": str(err)
+            }
+        )
+    finally:
+        ocr_jobs -= 1
+        if path:
+            os.unlink(path)
@@ -0,0 +1,105 @@
+# Python
+import re
+
+# models
+from db.models.supermarket_list import Products
+
+
+NUMBER = r"\d+(?:[.,]\d+)*"
+
+# "tomato 2 x 13,25 26,50", "tomato 2 * 13.25"
+ITEM_WITH_UNITS = re.compile(
+    rf"^(?P<description>.*?[^\W\d_].*?)\s+(?P<units>{NUMBER})\s*[xX*]\s*\$?\s*(?P<price>{NUMBER})(?:\s+\$?\s*{NUMBER})?$"
+)
+# "2 x 13,25" under or over its description line
+UNITS_ONLY = re.compile(rf"^(?P<units>{NUMBER})\s*[xX*]\s*\$?\s*(?P<price>{NUMBER})(?:\s+\$?\s*{NUMBER})?$")
+# "tomato 13,25"
+ITEM = re.compile(rf"^(?P<description>.*?[^\W\d_].*?)\s+\$?\s*(?P<price>{NUMBER})$")
+
+SKIP = re.compile(r"\b(total|subtotal|iva|vuelto|cambio|efectivo|tarjeta|descuento)\b", re.IGNORECASE)
+
+
+def parse_number(text: str) -> float:
+    """
+    Parses "1.234,56", "1,234.56", "13,25" and "13.25".
+    """
+    if "," in text and "." in text:
+        decimal = "," if text.rindex(",") > text.rindex(".") else "."
+    elif "," in text:
+        decimal = ","
+    else:
+        decimal = "." if text.count(".") == 1 else ""
+
+    thousands = {",": ".", ".": ",", "": "."}[decimal]
+    text = text.replace(thousands, "")
+    if decimal:
+        text = text.replace(decimal, ".")
+
+    return float(text)
+
+def parse_receipt_text(text: str) -> list[Products]:
+    """
+    Turns the OCR text of a receipt into products. Understands one item per line
+    ("description units x price [total]" or "description price") and the
+    two-line layout where "units x price" is printed next to the description.
+    Totals, taxes and payment lines are skipped.
+    """
+    products = []
+    pending_description = None
+    pending_units = None
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if not line or SKIP.search(line):
+            pending_description = pending_units = None
+            continue
+
+        match = ITEM_WITH_UNITS.match(line)
+        if match:
+            products.append(
+                Products(
+                    description = match["description"],
+                    units = parse_number(match["units"]),
+                    price = parse_number(match["price"])
+                )
+            )
+            pending_description = pending_units = None
+            continue
+
+        match = UNITS_ONLY.match(line)
+        if match:
+            if pending_description:
+                products.append(
+                    Products(
+                        description = pending_description,
+                        units = parse_number(match["units"]),
+                        price = parse_number(match["price"])
+                    )
+                )
+                pending_description = None
+            else:
+                pending_units = match
+            continue
+
+        if pending_units:
+            # "2 x 13,25" came first: this line is its description (maybe with the total)
+            description = ITEM.match(line)
+            products.append(
+                Products(
+                    description = description["description"] if description else line,
+                    units = parse_number(pending_units["units"]),
+                    price = parse_number(pending_units["price"])
+                )
+            )
+            pending_units = None
+            continue
+
+        match = ITEM.match(line)
+        if match:
+            products.append(
+                Products(description=match["description"], units=1, price=parse_number(match["price"]))
+            )
+            pending_description = None
+        elif re.search(r"[^\W\d_]", line):
+            pending_description = line
+
+    return products
@@ -0,0 +1,238 @@
+# Python
+from datetime import date
+from functools import cached_property
+
+# typing
+from typing import Iterable, Optional
+
+# NumPy
+import numpy as np
+
+# cache
+from cache import TTLCache
+
+# config
+from config import settings
+
+# db
+from db.base import Database
+
+# product search
+from product_search import ProductSearchIndex
+
+# models
+from db.models.analytics import InflationPoint, MovingAveragePoint, PriceVolatility
+
+
+class PriceHistory:
+    """
+    The line items of a user as columnar NumPy arrays, one entry per product of
+    every available super list. Descriptions are stored as integer codes into
+    self.descriptions, so every metric is a handful of vectorized passes
+    (bincount, cumsum, searchsorted) over the arrays instead of a Python loop.
+    """
+
+    def __init__(
+        self,
+        descriptions: Iterable[str],
+        days: Iterable[str],
+        units: Iterable[float],
+        prices: Iterable[float]
+    ) -> None:
+        self.descriptions, self.products = np.unique(
+            np.array(list(descriptions), dtype=str), return_inverse=True
+        )
+        self.days = np.array(list(days), dtype="datetime64[D]")
+        self.units = np.array(list(units), dtype=float)
+        self.prices = np.array(list(prices), dtype=float)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    @cached_property
+    def search_index(self) -> ProductSearchIndex:
+        return ProductSearchIndex(self.descriptions)
+
+    @classmethod
+    def from_super_lists(cls, super_lists: Iterable[dict]) -> "PriceHistory":
+        descriptions, days, units, prices = [], [], [], []
+        for super_list in super_lists:
+            day = str(super_list["issue_date"])
+            for product in super_list["products"]:
+                descriptions.append(product["description"])
+                days.append(day)
+                units.append(product["units"])
+                prices.append(product["price"])
+
+        return cls(descriptions, days, units, prices)
+
+    def _period(self, start: Optional[date], end: Optional[date]) -> np.ndarray:
+        mask = np.ones(len(self), dtype=bool)
+        if start:
+            mask &= self.days >= np.datetime64(start, "D")
+        if end:
+            mask &= self.days <= np.datetime64(end, "D")
+
+        return mask
+
+    def inflation_index(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> list[InflationPoint]:
+        """
+        Personal monthly price index, chained: each month is compared with the
+        previous one over the products bought in both, weighted by what was spent
+        on them the previous month. The first month is 100.
+        """
+        mask = self._period(start, end)
+        if not mask.any():
+            return []
+
+        months, month_codes = np.unique(
+            self.days[mask].astype("datetime64[M]"), return_inverse=True
+        )
+        products = self.products[mask]
+        units = self.units[mask]
+        n_months = len(months)
+        size = len(self.descriptions) * n_months
+
+        cells = products * n_months + month_codes
+        spend = np.bincount(cells, weights=units * self.prices[mask], minlength=size)
+        quantity = np.bincount(cells, weights=units, minlength=size)
+        spend = spend.reshape(-1, n_months)
+        quantity = quantity.reshape(-1, n_months)
+        average = np.divide(
+            spend, quantity, out=np.zeros_like(spend), where=quantity > 0
+        )
+
+        both = (average[:, :-1] > 0) & (average[:, 1:] > 0)
+        weights = np.where(both, spend[:, :-1], 0)
+        ratios = np.divide(
+            average[:, 1:], average[:, :-1], out=np.zeros_like(weights), where=both
+        )
+        total_weight = weights.sum(axis=0)
+        links = np.divide(
+            (weights * ratios).sum(axis=0),
+            total_weight,
+            out = np.ones_like(total_weight),
+            where = total_weight > 0
+        )
+
+        index = 100 * np.concatenate(([1.0], np.cumprod(links)))
+        priced = np.concatenate(([(average[:, 0] > 0).sum()], both.sum(axis=0)))
+
+        return [
+            InflationPoint(month=str(month), index=round(float(value), 4), products=int(count))
+            for month, value, count in zip(months, index, priced)
+        ]
+
+    def volatility(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        min_purchases: int = 2,
+        limit: int = 20
+    ) -> list[PriceVolatility]:
+        """
+        Spread of the unit price paid for each product, most volatile first.
+        """
+        mask = self._period(start, end)
+        products = self.products[mask]
+        prices = self.prices[mask]
+        size = len(self.descriptions)
+
+        purchases = np.bincount(products, minlength=size)
+        totals = np.bincount(products, weights=prices, minlength=size)
+        squares = np.bincount(products, weights=prices * prices, minlength=size)
+
+        enough = purchases >= max(min_purchases, 1)
+        mean = np.divide(totals, purchases, out=np.zeros(size), where=enough)
+        variance = np.divide(squares, purchases, out=np.zeros(size), where=enough) - mean ** 2
+        std = np.sqrt(np.clip(variance, 0, None))
+        variation = np.divide(std, mean, out=np.zeros(size), where=enough & (mean > 0))
+
+        codes = np.flatnonzero(enough)
+        codes = codes[np.lexsort((codes, -variation[codes]))][:limit]
+
+        return [
+            PriceVolatility(
+                description = str(self.descriptions[code]),
+                purchases = int(purchases[code]),
+                mean_price = round(float(mean[code]), 4),
+                std_price = round(float(std[code]), 4),
+                coefficient_of_variation = round(float(variation[code]), 4)
+            )
+            for code in codes
+        ]
+
+    def moving_average(
+        self,
+        product_description: str,
+        window: int = 7,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> list[MovingAveragePoint]:
+        """
+        Average unit price paid for the product on each day it was bought, with
+        the mean of those daily prices over the last window calendar days.
+        """
+        code = np.searchsorted(self.descriptions, product_description)
+        if code == len(self.descriptions) or self.descriptions[code] != product_description:
+            return []
+
+        mask = self._period(start, end) & (self.products == code)
+        if not mask.any():
+            return []
+
+        days, day_codes = np.unique(self.days[mask], return_inverse=True)
+        units = self.units[mask]
+        spend = np.bincount(day_codes, weights=units * self.prices[mask])
+        quantity = np.bincount(day_codes, weights=units)
+        lines = np.bincount(day_codes)
+        # days with no units fall back to the plain mean of the prices
+        daily = np.where(
+            quantity > 0,
+            np.divide(spend, quantity, out=np.zeros_like(spend), where=quantity > 0),
+            np.bincount(day_codes, weights=self.prices[mask]) / lines
+        )
+
+        positions = np.arange(len(days))
+        first = np.searchsorted(days, days - np.timedelta64(window - 1, "D"))
+        cumulative = np.concatenate(([0.0], np.cumsum(daily)))
+        average = (cumulative[positions + 1] - cumulative[first]) / (positions + 1 - first)
+
+        return [
+            MovingAveragePoint(
+                day = day.astype(date),
+                price = round(float(price), 4),
+                moving_average = round(float(value), 4)
+            )
+            for day, price, value in zip(days, daily, average)
+        ]
+
+
+# username -> PriceHistory, loaded once and shared by the analytics endpoints
+price_histories = TTLCache(
+    maxsize = settings.price_history_cache_size,
+    ttl = settings.price_history_cache_ttl
+)
+
+async def get_price_history(db_client: Database, username: str) -> PriceHistory:
+    price_history = price_histories.get(username)
+    if price_history is None:
+        price_history = PriceHistory.from_super_lists(
+            [
+                super_list
+                async for super_list in db_client.iter_superlists_for_user(
+                    username = username,
+                    fields = ["issue_date", "products"]
+                )
+            ]
+        )
+        price_histories.set(username, price_history)
+
+    return price_history
+
+def invalidate_price_history(username: str) -> None:
+    price_histories.pop(username)
@@ -0,0 +1,145 @@
+# typing
+from typing import Iterable
+
+# NumPy
+import numpy as np
+
+# models
+from db.models.analytics import ProductMatch
+from db.models.supermarket_list import normalize_description
+
+
+PAD = ord(" ")
+CANDIDATES = 500
+COMMON = 0.2 # fraction of the descriptions
+
+
+def trigram_codes(text: bytes) -> set[int]:
+    padded = b"  " + text + b" "
+    return {
+        (padded[i] << 16) | (padded[i + 1] << 8) | padded[i + 2]
+        for i in range(len(padded) - 2)
+    }
+
+
+class ProductSearchIndex:
+    """
+    Prefix and fuzzy search over a set of normalized product descriptions.
+
+    The descriptions are kept sorted, so a prefix is a binary search. For fuzzy
+    matching every description is split into byte trigrams (padded with two
+    leading spaces and a trailing one, so word starts weigh more) stored as a
+    posting list per trigram in two flat arrays. A query counts the trigrams it
+    shares with each description with one bincount over its posting lists, and
+    scores them by Jaccard similarity.
+    """
+
+    def __init__(self, descriptions: Iterable[str]) -> None:
+        self.descriptions = np.unique(np.array(list(descriptions), dtype=str))
+        encoded = np.char.encode(self.descriptions, "utf-8")
+        lengths = np.char.str_len(encoded)
+        width = int(lengths.max()) if len(encoded) else 0
+
+        # one row per description: "  " + utf-8 bytes + " " + zeros
+        rows = np.zeros((len(encoded), width + 3), dtype=np.uint32)
+        rows[:, :2] = PAD
+        if width:
+            rows[:, 2:width + 2] = np.frombuffer(
+                encoded.astype(f"S{width}").tobytes(), dtype=np.uint8
+            ).reshape(len(encoded), width)
+        rows[np.arange(len(encoded)), lengths + 2] = PAD
+
+        codes = (rows[:, :-2] << 16) | (rows[:, 1:-1] << 8) | rows[:, 2:]
+        valid = np.arange(width + 1) < (lengths + 1)[:, None]
+        documents = np.broadcast_to(np.arange(len(encoded))[:, None], codes.shape)
+
+        pairs = np.unique(
+            (codes[valid].astype(np.int64) << 32) | documents[valid].astype(np.int64)
+        )
+        self.postings = (pairs & 0xFFFFFFFF).astype(np.int32)
+        self.trigrams, self.offsets = np.unique(pairs >> 32, return_index=True)
+        self.offsets = np.append(self.offsets, len(pairs))
+        self.trigram_counts = np.bincount(self.postings, minlength=len(encoded))
+
+    def __len__(self) -> int:
+        return len(self.descriptions)
+
+    def prefix(self, query: str, limit: int) -> np.ndarray:
+        first = np.searchsorted(self.descriptions, query, side="left")
+        last = np.searchsorted(self.descriptions, query + "\U0010ffff", side="left")
+
+        return np.arange(first, min(last, first + limit))
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        min_similarity: float = 0.3
+    ) -> list[ProductMatch]:
+        """
+        Returns the best matches for query: descriptions that start with it, then
+        descriptions with a word that starts with it, then fuzzy matches by
+        trigram similarity, at most limit in total.
+        """
+        query = normalize_description(query)
+        if not query or not len(self):
+            return []
+
+        matches = [
+            ProductMatch(description=str(self.descriptions[code]), score=1.0, match="prefix")
+            for code in self.prefix(query, limit)
+        ]
+        if len(matches) == limit:
+            return matches
+
+        query_codes = trigram_codes(query.encode())
+        starts = np.searchsorted(self.trigrams, list(query_codes))
+        postings = sorted(
+            (
+                self.postings[self.offsets[start]:self.offsets[start + 1]]
+                for start, code in zip(starts, query_codes)
+                if start < len(self.trigrams) and self.trigrams[start] == code
+            ),
+            key = len
+        )
+        if not postings:
+            return matches
+
+        # trigrams in most descriptions ("the", " br", ...) barely rank anything
+        # and dominate the cost: they are assumed shared instead of counted
+        common = max(len(self) * COMMON, 10_000)
+        rare = [posting for posting in postings if len(posting) <= common] or postings[:1]
+        assumed = len(postings) - len(rare)
+
+        shared = np.bincount(np.concatenate(rare), minlength=len(self))
+        candidates = np.flatnonzero(shared)
+        shared = shared[candidates] + assumed
+        similarity = shared / (len(query_codes) + self.trigram_counts[candidates] - shared)
+        # word matches share all the query trigrams but the first, so they are
+        # among the most similar candidates: only those are checked
+        if len(candidates) > CANDIDATES:
+            best = np.argpartition(-similarity, CANDIDATES)[:CANDIDATES]
+            candidates, similarity = candidates[best], similarity[best]
+
+        seen = {match.description for match in matches}
+        word = np.char.find(self.descriptions[candidates], " " + query) >= 0
+        ranked = np.lexsort((candidates, -similarity, ~word))
+        for position in ranked:
+            if len(matches) == limit:
+                break
+            if not word[position] and similarity[position] < min_similarity:
+                break
+
+            description = str(self.descriptions[candidates[position]])
+            if description in seen:
+                continue
+
+            matches.append(
+                ProductMatch(
+                    description = description,
+                    score = round(float(similarity[position]), 4),
+                    match = "word" if word[position] else "fuzzy"
+                )
+            )
+
+        return matches
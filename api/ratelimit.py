@@ -0,0 +1,144 @@
+# Python
+import math
+import time
+from collections import OrderedDict
+
+# typing
+from typing import Hashable, Optional
+
+# orjson
+import orjson
+
+# JWT
+from jose import jwt, JWTError
+
+# cache
+from cache import TTLCache
+
+# config
+from config import settings
+
+# auth
+from auth import ALGORITHM, JWT_SECRETKEY
+
+
+class TokenBuckets:
+    """
+    Token buckets in an LRU map: each key stores only its tokens and the time
+    they were counted, refilled lazily on the next request. When maxsize keys
+    are tracked the least recently seen is evicted; it starts full again if it
+    comes back, which only forgives a client idle long enough to fall out.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[Hashable, list[float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: Hashable, rate: float, burst: int, now: Optional[float] = None) -> float:
+        """
+        Takes a token from the bucket of key, refilled at rate tokens per second
+        up to burst. Returns 0 when there was one, or the seconds until there is.
+        """
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now]
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+
+        return (1 - bucket[0]) / rate
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware that admits each HTTP request against a token bucket per
+    client and budget. The client is the user of a valid bearer token (its
+    JWT sub) or else the client IP; the budget is the route's entry in
+    settings.rate_limit_budgets ("METHOD /path": [rate per second, burst]) or
+    the default one. Routes without a budget get a default bucket per method
+    and first path segment, so a busy router doesn't starve the others and
+    ids in paths don't make new buckets. The paths in rate_limit_exempt, the
+    metrics scrape and the docs, are not limited. Rejected requests get a
+    429 with Retry-After and never reach the app.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self.buckets = TokenBuckets(maxsize=settings.rate_limit_max_clients)
+        self.budgets = {
+            route.rstrip("/") or "/": (float(rate), int(burst))
+            for route, (rate, burst) in settings.rate_limit_budgets.items()
+        }
+        self.default = (settings.rate_limit_rate, settings.rate_limit_burst)
+        self.exempt = {path.rstrip("/") or "/" for path in settings.rate_limit_exempt}
+        # verifying the signature on every request costs more than the bucket
+        self.subjects = TTLCache(maxsize=settings.rate_limit_max_clients, ttl=60)
+
+    def subject(self, token: str) -> str:
+        subject = self.subjects.get(token)
+        if subject is None:
+            try:
+                subject = jwt.decode(
+                    token, JWT_SECRETKEY, algorithms=[ALGORITHM]
+                ).get("sub") or ""
+            except JWTError:
+                subject = ""
+            self.subjects.set(token, subject)
+
+        return subject
+
+    def client(self, scope: dict) -> str:
+        headers = dict(scope["headers"])
+        authorization = headers.get(b"authorization", b"")
+        if authorization[:7].lower() == b"bearer ":
+            subject = self.subject(authorization[7:].decode("latin-1"))
+            if subject:
+                return f"user:{subject}"
+
+        forwarded = headers.get(b"x-forwarded-for")
+        if forwarded and settings.rate_limit_trust_forwarded:
+            # the last address is the one our proxy saw
+            return "ip:" + forwarded.decode("latin-1").rsplit(",", 1)[-1].strip()
+
+        return f"ip:{scope['client'][0] if scope.get('client') else ''}"
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        path = scope["path"].rstrip("/") or "/"
+        route = f"{scope['method']} {path}"
+        budget = self.budgets.get(route)
+        if budget is None:
+            if path in self.exempt:
+                return await self.app(scope, receive, send)
+
+            route = f"* {scope['method']} /{path.split('/', 2)[1]}"
+            budget = self.default
+
+        wait = self.buckets.acquire((route, self.client(scope)), *budget)
+        if not wait:
+            return await self.app(scope, receive, send)
+
+        body = orjson.dumps({"detail": {"errmsg": "Too many requests, try again later"}})
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(wait)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
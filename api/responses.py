@@ -0,0 +1,33 @@
+# typing
+from typing import Any
+
+# FastAPI
+from fastapi.responses import ORJSONResponse
+
+# Pydantic
+from pydantic import BaseModel
+
+# orjson
+import orjson
+
+
+def model_fields(value: Any) -> dict:
+    if isinstance(value, BaseModel):
+        return value.__dict__
+
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class ModelResponse(ORJSONResponse):
+    """
+    Renders content with orjson straight from Pydantic models (trusted reads
+    built with db.serializers), without .dict(), jsonable_encoder or the
+    response_model revalidation: orjson walks each model's field values.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default = model_fields,
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
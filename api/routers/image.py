@@ -1,19 +1,49 @@
+# Python
+import os
+
 # FastAPI
-from fastapi import APIRouter, UploadFile, File
-from fastapi import HTTPException, status
+from fastapi import APIRouter, UploadFile, File, Depends, Query
+from fastapi import status
+from fastapi.responses import PlainTextResponse
+
+# auth
+from auth import get_current_user
+
+# starlette
+from starlette.concurrency import run_in_threadpool
 
-# Pillow
-from PIL import Image
+# OCR
+from ocr.cache import OCRCacheStats
+from ocr.pipeline import get_ocr_cache, read_text, spool_upload
 
-# PyTesseract
-import pytesseract
+# jobs
+from routers.jobs import ACCEPTED, accepted_job
+from ocr.receipt import parse_receipt_text
+
+# models
+from db.models.user import User
+from db.models.supermarket_list import Products
 
 router = APIRouter(
-    deprecated = True, ### DEPRECATED
     prefix = "/image",
-    responses = {status.HTTP_409_CONFLICT: {"error": "Raw image"}}
+    responses = {
+        status.HTTP_400_BAD_REQUEST: {"error": "Invalid image"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"error": "OCR busy or not available"}
+    }
 )
 
+async def accept_image(username: str, kind: str, image: UploadFile):
+    """
+    Spools the upload, which the job deletes once read, and queues the job.
+    When the job can't be queued the spooled upload is deleted here.
+    """
+    path, size, digest = await spool_upload(image)
+    try:
+        return await accepted_job(username, kind, {"path": path, "size": size, "digest": digest})
+    except BaseException:
+        os.unlink(path)
+        raise
+
 ### PATH OPERATIONS ###
 
 ## read image ##
@@ -33,13 +63,51 @@ async def read_image(image :UploadFile = File(...)):
 @router.post(
     path="/read/",
     status_code = status.HTTP_200_OK,
+    response_class = PlainTextResponse,
     summary = "Convert image to text",
+    description = "With background=true the image is read by a background job "
+        "and the response is a 202 with the job",
+    responses = ACCEPTED,
     tags = ["Image"]
 )
 async def convert_image(
-    image :UploadFile = File(...)
+    current_user: User = Depends(get_current_user),
+    image :UploadFile = File(...),
+    background: bool = Query(default=False)
 ):
-    # img = Image.open("")
-    text = pytesseract.image_to_string(image)
+    if background:
+        return await accept_image(current_user.username, "ocr", image)
+
+    return await read_text(image)
 
-    return text
\ No newline at end of file
+## receipt image -> products ##
+@router.post(
+    path="/receipt",
+    status_code = status.HTTP_200_OK,
+    response_model = list[Products],
+    summary = "Read the products of a receipt photo",
+    description = "With background=true the receipt is read by a background job "
+        "and the response is a 202 with the job",
+    responses = ACCEPTED,
+    tags = ["Image"]
+)
+async def read_receipt(
+    current_user: User = Depends(get_current_user),
+    image :UploadFile = File(...),
+    background: bool = Query(default=False)
+):
+    if background:
+        return await accept_image(current_user.username, "receipt", image)
+
+    return parse_receipt_text(await read_text(image))
+
+## OCR cache stats ##
+@router.get(
+    path="/cache/stats",
+    status_code = status.HTTP_200_OK,
+    response_model = OCRCacheStats,
+    summary = "Hit rate and bytes saved by the OCR cache",
+    tags = ["Image"]
+)
+async def ocr_cache_stats(current_user: User = Depends(get_current_user)):
+    return await run_in_threadpool(get_ocr_cache().stats)
@@ -0,0 +1,118 @@
+# Python
+import asyncio
+
+# typing
+from typing import Optional
+
+# FastAPI
+from fastapi import APIRouter, Path, Query, Depends, HTTPException, WebSocket
+from fastapi import WebSocketDisconnect, status
+
+# starlette
+from starlette.concurrency import run_in_threadpool
+
+# websockets
+from websockets.exceptions import ConnectionClosed
+
+# exceptions
+from exceptions import HTTPError
+
+# responses
+from responses import ModelResponse
+
+# auth
+from auth import get_current_user
+
+# jobs
+from jobs.events import broker
+from jobs.queue import job_queue
+from jobs.worker import enqueue_job
+
+# models
+from db.models.user import User
+from db.models.job import Job
+
+
+router = APIRouter(
+    prefix = "/jobs",
+    responses = {status.HTTP_404_NOT_FOUND: {"error": "Job not found"}}
+)
+
+# documents the 202 of the endpoints that accept background=true
+ACCEPTED = {status.HTTP_202_ACCEPTED: {"model": Job, "description": "Job queued"}}
+
+
+async def accepted_job(username: str, kind: str, payload: dict) -> ModelResponse:
+    """
+    Queues a background job and answers 202 with it; its progress and result
+    are at the Location url.
+    """
+    job = await enqueue_job(username, kind, payload)
+
+    return ModelResponse(
+        job,
+        status_code = status.HTTP_202_ACCEPTED,
+        headers = {"Location": f"{router.prefix}/{job.id}"}
+    )
+
+## PATH OPERATIONS ##
+
+### Show a job ###
+@router.get(
+    path = "/{job_id}",
+    status_code = status.HTTP_200_OK,
+    response_model = Job,
+    summary = "Show the status, stage and result of a background job",
+    tags = ["Jobs"]
+)
+async def show_job(
+    current_user: User = Depends(get_current_user),
+    job_id: str = Path(...)
+):
+    job = await run_in_threadpool(job_queue.get, job_id, current_user.username)
+    if not job:
+        raise HTTPError().not_found(message="Job not found")
+
+    return ModelResponse(job)
+
+### Job events ###
+@router.websocket(path="/events")
+async def job_events(
+    websocket: WebSocket,
+    token: Optional[str] = Query(default=None)
+):
+    """
+    Pushes the events of the user's jobs (fetched, parsed, inserted, read,
+    done and failed) as JSON messages while the socket is open. Browsers
+    can't set the Authorization header on a WebSocket, so the token can be
+    sent as a query parameter instead.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    try:
+        if not token:
+            raise HTTPError().bad_request(message="Token not recived")
+        current_user = await get_current_user(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    with broker.subscribe(current_user.username) as events:
+        async def wait_close():
+            # nothing is expected from the client, only its disconnect
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+            broker.put(events, None)
+
+        closed = asyncio.create_task(wait_close())
+        try:
+            while (event := await events.get()) is not None:
+                await websocket.send_text(event.json())
+        except (WebSocketDisconnect, ConnectionClosed, RuntimeError):
+            # the client went away while sending: RuntimeError when the
+            # socket was already closed, ConnectionClosed from the server
+            pass
+        finally:
+            closed.cancel()
@@ -1,29 +1,61 @@
 # Python
 from datetime import date, timedelta
+from typing import Optional
+
+# config
+from config import settings
 
 # FastAPI
-from fastapi import APIRouter, Path, Body, Query, Depends
+from fastapi import APIRouter, Path, Body, Query, Header, Depends
 from fastapi import status
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 
-# Requests
-import requests
+# pydantic
+from pydantic import ValidationError
 
-# Beautifulsoap4
-from bs4 import BeautifulSoup
+# orjson
+import orjson
 
 # exceptions
 from exceptions import HTTPError
 
+# responses
+from responses import ModelResponse
+
 # db
-from db.mongo_client import db_client
+from db.client import db_client
+from db.pagination import parse_fields
 
 # auth
 from auth import get_current_user
 
+# e-ticket
+from eticket.scraper import scrape_products, scrape_many
+
+# jobs
+from routers.jobs import ACCEPTED, accepted_job
+
+# analytics
+from price_history import get_price_history, invalidate_price_history
+
 # models
 from db.models.user import User
-from db.models.supermarket_list import BaseSuperList, SuperList, Products
+from db.models.supermarket_list import (
+    BaseSuperList,
+    SuperList,
+    Products,
+    ImportStatus,
+    normalize_description
+)
+from db.models.page import Page
+from db.models.analytics import (
+    ProductMetrics,
+    InflationPoint,
+    PriceVolatility,
+    MovingAveragePoint,
+    ProductMatch
+)
 
 
 router = APIRouter(
@@ -36,21 +68,49 @@ router = APIRouter(
 @router.get(
     path = "/",
     status_code = status.HTTP_200_OK,
-    # response_model = list[SuperList] | SuperList | dict,
-    summary = "Show all supermarket lists for a user",
+    response_model = Page,
+    summary = "Show the supermarket lists of a user, newest first",
+    responses = {
+        status.HTTP_200_OK: {"content": {"application/x-ndjson": {}}}
+    },
     tags = ["Supermarket list"]
 )
 async def supermarket_lists(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    limit: int = Query(default=settings.page_size, ge=1, le=settings.page_max_size),
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(
+        default = None,
+        description = "Comma separated SuperList fields to return",
+        example = "order,issue_date,supermarket"
+    ),
+    stream: bool = Query(
+        default = False,
+        description = "Stream the whole history as NDJSON, one list per line"
+    ),
+    accept: Optional[str] = Header(default=None)
 ):
-    super_lists = db_client.get_available_superlist_for_user(current_user.username)
+    fields = parse_fields(fields, SuperList)
 
-    if len(super_lists) != 0:
-        super_lists_to_return = [SuperList(**super_list).dict() for super_list in super_lists]
-    else:
-        super_lists_to_return = []
+    if stream or (accept and "application/x-ndjson" in accept):
+        async def ndjson_lines():
+            async for super_list in db_client.iter_superlists_for_user(
+                username = current_user.username,
+                fields = fields
+            ):
+                yield orjson.dumps(super_list, default=str, option=orjson.OPT_APPEND_NEWLINE)
+        
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
     
-    return super_lists_to_return
+    super_lists = await db_client.get_available_superlist_for_user(
+        username = current_user.username,
+        limit = limit,
+        cursor = cursor,
+        fields = fields
+    )
+
+    # stored documents are trusted: skip the response_model revalidation
+    return ModelResponse(super_lists)
 
 ### Show a supermarket list ###
 @router.get(
@@ -64,7 +124,7 @@ async def supermarket_list(
     current_user: User = Depends(get_current_user),
     order_id: str = Path(...)
 ):
-    super_list = db_client.get_superlist_with_orderid(
+    super_list = await db_client.get_superlist_with_orderid(
         username = current_user.username,
         order_id = order_id
     )
@@ -72,7 +132,7 @@ async def supermarket_list(
     if not super_list:
         raise HTTPError().not_found(message="Order not found")
     
-    return super_list.dict()
+    return ModelResponse(super_list)
 
 ### Register a supermarket list ###
 @router.post(
@@ -92,14 +152,13 @@ async def register_supermarket_list(
             username = current_user.username,
             order = order,
             issue_date = issue_date,
-            products = jsonable_encoder(
-                [product.description.strip().lower() for product in products]
-            )
+            products = products
         )
     
-    inserted_data = db_client.insert_superlist(insert.dict())
+    inserted_data = await db_client.insert_superlist(insert)
     if not inserted_data:
         raise HTTPError().not_found(message="List not inserted")
+    invalidate_price_history(current_user.username)
     
     return inserted_data.dict()
 
@@ -109,11 +168,15 @@ async def register_supermarket_list(
     status_code = status.HTTP_201_CREATED,
     response_model = SuperList,
     summary = "Register a supermarket list with the url",
+    description = "With background=true the ticket is fetched, parsed and inserted "
+        "by a background job and the response is a 202 with the job",
+    responses = ACCEPTED,
     tags = ["Supermarket list"]
 )
 async def register_supermarket_list_with_url(
     current_user: User = Depends(get_current_user),
-    details: BaseSuperList = Body(...)
+    details: BaseSuperList = Body(...),
+    background: bool = Query(default=False)
 ):
     details_dict = details.dict()
     url = details_dict.get("url")
@@ -123,26 +186,12 @@ async def register_supermarket_list_with_url(
 
     if not url or not order_id or not issue_date:
         raise HTTPError().bad_request(message="url/order/issue_date not recived")
+
+    if background:
+        return await accepted_job(current_user.username, "ticket", jsonable_encoder(details))
     
     try:
-        page = requests.get(url)
-        soup = BeautifulSoup(page.text, "html.parser")
-
-        rows = soup.find_all("tr", class_="font table-full-alt")
-
-        data = []
-        for row in rows:
-            description = row.find("div").text
-            units_and_price = row.find_all("div", class_="center")
-            units = units_and_price[0].text
-            price = units_and_price[1].text
-            
-            data.append(
-                Products(
-                    description = str(description).strip().lower(),
-                    units = float(units),
-                    price = float(price)
-                ))
+        data = await scrape_products(url, supermarket)
         
         insert = SuperList(
                     username = current_user.username,
@@ -154,12 +203,77 @@ async def register_supermarket_list_with_url(
     except Exception as err:
         raise HTTPError().conflict(message="ERROR", err=str(err))
     
-    inserted_data = db_client.insert_superlist(insert)
+    inserted_data = await db_client.insert_superlist(insert)
     if not inserted_data:
         raise HTTPError().not_found(message="Data not inserted")
+    invalidate_price_history(current_user.username)
     
     return inserted_data.dict()
 
+### Register many supermarket lists with their urls ###
+@router.post(
+    path = "/url/bulk",
+    status_code = status.HTTP_200_OK,
+    response_model = list[ImportStatus],
+    summary = "Register many supermarket lists with their urls",
+    tags = ["Supermarket list"]
+)
+async def register_supermarket_lists_with_url(
+    current_user: User = Depends(get_current_user),
+    tickets: list[BaseSuperList] = Body(...)
+):
+    if len(tickets) > settings.bulk_max_tickets:
+        raise HTTPError().bad_request(
+            message = f"At most {settings.bulk_max_tickets} tickets per request"
+        )
+    
+    statuses = [
+        ImportStatus(order=ticket.order, url=ticket.url, status="failed")
+        for ticket in tickets
+    ]
+    
+    to_scrape = []
+    seen_orders = set()
+    for index, ticket in enumerate(tickets):
+        if not ticket.url:
+            statuses[index].errmsg = "url not recived"
+        elif ticket.order in seen_orders:
+            statuses[index].errmsg = "Order repeated in the request"
+        else:
+            seen_orders.add(ticket.order)
+            to_scrape.append(index)
+    
+    scraped = await scrape_many([tickets[index] for index in to_scrape])
+    
+    to_insert = []
+    super_lists = []
+    for index, products in zip(to_scrape, scraped):
+        if isinstance(products, Exception):
+            statuses[index].errmsg = str(products)
+            continue
+        
+        super_lists.append(
+            SuperList(
+                username = current_user.username,
+                order = tickets[index].order,
+                issue_date = tickets[index].issue_date,
+                supermarket = tickets[index].supermarket,
+                url = tickets[index].url,
+                products = products
+            )
+        )
+        to_insert.append(index)
+    
+    errors = await db_client.insert_superlists(super_lists)
+    invalidate_price_history(current_user.username)
+    for index, errmsg in zip(to_insert, errors):
+        if errmsg:
+            statuses[index].errmsg = errmsg
+        else:
+            statuses[index].status = "inserted"
+    
+    return statuses
+
 ### Update a supermarket list ###
 @router.post(
     path = "/{order_id}",
@@ -179,11 +293,15 @@ async def update_supermarket_list(
         ]
     )
 ):
-    # strip() and lower() to product.description
-    if updates.get("description", None):
-        updates["description"] = updates["description"].strip().lower()
+    # products are validated, which normalizes their description
+    for update in updates:
+        if "products" in update:
+            try:
+                update["products"] = [Products(**product).dict() for product in update["products"]]
+            except (TypeError, ValidationError) as err:
+                raise HTTPError().bad_request(message="Invalid products", err=str(err))
     
-    super_list_updated = db_client.get_superlist_with_orderid_and_update(
+    super_list_updated = await db_client.get_superlist_with_orderid_and_update(
         username = current_user.username,
         order_id = order_id,
         updates = updates
@@ -191,6 +309,7 @@ async def update_supermarket_list(
 
     if not super_list_updated:
         raise HTTPError().conflict(message="Supermarket list not updated")
+    invalidate_price_history(current_user.username)
     
     return super_list_updated.dict()
 
@@ -206,7 +325,7 @@ async def delete_supermarket_list(
     current_user: User = Depends(get_current_user),
     order_id: str = Path(...)
 ):
-    super_list_deleted = db_client.get_superlist_with_orderid_and_update(
+    super_list_deleted = await db_client.get_superlist_with_orderid_and_update(
         username = current_user.username,
         order_id = order_id,
         updates = [{"disabled": True}]
@@ -214,9 +333,27 @@ async def delete_supermarket_list(
 
     if not super_list_deleted:
         raise HTTPError().conflict(message="Supermarket list not deleted")
+    invalidate_price_history(current_user.username)
     
     return super_list_deleted.dict()
 
+### Search products ###
+@router.get(
+    path = "/products/search",
+    status_code = status.HTTP_200_OK,
+    response_model = list[ProductMatch],
+    summary = "Search the products bought by the user, by prefix or approximately",
+    tags = ["Supermarket list"]
+)
+async def search_products(
+    current_user: User = Depends(get_current_user),
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(default=10, ge=1, le=50)
+):
+    price_history = await get_price_history(db_client, current_user.username)
+    
+    return price_history.search_index.search(q, limit=limit)
+
 ## Interesting Cards ##
 
 ### amount per period ###
@@ -233,36 +370,127 @@ async def amount_per_period(
     start: date = Query(default=date.today() - timedelta(days=30)),
     end: date = Query(default=date.today())
 ):
-    product_description = product_description.strip().lower()
-    result = db_client.superlist_mongo_db.find(
-        {
-            "username": current_user.username,
-            "products.description": product_description,
-            "issue_date": {"$lte": str(end)},
-            "issue_date": {"$gte": str(start)}
-        },
-        {
-            "_id": 0,
-            "description": "$products.description",
-            "price": 1
-        }
+    product_description = normalize_description(product_description)
+    
+    return await db_client.count_superlists_with_product(
+        username = current_user.username,
+        product_description = product_description,
+        start = start,
+        end = end
     )
 
-    return len(result)
-    # results = db_client.superlist_mongo_db.aggregate([
-    #     {"$match": 
-    #         {
-    #             "username": current_user.username,
-    #             "products.description": product_description,
-    #             "issue_date": {"$gte": start},
-    #             "issue_date": {"$lte": end}
-    #         }
-    #     },
-    #     {
-    #         "$group":
-    #             {
-    #                 "_id": "$products.description",
-    #                 "total": {"$sum": "$products.price"}
-    #             }
-    #     }
-    # ])
\ No newline at end of file
+### products metrics ###
+@router.get(
+    path = "/icards/products",
+    status_code = status.HTTP_200_OK,
+    response_model = list[ProductMetrics],
+    summary = "Get the quantity, spend and average price of the products bought in a period",
+    tags = ["Supermarket list", "Icard"]
+)
+async def products_metrics(
+    current_user: User = Depends(get_current_user),
+    start: date = Query(default=date.today() - timedelta(days=30)),
+    end: date = Query(default=date.today()),
+    limit: int = Query(default=20, ge=1, le=100)
+):
+    return await db_client.product_metrics(
+        username = current_user.username,
+        start = start,
+        end = end,
+        limit = limit
+    )
+
+### product metrics ###
+@router.get(
+    path = "/icards/products/{product_description}",
+    status_code = status.HTTP_200_OK,
+    response_model = ProductMetrics,
+    summary = "Get the quantity, spend and average price of a product in a period",
+    tags = ["Supermarket list", "Icard"]
+)
+async def product_metrics(
+    current_user: User = Depends(get_current_user),
+    product_description: str = Path(...),
+    start: date = Query(default=date.today() - timedelta(days=30)),
+    end: date = Query(default=date.today())
+):
+    product_description = normalize_description(product_description)
+    metrics = await db_client.product_metrics(
+        username = current_user.username,
+        start = start,
+        end = end,
+        product_description = product_description,
+        limit = 1
+    )
+    
+    if not metrics:
+        return ProductMetrics(description=product_description)
+    
+    return metrics[0]
+
+## Price history analytics ##
+
+### personal inflation ###
+@router.get(
+    path = "/analytics/inflation",
+    status_code = status.HTTP_200_OK,
+    response_model = list[InflationPoint],
+    summary = "Get the monthly personal inflation index",
+    tags = ["Supermarket list", "Analytics"]
+)
+async def inflation_index(
+    current_user: User = Depends(get_current_user),
+    start: Optional[date] = Query(default=None),
+    end: Optional[date] = Query(default=None)
+):
+    price_history = await get_price_history(db_client, current_user.username)
+    
+    return price_history.inflation_index(start=start, end=end)
+
+### price volatility ###
+@router.get(
+    path = "/analytics/volatility",
+    status_code = status.HTTP_200_OK,
+    response_model = list[PriceVolatility],
+    summary = "Get the products whose price changes the most",
+    tags = ["Supermarket list", "Analytics"]
+)
+async def price_volatility(
+    current_user: User = Depends(get_current_user),
+    start: Optional[date] = Query(default=None),
+    end: Optional[date] = Query(default=None),
+    min_purchases: int = Query(default=2, ge=1),
+    limit: int = Query(default=20, ge=1, le=100)
+):
+    price_history = await get_price_history(db_client, current_user.username)
+    
+    return price_history.volatility(
+        start = start,
+        end = end,
+        min_purchases = min_purchases,
+        limit = limit
+    )
+
+### price moving average ###
+@router.get(
+    path = "/analytics/moving-average/{product_description}",
+    status_code = status.HTTP_200_OK,
+    response_model = list[MovingAveragePoint],
+    summary = "Get the daily price of a product and its moving average",
+    tags = ["Supermarket list", "Analytics"]
+)
+async def price_moving_average(
+    current_user: User = Depends(get_current_user),
+    product_description: str = Path(...),
+    window: int = Query(default=7, ge=1, le=365, description="Days"),
+    start: Optional[date] = Query(default=None),
+    end: Optional[date] = Query(default=None)
+):
+    price_history = await get_price_history(db_client, current_user.username)
+    
+    return price_history.moving_average(
+        product_description = normalize_description(product_description),
+        window = window,
+        start = start,
+        end = end
+    )
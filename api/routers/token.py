@@ -29,7 +29,7 @@ router = APIRouter(
         tags = ["Token"]
         )
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user(form_data.username, form_data.password)
     
     if not user:
         raise HTTPException(
@@ -57,5 +57,4 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         tags = ["Token"]
         )
 async def read_users_me(current_user: User = Depends(get_current_user)):
-    print("En read_users_me")
     return current_user
\ No newline at end of file
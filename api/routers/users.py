@@ -1,21 +1,30 @@
 # Python
+from typing import Optional
 
 # FastAPI
-from fastapi import APIRouter, Path, Body
+from fastapi import APIRouter, Path, Body, Query
 from fastapi import status, Depends
 from fastapi.encoders import jsonable_encoder
 
+# config
+from config import settings
+
 # exceptions
 from exceptions import HTTPError
 
+# responses
+from responses import ModelResponse
+
 # auth
-from auth import get_password_hash, get_current_user
+from auth import get_password_hash, get_current_user, invalidate_user
 
 # db
-from db.mongo_client import db_client
+from db.client import db_client
+from db.pagination import parse_fields
 
 # models
 from db.models.user import User, UserIn
+from db.models.page import Page
 
 # serializers
 # from db.serializers.user import users_serializer
@@ -41,14 +50,11 @@ async def signup(
     user_data: UserIn = Body(...)
 ):
     user_data = user_data.dict()
-    user_data["password"] = get_password_hash(user_data["password"])
+    user_data["password"] = await get_password_hash(user_data["password"])
     if user_data["birth_date"]:
         user_data["birth_date"] = str(user_data["birth_date"])
     
-    if db_client.exist_user(user_data.get("username")):
-        raise HTTPError().conflict(message="Username exists")
-    
-    new_user = db_client.insert_user(user_data)
+    new_user = await db_client.insert_user(user_data)
     
     return new_user
 
@@ -56,13 +62,26 @@ async def signup(
 @router.get(
         path = "/",
         status_code = status.HTTP_200_OK,
-        response_model = list[User],
+        response_model = Page,
         summary = "Show all users",
         tags = ["Users"])
-async def users():
-    users_list = db_client.get_available_users()
+async def users(
+    limit: int = Query(default=settings.page_size, ge=1, le=settings.page_max_size),
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(
+        default = None,
+        description = "Comma separated User fields to return",
+        example = "username,name"
+    )
+):
+    users_page = await db_client.get_available_users(
+        limit = limit,
+        cursor = cursor,
+        fields = parse_fields(fields, User)
+    )
     
-    return users_list
+    # stored documents are trusted: skip the response_model revalidation
+    return ModelResponse(users_page)
 
 ## show a user ##
 @router.get(
@@ -72,12 +91,12 @@ async def users():
         summary = "Show a user",
         tags = ["Users"])
 async def user(username: str = Path(...)):
-    user_db = db_client.get_user_with_username(username)
+    user_db = await db_client.get_user_with_username(username)
     
     if not user_db:
         raise HTTPError().not_found(message="User not found")
     
-    return user_db
+    return ModelResponse(user_db)
 
 ## update a user ##
 @router.patch(
@@ -94,7 +113,7 @@ async def update_user(
         example = [{"name": "Tony"}, {"lastname": "Stark"}]
     )
 ):
-    user = db_client.get_user_with_username(
+    user = await db_client.get_user_with_username(
         username = current_user.username,
         full_user = True
     )
@@ -102,10 +121,11 @@ async def update_user(
     if user.disabled:
         raise HTTPError().conflict(message="User has already been deleted")
     
-    user_updated = db_client.get_user_with_username_and_update(
+    user_updated = await db_client.get_user_with_username_and_update(
         username = current_user.username,
         updates = user_updates
     )
+    invalidate_user(current_user.username)
     
     return user_updated
 
@@ -120,7 +140,7 @@ async def update_user(
 async def delete_user(
     current_user: User = Depends(get_current_user),
 ):
-    user = db_client.get_user_with_username(
+    user = await db_client.get_user_with_username(
         username = current_user.username,
         full_user = True
     )
@@ -128,9 +148,10 @@ async def delete_user(
     if user.disabled:
         raise HTTPError().conflict(message="User has already been deleted")
     
-    user_deleted = db_client.get_user_with_username_and_update(
+    user_deleted = await db_client.get_user_with_username_and_update(
         username = current_user.username,
         updates = [{"disabled": True}]
     )
+    invalidate_user(current_user.username)
 
     return user_deleted
\ No newline at end of file
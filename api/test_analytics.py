@@ -0,0 +1,94 @@
+# Python
+from datetime import date
+
+# db
+from db.analytics import product_metrics_from_lists
+
+
+SUPER_LISTS = [
+    {
+        "issue_date": "2023-11-30",
+        "products": [{"description": "tomato", "units": 10, "price": 1}]
+    },
+    {
+        "issue_date": "2023-12-01",
+        "products": [
+            {"description": "tomato", "units": 2, "price": 10},
+            {"description": "milk", "units": 1, "price": 5}
+        ]
+    },
+    {
+        "issue_date": "2023-12-15",
+        "products": [
+            {"description": "tomato", "units": 1, "price": 12},
+            {"description": "bread", "units": 4, "price": 2}
+        ]
+    },
+    {
+        "issue_date": "2023-12-31",
+        "products": [{"description": "milk", "units": 3, "price": 6}]
+    },
+    {
+        "issue_date": "2024-01-01",
+        "products": [{"description": "milk", "units": 10, "price": 1}]
+    }
+]
+
+
+def summary(metrics) -> list[tuple]:
+    return [
+        (m.description, m.quantity, m.total_spend, m.purchases, m.min_price, m.max_price, m.average_price)
+        for m in metrics
+    ]
+
+
+def test_product_metrics_by_spend_within_the_period():
+    """
+    Verifica que se agreguen por producto solo las listas entre start y end,
+    ambos incluidos, ordenadas por gasto total
+    """
+    metrics = product_metrics_from_lists(SUPER_LISTS, date(2023, 12, 1), date(2023, 12, 31))
+
+    assert summary(metrics) == [
+        ("tomato", 3, 32, 2, 10, 12, 32 / 3),
+        ("milk", 4, 23, 2, 5, 6, 23 / 4),
+        ("bread", 4, 8, 1, 2, 2, 2)
+    ]
+
+def test_product_metrics_of_one_product_and_limit():
+    """
+    Verifica el filtro por descripcion, el limite y un periodo sin compras
+    """
+    start, end = date(2023, 12, 1), date(2023, 12, 31)
+
+    assert summary(product_metrics_from_lists(SUPER_LISTS, start, end, "milk")) == [
+        ("milk", 4, 23, 2, 5, 6, 23 / 4)
+    ]
+    assert [m.description for m in product_metrics_from_lists(SUPER_LISTS, start, end, limit=1)] == [
+        "tomato"
+    ]
+    assert product_metrics_from_lists(SUPER_LISTS, date(2022, 1, 1), date(2022, 12, 31)) == []
+
+def test_product_metrics_endpoints(api):
+    """
+    Verifica los endpoints de icards sobre el backend en memoria
+    """
+    headers = api.create_user()
+    for order, super_list in enumerate(SUPER_LISTS):
+        assert api.post(
+            "/super/",
+            headers = headers,
+            params = {"order": str(order), "issue_date": super_list["issue_date"]},
+            json = super_list["products"]
+        ).status_code == 201
+    period = {"start": "2023-12-01", "end": "2023-12-31"}
+
+    products = api.get("/super/icards/products", headers=headers, params=period).json()
+    milk = api.get("/super/icards/products/ MILK ", headers=headers, params=period).json()
+    rice = api.get("/super/icards/products/rice", headers=headers, params=period).json()
+
+    assert [(m["description"], m["total_spend"]) for m in products] == [
+        ("tomato", 32), ("milk", 23), ("bread", 8)
+    ]
+    assert (milk["description"], milk["quantity"], milk["purchases"]) == ("milk", 4, 2)
+    assert (rice["description"], rice["purchases"], rice["min_price"]) == ("rice", 0, None)
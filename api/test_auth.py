@@ -0,0 +1,113 @@
+# Python
+import asyncio
+import threading
+import time
+
+# pytest
+import pytest
+
+# FastAPI
+from fastapi import HTTPException
+
+# PassLib
+from passlib.context import CryptContext
+
+# auth
+import auth
+from auth import authenticate_user, run_password_job
+
+# config
+from config import settings
+
+
+def bcrypt_context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+def login(api, password: str = "my password"):
+    return api.post("/login/token", data={"username": "ironman", "password": password})
+
+
+def test_saturated_password_pool_rejects_at_once(api, monkeypatch):
+    """
+    Verifica que con el pool de bcrypt lleno el login responda 503 con Retry-After
+    sin esperar a que se libere
+    """
+    api.create_user(password=bcrypt_context(4).hash("my password"))
+    monkeypatch.setattr(
+        auth, "password_jobs", settings.password_workers + settings.password_queue_depth
+    )
+
+    start = time.perf_counter()
+    response = login(api)
+
+    assert time.perf_counter() - start < 0.5
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert response.json()["detail"]["errmsg"] == "Too many password operations, try again later"
+
+def test_password_jobs_are_bounded_by_workers_and_queue_depth(monkeypatch):
+    """
+    Verifica que se admitan workers + queue_depth operaciones a la vez,
+    que la siguiente se rechace y que al terminar se vuelvan a admitir
+    """
+    monkeypatch.setattr(settings, "password_workers", 1)
+    monkeypatch.setattr(settings, "password_queue_depth", 2)
+    release = threading.Event()
+
+    async def run():
+        admitted = [asyncio.create_task(run_password_job(release.wait, 5)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert auth.password_jobs == 3
+
+        with pytest.raises(HTTPException) as err:
+            await run_password_job(release.wait, 5)
+        assert err.value.status_code == 503
+
+        release.set()
+        assert await asyncio.gather(*admitted) == [True] * 3
+        assert auth.password_jobs == 0
+        assert await run_password_job(release.wait, 5)
+
+    asyncio.run(run())
+
+def test_login_rehashes_when_the_bcrypt_cost_changes(api, monkeypatch):
+    """
+    Verifica que al cambiar bcrypt_rounds el login guarde el hash con el costo
+    nuevo, y que el hash nuevo siga sirviendo para entrar
+    """
+    api.create_user(password=bcrypt_context(5).hash("my password"))
+    monkeypatch.setattr(auth, "pwd_context", bcrypt_context(4))
+
+    assert login(api, "wrong password").status_code == 400
+    assert api.db.users["ironman"]["password"].startswith("$2b$05$")
+
+    assert login(api).status_code == 200
+    rehashed = api.db.users["ironman"]["password"]
+    assert rehashed.startswith("$2b$04$")
+
+    assert login(api).status_code == 200
+    assert api.db.users["ironman"]["password"] == rehashed
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("clients", [1, 4, 16])
+def test_login_throughput(api, clients):
+    """
+    Mide logins por segundo con N clientes concurrentes, al costo de bcrypt configurado
+    """
+    api.create_user(password=auth.pwd_context.hash("my password"))
+
+    async def client(count: int) -> list:
+        return [await authenticate_user("ironman", "my password") for _ in range(count)]
+
+    async def run() -> list:
+        return await asyncio.gather(*[client(2) for _ in range(clients)])
+
+    start = time.perf_counter()
+    users = [user for users in asyncio.run(run()) for user in users]
+    elapsed = time.perf_counter() - start
+    print(
+        f"login: {len(users) / elapsed:.1f} logins/s with {clients} clients, "
+        f"{settings.bcrypt_rounds} rounds, {settings.password_workers} workers"
+    )
+
+    assert all(user.username == "ironman" for user in users)
@@ -0,0 +1,46 @@
+# Python
+import os
+import time
+
+os.environ.setdefault("JWT_SECRETKEY", "test")
+
+# cache
+from cache import TTLCache
+
+# e-ticket
+from eticket.cache import normalize_url
+
+
+def test_cache_evicts_least_recently_used():
+    """
+    Verifica que al llenarse el cache se descarte la entrada usada hace mas tiempo
+    """
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+def test_cache_expires_entries():
+    """
+    Verifica que las entradas venzan despues del ttl y se cuenten hits y misses
+    """
+    cache = TTLCache(maxsize=10, ttl=0.05)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_equivalent_ticket_urls_share_key():
+    """
+    Verifica que urls equivalentes de un ticket se normalicen igual
+    """
+    assert normalize_url("HTTPS://Eticket.com:443/t?b=2&a=1#top") == normalize_url(
+        "https://eticket.com/t?a=1&b=2"
+    )
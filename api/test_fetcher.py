@@ -0,0 +1,287 @@
+# Python
+import asyncio
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# pytest
+import pytest
+
+os.environ.setdefault("JWT_SECRETKEY", "test")
+
+# e-ticket
+from eticket.fetcher import FetchError, TicketFetcher
+
+# models
+from db.models.supermarket_list import Products
+
+
+TICKET = b"<html><body>" + b"<p>ticket</p>" * 100 + b"</body></html>"
+LAST_MODIFIED = "Sat, 30 Dec 2023 10:00:00 GMT"
+
+
+class StubTicketHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures = {}
+    requests = {}
+
+    def do_GET(self):
+        self.requests[self.path] = self.requests.get(self.path, 0) + 1
+        status = 200
+        body = TICKET
+        headers = {}
+
+        if self.path == "/validated":
+            # a new body on every 200, only a 304 can reuse the parsed products
+            body = TICKET + str(self.requests[self.path]).encode()
+            headers = {"ETag": '"v1"', "Last-Modified": LAST_MODIFIED}
+            if (
+                self.headers.get("If-None-Match") == '"v1"'
+                and self.headers.get("If-Modified-Since") == LAST_MODIFIED
+            ):
+                status = 304
+                body = b""
+        elif self.path == "/slow":
+            time.sleep(0.2)
+        elif self.path == "/big":
+            body = b"x" * 10_000
+        elif self.path == "/flaky" and not self.failures.get("flaky"):
+            self.failures["flaky"] = 1
+            status = 503
+            body = b""
+
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubTicketHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def new_fetcher(**kwargs) -> TicketFetcher:
+    options = {
+        "connect_timeout": 1.0,
+        "read_timeout": 1.0,
+        "max_bytes": 5_000,
+        "max_connections": 50,
+        "retries": 1,
+        "backoff": 0.01
+    }
+    options.update(kwargs)
+
+    return TicketFetcher(**options)
+
+def counted_scraper(monkeypatch, fresh: float) -> list:
+    """
+    Points the scraper to an empty ticket cache and a fetcher for the stub server,
+    and parses in the default thread pool. Returns the list of parsed bodies.
+    """
+    from eticket import scraper
+    from eticket.cache import TicketCache
+
+    parses = []
+
+    def parse_ticket(text, supermarket):
+        parses.append(text)
+        return [Products(description="tomato", units=1, price=20)]
+
+    StubTicketHandler.requests.clear()
+    monkeypatch.setattr(scraper, "ticket_cache", TicketCache(maxsize=10, fresh=fresh, ttl=60))
+    monkeypatch.setattr(scraper, "fetcher", new_fetcher())
+    monkeypatch.setattr(scraper, "parse_ticket", parse_ticket)
+    monkeypatch.setattr(scraper, "get_parse_pool", lambda: None)
+
+    return parses
+
+def scrape_twice(url: str) -> tuple:
+    from eticket import scraper
+
+    async def run():
+        try:
+            return (
+                await scraper.scrape_products(url),
+                await scraper.scrape_products(url)
+            )
+        finally:
+            await scraper.fetcher.close()
+
+    return asyncio.run(run())
+
+
+def test_fetch_ticket(stub_server):
+    """
+    Verifica que se descargue el ticket completo
+    """
+    async def run():
+        fetcher = new_fetcher()
+        try:
+            return await fetcher.fetch(f"{stub_server}/ticket")
+        finally:
+            await fetcher.close()
+
+    result = asyncio.run(run())
+
+    assert result.status_code == 200
+    assert result.content == TICKET
+
+def test_fetch_rejects_big_tickets(stub_server):
+    """
+    Verifica que se rechacen los tickets que superan el limite de bytes
+    """
+    async def run():
+        fetcher = new_fetcher()
+        try:
+            await fetcher.fetch(f"{stub_server}/big")
+        finally:
+            await fetcher.close()
+
+    with pytest.raises(FetchError):
+        asyncio.run(run())
+
+def test_fetch_retries_on_server_errors(stub_server):
+    """
+    Verifica que se reintente cuando el servidor responde 503
+    """
+    async def run():
+        fetcher = new_fetcher()
+        try:
+            return await fetcher.fetch(f"{stub_server}/flaky")
+        finally:
+            await fetcher.close()
+
+    assert asyncio.run(run()).status_code == 200
+
+def test_fetch_fails_fast_on_invalid_urls():
+    """
+    Verifica que una url sin esquema o mal formada falle sin reintentos
+    """
+    async def run(url):
+        fetcher = new_fetcher(retries=3, backoff=1.0)
+        try:
+            await fetcher.fetch(url)
+        finally:
+            await fetcher.close()
+
+    for url in ("www.eticket.com", "ftp://eticket.com/t", "http://e\x00ticket.com"):
+        start = time.perf_counter()
+        with pytest.raises(FetchError, match="Invalid ticket url"):
+            asyncio.run(run(url))
+        assert time.perf_counter() - start < 0.5
+
+@pytest.mark.benchmark
+def test_concurrent_fetch_latency(stub_server):
+    """
+    Verifica que las descargas concurrentes no se serialicen:
+    50 tickets lentos (200 ms) tienen que tardar bastante menos que 50 * 200 ms
+    """
+    async def run():
+        fetcher = new_fetcher()
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(
+                *[fetcher.fetch(f"{stub_server}/slow") for _ in range(50)]
+            )
+            return time.perf_counter() - start
+        finally:
+            await fetcher.close()
+
+    elapsed = asyncio.run(run())
+
+    assert elapsed < 2.0
+
+def test_client_is_replaced_and_closed_on_a_new_loop(stub_server):
+    """
+    Verifica que al cambiar de event loop se cierre el cliente anterior
+    """
+    fetcher = new_fetcher()
+
+    async def fetch():
+        await fetcher.fetch(f"{stub_server}/ticket")
+        return fetcher._client
+
+    first = asyncio.run(fetch())
+    second = asyncio.run(fetch())
+    asyncio.run(fetcher.close())
+
+    assert first is not second
+    assert first.is_closed and second.is_closed
+
+def test_host_limit_is_shared_by_concurrent_requests():
+    """
+    Verifica que el limite por host se respete entre varias importaciones a la vez
+    """
+    from config import settings
+    from eticket.scraper import _host_limits, host_limit
+
+    active = peak = 0
+
+    async def fetch(url):
+        nonlocal active, peak
+        async with host_limit(url):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def bulk_request():
+        await asyncio.gather(*[fetch(f"http://eticket.com/t?o={order}") for order in range(10)])
+
+    async def run():
+        await asyncio.gather(bulk_request(), bulk_request(), bulk_request())
+
+    asyncio.run(run())
+
+    assert peak == settings.fetch_per_host_limit
+    assert _host_limits == {}
+
+def test_fresh_ticket_is_not_fetched(stub_server, monkeypatch):
+    """
+    Verifica que un ticket fresco en el cache se sirva sin descargarlo ni parsearlo
+    """
+    parses = counted_scraper(monkeypatch, fresh=60)
+
+    first, second = scrape_twice(f"{stub_server}/ticket")
+
+    assert second == first
+    assert StubTicketHandler.requests == {"/ticket": 1}
+    assert len(parses) == 1
+
+def test_stale_ticket_is_revalidated_with_etag_and_last_modified(stub_server, monkeypatch):
+    """
+    Verifica que un ticket vencido se revalide con If-None-Match/If-Modified-Since
+    y que el 304 reuse los productos cacheados sin parsear
+    """
+    parses = counted_scraper(monkeypatch, fresh=0)
+
+    first, second = scrape_twice(f"{stub_server}/validated")
+
+    assert second == first
+    assert StubTicketHandler.requests == {"/validated": 2}
+    assert len(parses) == 1
+
+def test_unchanged_body_is_not_parsed_again(stub_server, monkeypatch):
+    """
+    Verifica que si el ticket vencido se descarga con el mismo contenido
+    no se vuelva a parsear
+    """
+    parses = counted_scraper(monkeypatch, fresh=0)
+
+    first, second = scrape_twice(f"{stub_server}/ticket")
+
+    assert second == first
+    assert StubTicketHandler.requests == {"/ticket": 2}
+    assert len(parses) == 1
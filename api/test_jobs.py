@@ -0,0 +1,365 @@
+# Python
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import timedelta
+
+# pytest
+import pytest
+
+os.environ.setdefault("JWT_SECRETKEY", "test")
+
+# websockets
+from websockets.exceptions import ConnectionClosed
+
+# jobs
+from jobs.events import EventBroker
+from jobs.queue import JobQueue
+
+# models
+from db.models.supermarket_list import Products
+
+
+def wait_job(api, location: str, headers: dict, **expected) -> dict:
+    """
+    Polls the job at location until its fields have the expected values.
+    """
+    deadline = time.monotonic() + 5
+    while True:
+        job = api.get(location, headers=headers).json()
+        if all(job.get(field) == value for field, value in expected.items()):
+            return job
+        assert time.monotonic() < deadline, job
+        time.sleep(0.01)
+
+
+def test_jobs_are_claimed_once_in_order():
+    """
+    Verifica que los jobs se tomen una sola vez, del mas viejo al mas nuevo
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        queue = JobQueue(os.path.join(directory, "jobs.sqlite3"))
+        first = queue.enqueue("ironman", "ticket", {"order": "1"})
+        second = queue.enqueue("ironman", "ticket", {"order": "2"})
+
+        job, username, payload = queue.claim()
+        assert (job.id, job.status, username, payload) == (first.id, "running", "ironman", {"order": "1"})
+        assert queue.claim()[0].id == second.id
+        assert queue.claim() is None
+
+def test_job_progress_and_ownership():
+    """
+    Verifica que el job guarde etapa y resultado, y que otro usuario no lo vea
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        queue = JobQueue(os.path.join(directory, "jobs.sqlite3"))
+        job = queue.enqueue("ironman", "receipt", {})
+        queue.claim()
+        queue.update(job.id, stage="read")
+        queue.update(job.id, status="done", result=[{"description": "tomato"}])
+
+        job = queue.get(job.id, "ironman")
+        assert (job.status, job.stage, job.result) == ("done", "read", [{"description": "tomato"}])
+        assert queue.get(job.id, "hulk") is None
+
+def test_running_jobs_are_requeued_and_finished_ones_purged():
+    """
+    Verifica que al reiniciar se vuelvan a encolar los jobs que estaban
+    corriendo y que se borren los terminados viejos
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        queue = JobQueue(os.path.join(directory, "jobs.sqlite3"))
+        running = queue.enqueue("ironman", "ticket", {})
+        finished = queue.enqueue("ironman", "ticket", {})
+        queue.claim()
+        queue.claim()
+        queue.update(finished.id, status="done")
+
+        assert queue.requeue_running() == 1
+        assert queue.get(running.id).status == "queued"
+
+        time.sleep(0.01)
+        assert queue.purge(timedelta(0)) == 1
+        assert queue.get(finished.id) is None
+
+def test_job_events_are_recorded_for_their_user():
+    """
+    Verifica que cada etapa y el final del job se registren como eventos, y que
+    los del propio proceso no se vuelvan a publicar
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        queue = JobQueue(os.path.join(directory, "jobs.sqlite3"))
+        job = queue.enqueue("ironman", "ticket", {})
+        queue.claim()
+
+        username, event = queue.update(job.id, stage="fetched")
+        assert (username, event.job_id, event.event) == ("ironman", job.id, "fetched")
+        assert queue.update(job.id, result={"order": "1"}) is None
+        username, event = queue.update(job.id, status="failed", errmsg="Order exists")
+        assert (event.event, event.errmsg) == ("failed", "Order exists")
+
+        assert queue.events_since(0) == (event.id, [])
+
+def test_broker_fans_out_per_user_and_drops_oldest():
+    """
+    Verifica que el broker entregue los eventos solo a los suscriptores del
+    usuario y descarte los mas viejos si un suscriptor se atrasa
+    """
+    async def scenario():
+        broker = EventBroker(queue_size=2)
+        with broker.subscribe("ironman") as first, broker.subscribe("ironman") as second:
+            with broker.subscribe("hulk") as other:
+                for event in ("fetched", "parsed", "inserted"):
+                    broker.publish("ironman", event)
+
+                assert [first.get_nowait(), first.get_nowait()] == ["parsed", "inserted"]
+                assert second.qsize() == 2 and other.empty()
+
+        assert broker.subscribers == {}
+
+    asyncio.run(scenario())
+
+def test_job_worker_survives_queue_errors(monkeypatch, caplog):
+    """
+    Verifica que un error de la cola, como la base bloqueada por otro proceso,
+    se registre y el worker siga tomando jobs
+    """
+    # jobs
+    from jobs import worker
+
+    claims = []
+
+    def claim():
+        claims.append(time.monotonic())
+        if len(claims) == 1:
+            raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(worker.job_queue, "claim", claim)
+    monkeypatch.setattr(worker.settings, "job_poll_interval", 0.01)
+
+    async def scenario():
+        monkeypatch.setattr(worker, "_wakeup", asyncio.Event())
+        task = asyncio.create_task(worker.job_worker())
+        await asyncio.sleep(0.2)
+        assert not task.done()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+    assert len(claims) > 2
+    assert "database is locked" in caplog.text
+
+@pytest.mark.benchmark
+def test_broker_publish_with_idle_subscribers():
+    """
+    Mide el costo de publicar con 10000 conexiones esperando eventos de 1000 usuarios
+    """
+    async def scenario():
+        broker = EventBroker(queue_size=100)
+
+        async def connection(username: str):
+            with broker.subscribe(username) as events:
+                while await events.get() is not None:
+                    pass
+
+        connections = [
+            asyncio.create_task(connection(f"user {number % 1000}")) for number in range(10_000)
+        ]
+        await asyncio.sleep(0)
+
+        start = time.perf_counter()
+        for number in range(10_000):
+            broker.publish(f"user {number % 1000}", "parsed")
+        elapsed = time.perf_counter() - start
+        print(f"publish: {elapsed / 10_000 * 1e6:.1f} us per event, {len(broker)} subscribers")
+
+        for username in list(broker.subscribers):
+            for events in broker.subscribers[username]:
+                events.put_nowait(None)
+        await asyncio.gather(*connections)
+
+        return broker
+
+    assert len(asyncio.run(scenario())) == 0
+
+def test_job_events_are_pushed_over_the_websocket(api):
+    """
+    Verifica que el websocket rechace conexiones sin token valido y entregue
+    los eventos de los jobs del usuario
+    """
+    # jobs
+    from jobs.events import broker
+
+    # models
+    from db.models.job import JobEvent
+
+    # starlette
+    from starlette.websockets import WebSocketDisconnect
+
+    token = api.create_user()["Authorization"][7:]
+    event = JobEvent(id=1, job_id="job", kind="ticket", event="parsed", created="2023-12-30T00:00:00")
+
+    with pytest.raises(WebSocketDisconnect):
+        with api.websocket_connect("/jobs/events?token=nope") as websocket:
+            websocket.receive_text()
+
+    with api.websocket_connect(f"/jobs/events?token={token}") as websocket:
+        while "ironman" not in broker.subscribers:
+            time.sleep(0.01)
+        api.portal.call(broker.publish, "ironman", event)
+        assert JobEvent.parse_raw(websocket.receive_text()) == event
+
+@pytest.mark.parametrize("error", [
+    RuntimeError("Cannot call send once a close message has been sent"),
+    ConnectionClosed(None, None)
+])
+def test_job_events_end_when_the_socket_fails(api, error):
+    """
+    Verifica que si enviar falla porque el cliente se fue, el websocket
+    termine sin error y libere su suscripcion
+    """
+    # jobs
+    from jobs.events import broker
+
+    # routers
+    from routers.jobs import job_events
+
+    # models
+    from db.models.job import JobEvent
+
+    headers = api.create_user()
+    event = JobEvent(id=1, job_id="job", kind="ticket", event="parsed", created="2023-12-30T00:00:00")
+
+    class ClosedWebSocket:
+        def __init__(self) -> None:
+            self.headers = {"authorization": headers["Authorization"]}
+            self.sent = []
+
+        async def accept(self):
+            pass
+
+        async def receive(self):
+            await asyncio.Event().wait()
+
+        async def send_text(self, text):
+            self.sent.append(text)
+            raise error
+
+    async def scenario():
+        websocket = ClosedWebSocket()
+        task = asyncio.create_task(job_events(websocket, token=None))
+        while "ironman" not in broker.subscribers:
+            await asyncio.sleep(0)
+        broker.publish("ironman", event)
+        await asyncio.wait_for(task, 1)
+
+        return websocket
+
+    assert len(asyncio.run(scenario()).sent) == 1
+    assert broker.subscribers == {}
+
+def test_ticket_job_reports_progress_and_inserts_the_list(api, monkeypatch):
+    """
+    Verifica que con background=true se responda 202 con Location, que el job
+    informe su avance y su resultado, y que la lista quede registrada
+    """
+    # jobs
+    from jobs import worker
+
+    release = False
+
+    async def scrape_products(url, supermarket=None, on_fetched=None):
+        await on_fetched()
+        while not release:
+            await asyncio.sleep(0.01)
+        return [Products(description="tomato", units=2, price=10)]
+
+    headers = api.create_user()
+    monkeypatch.setattr(worker, "scrape_products", scrape_products)
+
+    response = api.post(
+        "/super/url",
+        headers = headers,
+        params = {"background": True},
+        json = {"order": "0001", "issue_date": "2023-12-30", "url": "https://eticket.com/t?o=1"}
+    )
+
+    assert response.status_code == 202
+    job = response.json()
+    assert response.headers["location"] == f"/jobs/{job['id']}"
+    assert (job["kind"], job["status"]) == ("ticket", "queued")
+
+    running = wait_job(api, response.headers["location"], headers, stage="fetched")
+    assert running["status"] == "running"
+    release = True
+
+    done = wait_job(api, response.headers["location"], headers, status="done")
+    assert done["stage"] == "inserted"
+    assert done["result"]["order"] == "0001"
+    assert done["result"]["products"] == [{"description": "tomato", "units": 2, "price": 10}]
+    assert api.get("/super/0001", headers=headers).json()["products"] == done["result"]["products"]
+    assert api.get(response.headers["location"], headers=api.create_user("thor")).status_code == 404
+
+def test_receipt_job_returns_the_products(api, monkeypatch):
+    """
+    Verifica que un ticket en foto leido en background devuelva los productos
+    como resultado y borre la imagen al terminar
+    """
+    # jobs
+    from jobs import worker
+
+    spooled = []
+
+    async def read_spooled(path, size, digest):
+        spooled.append(path)
+        return "TOMATO 2 x 13,25 26,50"
+
+    headers = api.create_user()
+    monkeypatch.setattr(worker, "read_spooled", read_spooled)
+
+    response = api.post(
+        "/image/receipt",
+        headers = headers,
+        params = {"background": True},
+        files = {"image": ("receipt.png", b"image", "image/png")}
+    )
+
+    assert response.status_code == 202
+    done = wait_job(api, response.headers["location"], headers, status="done")
+    assert (done["kind"], done["stage"]) == ("receipt", "read")
+    assert done["result"] == [{"description": "tomato", "units": 2, "price": 13.25}]
+    assert len(spooled) == 1 and not os.path.exists(spooled[0])
+
+def test_spooled_image_is_deleted_when_the_job_is_not_queued(api, monkeypatch):
+    """
+    Verifica que si no se puede encolar el job se borre la imagen subida
+    """
+    # routers
+    from routers import image
+
+    spooled = []
+
+    async def spool_upload(upload):
+        spooled.append(await original(upload))
+        return spooled[-1]
+
+    async def accepted_job(username, kind, payload):
+        raise sqlite3.OperationalError("database is locked")
+
+    original = image.spool_upload
+    headers = api.create_user()
+    monkeypatch.setattr(image, "spool_upload", spool_upload)
+    monkeypatch.setattr(image, "accepted_job", accepted_job)
+
+    with pytest.raises(sqlite3.OperationalError):
+        api.post(
+            "/image/read/",
+            headers = headers,
+            params = {"background": True},
+            files = {"image": ("receipt.png", b"image", "image/png")}
+        )
+
+    assert len(spooled) == 1 and not os.path.exists(spooled[0][0])
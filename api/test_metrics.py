@@ -0,0 +1,122 @@
+# Python
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+# pytest
+import pytest
+
+os.environ.setdefault("JWT_SECRETKEY", "test")
+
+# FastAPI
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Prometheus
+from prometheus_client import REGISTRY
+
+# exceptions
+from exceptions import HTTPError
+
+# metrics
+from metrics import MetricsMiddleware, MongoCommandMetrics, render_metrics
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def build_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, routes=app.routes)
+
+    @app.get("/super/{order_id}")
+    async def supermarket_list(order_id: str):
+        if order_id == "missing":
+            raise HTTPError().not_found(message="List not found")
+        return {}
+
+    return TestClient(app)
+
+def test_requests_are_labelled_by_route_template():
+    """
+    Verifica que la latencia se agrupe por ruta y los errores por tipo de HTTPError
+    """
+    client = build_client()
+    labels = {"method": "GET", "route": "/super/{order_id}"}
+    requests = sample("http_request_duration_seconds_count", **labels)
+    errors = sample("http_request_errors_total", **labels, status="404", error="not_found")
+
+    client.get("/super/1")
+    client.get("/super/2")
+    client.get("/super/missing")
+    client.get("/nope")
+
+    assert sample("http_request_duration_seconds_count", **labels) == requests + 3
+    assert sample(
+        "http_request_errors_total", **labels, status="404", error="not_found"
+    ) == errors + 1
+    assert sample(
+        "http_request_errors_total", method="GET", route="unmatched", status="404", error="not_found"
+    ) >= 1
+    assert sample("http_requests_in_flight", method="GET") == 0
+    assert b"http_request_duration_seconds_bucket" in render_metrics()[0]
+
+def test_mongo_commands_by_collection():
+    """
+    Verifica que el listener de pymongo mida los comandos por coleccion
+    """
+    listener = MongoCommandMetrics()
+    before = sample("mongo_command_duration_seconds_count", collection="super_list", command="find")
+
+    for request_id, command in enumerate(
+        ({"find": "super_list"}, {"getMore": 12345, "collection": "super_list"})
+    ):
+        command_name = next(iter(command))
+        event = SimpleNamespace(
+            command = command,
+            command_name = command_name,
+            database_name = "test",
+            connection_id = ("localhost", 27017),
+            request_id = request_id,
+            duration_micros = 1500
+        )
+        listener.started(event)
+        listener.succeeded(event)
+
+    assert sample(
+        "mongo_command_duration_seconds_count", collection="super_list", command="find"
+    ) == before + 1
+    assert sample(
+        "mongo_command_duration_seconds_sum", collection="super_list", command="getMore"
+    ) >= 0.0015
+    assert listener.collections == {}
+
+@pytest.mark.benchmark
+def test_metrics_overhead_per_request():
+    """
+    Mide el tiempo que agrega el middleware de metricas por request
+    """
+    async def app(scope, receive, send):
+        scope["endpoint"] = endpoint
+        await send({"type": "http.response.start", "status": 200})
+
+    async def send(message):
+        pass
+
+    async def endpoint():
+        pass
+
+    middleware = MetricsMiddleware(app, routes=[SimpleNamespace(endpoint=endpoint, path="/super/")])
+    scope = {"type": "http", "method": "GET", "path": "/super/"}
+
+    async def requests():
+        for _ in range(20_000):
+            await middleware(scope, None, send)
+
+    start = time.perf_counter()
+    asyncio.run(requests())
+    elapsed = time.perf_counter() - start
+    print(f"metrics: {elapsed / 20_000 * 1e6:.2f} us per request")
+
+    assert sample("http_request_duration_seconds_count", method="GET", route="/super/") >= 20_000
@@ -0,0 +1,390 @@
+# Python
+import asyncio
+import os
+import sys
+from datetime import date
+from types import SimpleNamespace
+
+# pytest
+import pytest
+
+# pymongo
+from pymongo import monitoring
+
+# PassLib
+from passlib.context import CryptContext
+
+os.environ.setdefault("JWT_SECRETKEY", "test")
+
+# auth
+import auth
+
+# db
+from db.mongo_client import MongoDB
+
+# models
+from db.models.supermarket_list import SuperList, Products
+
+
+MONGO_TEST_URL = os.getenv("MONGO_TEST_URL")
+
+requires_mongo = pytest.mark.skipif(
+    not MONGO_TEST_URL,
+    reason = "MONGO_TEST_URL is not set"
+)
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self) -> None:
+        self.commands = []
+
+    def started(self, event):
+        self.commands.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+class CountingCollection:
+    """
+    Motor collection of the mock backend, records the command that each call
+    would send to a server
+    """
+    COMMANDS = {
+        "insert_one": "insert",
+        "insert_many": "insert",
+        "find": "find",
+        "find_one": "find",
+        "find_one_and_update": "findAndModify",
+        "update_one": "update",
+        "update_many": "update",
+        "bulk_write": "update",
+        "delete_one": "delete",
+        "delete_many": "delete",
+        "aggregate": "aggregate",
+        "count_documents": "aggregate",
+        "create_indexes": "createIndexes"
+    }
+
+    def __init__(self, collection, commands: list) -> None:
+        self.collection = collection
+        self.commands = commands
+
+    def __getattr__(self, name):
+        attribute = getattr(self.collection, name)
+        if name not in self.COMMANDS:
+            return attribute
+
+        def call(*args, **kwargs):
+            self.commands.append(self.COMMANDS[name])
+            return attribute(*args, **kwargs)
+
+        return call
+
+
+class CountingDatabase:
+    def __init__(self, database, commands: list) -> None:
+        self.database = database
+        self.commands = commands
+
+    def __getattr__(self, name):
+        return CountingCollection(getattr(self.database, name), self.commands)
+
+    def __getitem__(self, name):
+        return CountingCollection(self.database[name], self.commands)
+
+
+@pytest.fixture(params=["mock", pytest.param("server", marks=requires_mongo)])
+def mongo_api(request, api, monkeypatch):
+    """
+    The api fixture on a MongoDB backend, a mongomock one or the server at
+    MONGO_TEST_URL, with the Mongo commands it sends in api.commands
+    """
+    # db
+    import db.mongo_client
+
+    if request.param == "mock":
+        mongomock_motor = pytest.importorskip("mongomock_motor")
+        commands = []
+        monkeypatch.setattr(
+            db.mongo_client,
+            "AsyncIOMotorClient",
+            lambda url, **options: SimpleNamespace(
+                test = CountingDatabase(mongomock_motor.AsyncMongoMockClient().test, commands)
+            )
+        )
+        mongo = MongoDB(url="mongodb://mock", test=True)
+    else:
+        counter = CommandCounter()
+        commands = counter.commands
+        mongo = MongoDB(url=MONGO_TEST_URL, test=True, event_listeners=[counter])
+
+    async def setup() -> None:
+        for collection in ("users", "super_list", "super_rollups", "products", "counters"):
+            await mongo.database[collection].drop()
+        await mongo.setup()
+
+    asyncio.run(setup())
+    for module in list(sys.modules.values()):
+        if getattr(module, "db_client", None) is api.db:
+            monkeypatch.setattr(module, "db_client", mongo)
+    # the bcrypt cost is not what is measured
+    monkeypatch.setattr(auth, "pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=4))
+    api.db = mongo
+    api.commands = commands
+
+    return api
+
+
+@pytest.fixture(params=["mock", pytest.param("server", marks=requires_mongo)])
+def mongo_db(request, monkeypatch) -> MongoDB:
+    """
+    An empty MongoDB backend, a mongomock one or the server at MONGO_TEST_URL
+    """
+    # db
+    import db.mongo_client
+
+    if request.param == "mock":
+        mongomock_motor = pytest.importorskip("mongomock_motor")
+        monkeypatch.setattr(
+            db.mongo_client,
+            "AsyncIOMotorClient",
+            lambda url, **options: mongomock_motor.AsyncMongoMockClient()
+        )
+        mongo = MongoDB(url="mongodb://mock", test=True)
+    else:
+        mongo = MongoDB(url=MONGO_TEST_URL, test=True)
+
+    async def setup() -> None:
+        for collection in ("super_list", "super_rollups", "products", "counters"):
+            await mongo.database[collection].drop()
+        await mongo.setup()
+
+    asyncio.run(setup())
+
+    return mongo
+
+
+def test_endpoints_use_a_single_command(mongo_api):
+    """
+    Verifica que cada endpoint de escritura haga un solo viaje a Mongo,
+    mas la actualizacion de los rollups de las listas
+    """
+    fake_user = {
+        "username": "ironman",
+        "name": "Anthony",
+        "lastname": "Stark",
+        "email": "tony@starkindustries.com",
+        "birth_date": "2000-12-25",
+        "password": "ILoveMark40"
+    }
+    headers = {}
+    commands = {}
+
+    def count(name, method, path, **kwargs):
+        mongo_api.commands.clear()
+        response = mongo_api.request(method, path, headers=headers, **kwargs)
+        commands[name] = (response.status_code, list(mongo_api.commands))
+        return response
+
+    def register(order):
+        return {
+            "params": {"order": order, "issue_date": "2023-12-30"},
+            "json": [{"description": "tomato", "units": 1, "price": 20}]
+        }
+
+    count("signup", "POST", "/users/signup", json=fake_user)
+    count("signup_duplicated", "POST", "/users/signup", json=fake_user)
+    token = count(
+        "login", "POST", "/login/token",
+        data = {"username": "ironman", "password": "ILoveMark40"}
+    ).json()["access_token"]
+    headers["Authorization"] = f"Bearer {token}"
+    count("current_user", "GET", "/login/users/me")
+    count("current_user_cached", "GET", "/login/users/me")
+    count("update_user", "PATCH", "/users/ironman", json=[{"name": "Tony"}])
+
+    # interns "tomato" in the product catalog
+    mongo_api.post("/super/", headers=headers, **register("0000"))
+    count("register_list", "POST", "/super/", **register("0001"))
+    count("register_list_duplicated", "POST", "/super/", **register("0001"))
+    count("show_list", "GET", "/super/0001")
+    count("delete_list", "DELETE", "/super/0001")
+    count("show_deleted_list", "GET", "/super/0001")
+
+    assert commands == {
+        "signup": (201, ["insert"]),
+        "signup_duplicated": (409, ["insert"]),
+        "login": (200, ["find"]),
+        "current_user": (200, ["find"]),
+        "current_user_cached": (200, []),
+        # the router reads the user again to check it was not deleted
+        "update_user": (200, ["find", "findAndModify"]),
+        "register_list": (201, ["insert", "update"]),
+        "register_list_duplicated": (400, ["insert"]),
+        "show_list": (200, ["find"]),
+        # the price bounds of tomato on that day are recomputed from the list 0000
+        "delete_list": (200, ["findAndModify", "update", "delete", "aggregate", "update"]),
+        "show_deleted_list": (404, ["find"])
+    }
+
+
+def test_lists_from_before_the_catalog_can_be_updated(mongo_api):
+    """
+    Verifica que una lista guardada con descripciones, sin migrar al catalogo,
+    se pueda actualizar y borrar sin tocar los rollups de esos productos
+    """
+    headers = mongo_api.create_user()
+    asyncio.run(
+        mongo_api.db.superlist_mongo_db.insert_one({
+            "username": "ironman",
+            "order": "0001",
+            "issue_date": "2023-12-30",
+            "supermarket": None,
+            "url": None,
+            "disabled": False,
+            "products": [{"description": "tomato", "units": 1, "price": 20}]
+        })
+    )
+
+    updated = mongo_api.post("/super/0001", headers=headers, json=[{"supermarket": "DIA"}])
+    deleted = mongo_api.delete("/super/0001", headers=headers)
+
+    assert updated.status_code == 200
+    assert updated.json()["products"] == [{"description": "tomato", "units": 1, "price": 20}]
+    assert deleted.status_code == 200
+    assert asyncio.run(mongo_api.db.rollups_mongo_db.count_documents({})) == 0
+
+def test_cursors_cannot_inject_query_operators(mongo_api):
+    """
+    Verifica que un cursor con operadores de Mongo en lugar de strings responda 400
+    en vez de llegar al filtro
+    """
+    # db
+    from db.pagination import encode_cursor
+
+    headers = mongo_api.create_user()
+    cursors = {
+        "/super/": encode_cursor([{"$ne": None}, "6591a2b3c4d5e6f7a8b9c0d1"]),
+        "/users/": encode_cursor([{"$ne": None}])
+    }
+
+    for path, cursor in cursors.items():
+        response = mongo_api.get(path, headers=headers, params={"cursor": cursor})
+        assert response.status_code == 400
+        assert response.json()["detail"]["errmsg"] == "Invalid cursor"
+
+def test_rollups_follow_the_super_lists(mongo_db):
+    """
+    Verifica que los rollups incrementales coincidan con un rebuild desde cero,
+    que ignora igual que ellos los productos de antes del catalogo
+    """
+    # db
+    from db.rollups import verify
+
+    def super_list(order, day, products):
+        return SuperList(
+            username = "ironman",
+            order = order,
+            issue_date = day,
+            products = [
+                Products(description=description, units=units, price=price)
+                for description, units, price in products
+            ]
+        )
+
+    async def run() -> tuple:
+        db = mongo_db
+        await db.superlist_mongo_db.insert_one({
+            "username": "ironman",
+            "order": "0000",
+            "issue_date": "2023-12-30",
+            "disabled": False,
+            "products": [{"description": "tomato", "units": 1, "price": 20}]
+        })
+        await db.insert_superlist(
+            super_list("0001", date(2023, 12, 30), [("tomato", 2, 10), ("milk", 1, 5)])
+        )
+        await db.insert_superlists(
+            [
+                super_list("0002", date(2023, 12, 30), [("tomato", 1, 30)]),
+                super_list("0003", date(2023, 12, 31), [("milk", 3, 6)])
+            ]
+        )
+        await db.get_superlist_with_orderid_and_update(
+            "ironman", "0002", [{"products": [{"description": "tomato", "units": 1, "price": 12}]}]
+        )
+        await db.get_superlist_with_orderid_and_update("ironman", "0003", [{"disabled": True}])
+
+        metrics = await db.product_metrics("ironman", date(2023, 12, 1), date(2023, 12, 31))
+        return await verify(db.database, "ironman"), metrics
+
+    differences, metrics = asyncio.run(run())
+
+    assert differences == []
+    assert [
+        (m.description, m.quantity, m.total_spend, m.min_price, m.max_price)
+        for m in metrics
+    ] == [("tomato", 3, 32, 10, 12), ("milk", 1, 5, 5, 5)]
+
+def test_stored_list_is_kept_when_the_rollups_fail(mongo_api, monkeypatch):
+    """
+    Verifica que si falla la actualizacion de los rollups la lista guardada se
+    informe como creada, y que verify muestre la diferencia a reconstruir
+    """
+    # db
+    from db.rollups import verify
+
+    async def bulk_write(*args, **kwargs):
+        raise ConnectionError("rollups unreachable")
+
+    headers = mongo_api.create_user()
+    monkeypatch.setattr(
+        mongo_api.db,
+        "rollups_mongo_db",
+        SimpleNamespace(bulk_write=bulk_write)
+    )
+    params = {"order": "0001", "issue_date": "2023-12-30"}
+    products = [{"description": "tomato", "units": 1, "price": 20}]
+
+    created = mongo_api.post("/super/", headers=headers, params=params, json=products)
+    retried = mongo_api.post("/super/", headers=headers, params=params, json=products)
+
+    assert created.status_code == 201
+    assert retried.status_code == 400
+    assert mongo_api.get("/super/0001", headers=headers).status_code == 200
+    assert len(asyncio.run(verify(mongo_api.db.database, "ironman"))) == 5
+
+@requires_mongo
+def test_catalog_interns_descriptions():
+    """
+    Verifica que cada descripcion tenga un unico id, compartido entre procesos
+    """
+    # db
+    from db.catalog import ProductCatalog
+
+    async def run() -> tuple:
+        db = MongoDB(url=MONGO_TEST_URL, test=True)
+        await db.database.products.drop()
+        await db.database.counters.drop()
+        await db.setup()
+
+        ids = await db.catalog.ids(["tomato", "milk"])
+        other_process = ProductCatalog(db.database)
+        same_ids = await other_process.ids(["milk", "tomato", "bread"])
+        unknown = await other_process.ids(["rice"], create=False)
+        super_lists = await other_process.decode(
+            [{"products": [{"product_id": ids["milk"], "units": 1, "price": 5}]}]
+        )
+
+        return ids, same_ids, unknown, super_lists
+
+    ids, same_ids, unknown, super_lists = asyncio.run(run())
+
+    assert same_ids["tomato"] == ids["tomato"] and same_ids["milk"] == ids["milk"]
+    assert same_ids["bread"] not in ids.values()
+    assert unknown == {}
+    assert super_lists == [{"products": [{"units": 1, "price": 5, "description": "milk"}]}]
@@ -0,0 +1,305 @@
+# Python
+import io
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# pytest
+import pytest
+
+# Pillow
+from PIL import Image, ImageDraw
+
+os.environ.setdefault("JWT_SECRETKEY", "test")
+
+# config
+from config import settings
+
+# OCR
+from ocr import pipeline
+from ocr.cache import OCRCache
+from ocr.images import InvalidImage, image_key, ocr_file, preprocess
+from ocr.receipt import parse_receipt_text
+
+# models
+from db.models.supermarket_list import Products
+
+
+RECEIPT_LINES = [
+    "SUPERMERCADO EJEMPLO",
+    "TOMATO 2 x 13,25 26,50",
+    "MILK 1L 1 x 5.00 5.00",
+    "BREAD 3,10",
+    "TOTAL 34,60"
+]
+
+
+def build_receipt_image(width: int = 3000) -> Image.Image:
+    """
+    A photo-like receipt: gray paper, dark text, wider than ocr_max_width.
+    """
+    image = Image.new("RGB", (width, width * 2), (200, 196, 190))
+    draw = ImageDraw.Draw(image)
+    for line, text in enumerate(RECEIPT_LINES * 10):
+        draw.text((40, 40 + line * 30), text, fill=(30, 30, 30))
+
+    return image
+
+def png_bytes(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+
+    return buffer.getvalue()
+
+def post_image(api, path: str, headers: dict, content: bytes = b"image"):
+    return api.post(path, headers=headers, files={"image": ("receipt.png", content, "image/png")})
+
+
+def test_preprocess_downscales_and_binarizes():
+    """
+    Verifica que la imagen se achique al ancho maximo y quede en blanco y negro
+    """
+    image = preprocess(build_receipt_image(), max_width=1600)
+
+    assert image.size == (1600, 3200)
+    assert image.mode == "1"
+    assert set(image.convert("L").getdata()) == {0, 255}
+
+def test_parse_receipt_text():
+    """
+    Verifica que el texto del ticket se convierta en productos
+    """
+    text = "\n".join(RECEIPT_LINES[:2] + ["2 x 1.250,00", "COFFEE 2.500,00"] + RECEIPT_LINES[2:])
+
+    assert parse_receipt_text(text) == [
+        Products(description="tomato", units=2, price=13.25),
+        Products(description="coffee", units=2, price=1250),
+        Products(description="milk 1l", units=1, price=5),
+        Products(description="bread", units=1, price=3.1)
+    ]
+
+def test_ocr_cache_hits_and_eviction():
+    """
+    Verifica que el cache devuelva el texto guardado, cuente aciertos y bytes
+    ahorrados, y descarte los resultados menos usados al pasarse de tamaño
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        cache = OCRCache(os.path.join(directory, "ocr.sqlite3"), max_bytes=100)
+
+        assert cache.get("raw:a") is None
+        cache.record(False, 2000)
+        cache.set(["raw:a", "img:a"], "x" * 40)
+        assert cache.get("img:a") == "x" * 40
+        cache.record(True, 2000)
+
+        time.sleep(0.01)
+        cache.touch("raw:a")
+        cache.set(["raw:b"], "y" * 40)
+        # 120 bytes: the oldest, img:a, goes
+        assert cache.get("img:a") is None
+        assert cache.get("raw:a") == "x" * 40
+
+        stats = OCRCache(cache.path, max_bytes=100).stats()
+        assert (stats.entries, stats.size_bytes) == (2, 80)
+        assert (stats.hits, stats.misses, stats.hit_rate, stats.bytes_saved) == (1, 1, 0.5, 2000)
+
+def test_ocr_cache_keeps_a_running_size():
+    """
+    Verifica que el tamaño guardado en ocr_stats siga a las altas, reemplazos
+    y descartes, y que se descarten solo los necesarios para entrar en el limite
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        cache = OCRCache(os.path.join(directory, "ocr.sqlite3"), max_bytes=100)
+
+        cache.set(["raw:a", "img:a"], "x" * 40)
+        cache.set(["raw:a"], "x" * 10)
+        assert cache.size() == 50
+
+        for number, key in enumerate(["raw:b", "raw:c", "raw:d"]):
+            time.sleep(0.01)
+            cache.set([key], "y" * (20 + number))
+        # 113 bytes: img:a, the oldest, frees enough
+        assert cache.get("img:a") is None
+        assert cache.get("raw:a") == "x" * 10
+
+        total = cache.connection.execute("SELECT SUM(size) FROM ocr_results").fetchone()[0]
+        assert cache.size() == total == 73
+        assert cache.evict() == 0
+
+def test_image_key_ignores_encoding():
+    """
+    Verifica que la misma foto guardada en PNG y en BMP tenga la misma clave
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        keys = set()
+        for name in ("receipt.png", "receipt.bmp"):
+            path = os.path.join(directory, name)
+            build_receipt_image(1200).save(path)
+            with Image.open(path) as image:
+                keys.add(image_key(preprocess(image, max_width=800)))
+
+    assert len(keys) == 1
+
+@pytest.mark.benchmark
+def test_preprocess_time_per_image():
+    """
+    Mide el tiempo de preprocesar una foto de ticket de 3000x6000
+    """
+    image = build_receipt_image()
+
+    start = time.perf_counter()
+    preprocess(image, max_width=1600)
+    elapsed = time.perf_counter() - start
+    print(f"preprocess: {elapsed * 1000:.1f} ms per 3000x6000 image")
+
+    assert elapsed > 0
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(not shutil.which("tesseract"), reason="tesseract is not installed")
+def test_ocr_throughput_scales_with_workers():
+    """
+    Mide imagenes por segundo con 1 worker y con un worker por core
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for number in range(8):
+            path = os.path.join(directory, f"receipt-{number}.png")
+            build_receipt_image(1200).save(path)
+            paths.append(path)
+
+        throughput = {}
+        for workers in sorted({1, os.cpu_count() or 1}):
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                start = time.perf_counter()
+                texts = list(pool.map(ocr_file, paths, [1600] * len(paths)))
+                throughput[workers] = len(paths) / (time.perf_counter() - start)
+        print(
+            "ocr: "
+            + ", ".join(f"{workers} workers {rate:.2f} images/s" for workers, rate in throughput.items())
+        )
+
+    assert all("TOMATO" in text.upper() for text in texts)
+    assert throughput[max(throughput)] >= throughput[1]
+
+def test_receipt_image_is_read_into_products(api, monkeypatch):
+    """
+    Verifica que /image/receipt devuelva los productos del texto leido
+    y /image/read/ el texto
+    """
+    async def read_spooled(path, size, digest):
+        assert os.path.exists(path)
+        return "\n".join(RECEIPT_LINES)
+
+    headers = api.create_user()
+    monkeypatch.setattr(pipeline, "read_spooled", read_spooled)
+
+    receipt = post_image(api, "/image/receipt", headers)
+    text = post_image(api, "/image/read/", headers)
+
+    assert receipt.status_code == 200
+    assert receipt.json() == [
+        {"description": "tomato", "units": 2, "price": 13.25},
+        {"description": "milk 1l", "units": 1, "price": 5},
+        {"description": "bread", "units": 1, "price": 3.1}
+    ]
+    assert text.status_code == 200
+    assert text.text == "\n".join(RECEIPT_LINES)
+
+def test_images_over_the_size_cap_are_rejected(api, monkeypatch):
+    """
+    Verifica que una imagen mas grande que ocr_max_bytes responda 413 sin leerse
+    """
+    async def read_spooled(path, size, digest):
+        raise AssertionError("the image should not be read")
+
+    headers = api.create_user()
+    monkeypatch.setattr(pipeline, "read_spooled", read_spooled)
+    monkeypatch.setattr(settings, "ocr_max_bytes", 100)
+
+    response = post_image(api, "/image/receipt", headers, b"x" * 101)
+
+    assert response.status_code == 413
+    assert response.json()["detail"]["errmsg"] == "Images up to 100 bytes"
+    assert pipeline.ocr_jobs == 0
+
+def test_busy_ocr_rejects_at_once(api, monkeypatch):
+    """
+    Verifica que con los workers y la cola de OCR llenos se responda 503
+    con Retry-After sin leer la imagen
+    """
+    async def read_spooled(path, size, digest):
+        raise AssertionError("the image should not be read")
+
+    headers = api.create_user()
+    monkeypatch.setattr(pipeline, "read_spooled", read_spooled)
+    monkeypatch.setattr(pipeline, "ocr_jobs", settings.ocr_workers + settings.ocr_queue_depth)
+
+    response = post_image(api, "/image/receipt", headers)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+    assert response.json()["detail"]["errmsg"] == "Too many images being read, try again later"
+
+def test_invalid_images_are_rejected(api, monkeypatch):
+    """
+    Verifica que una imagen que no se puede decodificar responda 400
+    y se borre el archivo temporal
+    """
+    spooled = []
+
+    async def read_spooled(path, size, digest):
+        spooled.append(path)
+        raise InvalidImage("Unknown image format")
+
+    headers = api.create_user()
+    monkeypatch.setattr(pipeline, "read_spooled", read_spooled)
+
+    response = post_image(api, "/image/read/", headers, b"not an image")
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == {
+        "errmsg": "Invalid image",
+        "errdetail": "Unknown image format"
+    }
+    assert len(spooled) == 1 and not os.path.exists(spooled[0])
+
+@pytest.mark.skipif(not shutil.which("tesseract"), reason="tesseract is not installed")
+def test_receipt_photo_is_read_with_tesseract(api):
+    """
+    Verifica de punta a punta que la foto de un ticket se lea con Tesseract
+    """
+    headers = api.create_user()
+
+    response = post_image(api, "/image/read/", headers, png_bytes(build_receipt_image(1200)))
+
+    assert response.status_code == 200
+    assert "TOMATO" in response.text.upper()
+
+def test_duplicate_upload_skips_the_ocr_pool(api, monkeypatch):
+    """
+    Verifica que subir la misma imagen dos veces lea la segunda del cache por
+    su hash, sin pasar por el pool de OCR, y cuente los bytes ahorrados
+    """
+    reads = []
+
+    def ocr_file_cached(path, max_width, lang, cache_path):
+        reads.append(path)
+        return "TOMATO 2 x 13,25 26,50", "img:receipt", False
+
+    content = png_bytes(build_receipt_image(200))
+    with tempfile.TemporaryDirectory() as directory:
+        headers = api.create_user()
+        cache = OCRCache(os.path.join(directory, "ocr.sqlite3"), max_bytes=1000)
+        monkeypatch.setattr(pipeline, "_ocr_cache", cache)
+        monkeypatch.setattr(pipeline, "ocr_file_cached", ocr_file_cached)
+        # the stub can't be pickled to the OCR processes
+        monkeypatch.setattr(pipeline, "get_ocr_pool", lambda: None)
+
+        texts = [post_image(api, "/image/read/", headers, content).text for _ in range(2)]
+        stats = api.get("/image/cache/stats", headers=headers).json()
+
+    assert texts == ["TOMATO 2 x 13,25 26,50"] * 2
+    assert len(reads) == 1
+    assert (stats["hits"], stats["misses"], stats["bytes_saved"]) == (1, 1, len(content))
@@ -0,0 +1,149 @@
+# pytest
+import pytest
+
+# FastAPI
+from fastapi import HTTPException
+
+# db
+from db.pagination import decode_cursor, encode_cursor, paginate, parse_fields
+
+# models
+from db.models.user import User
+
+
+def register(api, headers: dict, order: str, issue_date: str):
+    return api.post(
+        "/super/",
+        headers = headers,
+        params = {"order": order, "issue_date": issue_date},
+        json = [{"description": "tomato", "units": 1, "price": 20}]
+    )
+
+def all_pages(api, path: str, headers: dict = None, **params) -> list[dict]:
+    pages = []
+    while True:
+        response = api.get(path, headers=headers, params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert set(page) == {"items", "next_cursor"}
+        pages.append(page)
+        if page["next_cursor"] is None:
+            return pages
+        params["cursor"] = page["next_cursor"]
+
+
+def test_cursor_round_trip():
+    """
+    Verifica que el cursor sea opaco y devuelva la clave de orden que empaqueta
+    """
+    cursor = encode_cursor(["2023-12-30", "0001"])
+
+    assert "2023" not in cursor
+    assert decode_cursor(cursor, types=(str, str)) == ["2023-12-30", "0001"]
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        encode_cursor(["ironman"]),
+        encode_cursor({"a": 1}),
+        encode_cursor([{"$ne": None}, "6591a2b3c4d5e6f7a8b9c0d1"]),
+        encode_cursor(["2023-12-30", 1])
+    ]
+)
+def test_invalid_cursors_are_rejected(cursor):
+    """
+    Verifica que un cursor mal formado, de otro orden o con valores que no son
+    strings responda 400
+    """
+    with pytest.raises(HTTPException) as err:
+        decode_cursor(cursor, types=(str, str))
+
+    assert err.value.status_code == 400
+    assert err.value.detail["errmsg"] == "Invalid cursor"
+
+def test_paginate_is_keyset_on_the_whole_sort_key():
+    """
+    Verifica que las paginas no repitan ni salteen documentos con la misma fecha,
+    en orden ascendente y descendente
+    """
+    docs = [
+        {"issue_date": f"2023-12-{day:02}", "order": f"{order:04}", "price": order}
+        for order, day in enumerate([1, 1, 1, 2, 3, 3, 4])
+    ]
+    sort_key = lambda doc: [doc["issue_date"], doc["order"]]
+
+    for descending in (False, True):
+        seen = []
+        cursor = None
+        while True:
+            page = paginate(docs, sort_key, limit=2, cursor=cursor, descending=descending)
+            assert len(page.items) <= 2
+            seen.extend(page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        assert seen == sorted(docs, key=sort_key, reverse=descending)
+
+def test_paginate_projects_fields():
+    """
+    Verifica que fields deje solo los campos pedidos en cada item
+    """
+    docs = [{"username": name, "name": name.title(), "email": f"{name}@mail.com"} for name in ("a", "b")]
+
+    page = paginate(docs, lambda doc: [doc["username"]], limit=1, fields=["username", "name"])
+
+    assert page.items == [{"username": "a", "name": "A"}]
+    assert page.next_cursor == encode_cursor(["a"])
+
+def test_parse_fields_rejects_unknown_fields():
+    """
+    Verifica que fields acepte solo campos del modelo
+    """
+    assert parse_fields(" username, name ", User) == ["username", "name"]
+    assert parse_fields("", User) is None
+
+    with pytest.raises(HTTPException) as err:
+        parse_fields("username,password", User)
+    assert err.value.detail["errmsg"] == "Unknown fields: password"
+
+def test_super_lists_are_paged_newest_first(api):
+    """
+    Verifica que GET /super/ pagine todo el historial, sin cortarlo, en paginas
+    del tamaño pedido y con los campos pedidos
+    """
+    headers = api.create_user()
+    days = ["2023-12-01", "2023-12-03", "2023-12-03", "2023-12-02", "2023-12-05"]
+    for order, day in enumerate(days):
+        assert register(api, headers, f"{order:04}", day).status_code == 201
+
+    pages = all_pages(api, "/super/", headers, limit=2, fields="order,issue_date")
+    items = [item for page in pages for item in page["items"]]
+
+    assert [len(page["items"]) for page in pages] == [2, 2, 1]
+    assert items == [
+        {"order": "0004", "issue_date": "2023-12-05"},
+        {"order": "0002", "issue_date": "2023-12-03"},
+        {"order": "0001", "issue_date": "2023-12-03"},
+        {"order": "0003", "issue_date": "2023-12-02"},
+        {"order": "0000", "issue_date": "2023-12-01"}
+    ]
+
+    assert api.get("/super/", headers=headers, params={"cursor": "nope"}).status_code == 400
+    assert api.get("/super/", headers=headers, params={"fields": "nope"}).status_code == 400
+    assert api.get("/super/", headers=headers, params={"limit": 0}).status_code == 422
+
+def test_users_are_paged_by_username(api):
+    """
+    Verifica que GET /users/ pagine los usuarios por username
+    """
+    for username in ("thor", "hulk", "ironman"):
+        api.create_user(username)
+
+    pages = all_pages(api, "/users/", limit=2, fields="username")
+
+    assert [page["items"] for page in pages] == [
+        [{"username": "hulk"}, {"username": "ironman"}],
+        [{"username": "thor"}]
+    ]
@@ -0,0 +1,80 @@
+# Python
+import time
+
+# pytest
+import pytest
+
+# e-ticket
+from eticket.parsers import PARSERS, get_parser, parse_ticket, register_parser
+
+# models
+from db.models.supermarket_list import Products
+
+
+def build_ticket(rows: int) -> str:
+    body = "".join(
+        f"""
+        <tr class="font table-full-alt">
+            <td><div> Product {i} </div></td>
+            <td><div class="center">{i % 5 + 1}</div></td>
+            <td><div class="center">{i * 1.5:.2f}</div></td>
+        </tr>
+        """
+        for i in range(rows)
+    )
+
+    return f"""
+    <html><body>
+        <table>
+            <tr class="font"><td><div>Header</div></td></tr>
+            {body}
+        </table>
+    </body></html>
+    """
+
+
+def test_default_parser_reads_rows():
+    """
+    Verifica que el parser por defecto lea descripcion, unidades y precio de cada fila
+    """
+    products = parse_ticket(build_ticket(3))
+
+    assert products == [
+        Products(description="product 0", units=1, price=0.0),
+        Products(description="product 1", units=2, price=1.5),
+        Products(description="product 2", units=3, price=3.0)
+    ]
+
+def test_unknown_supermarket_uses_default_parser():
+    """
+    Verifica que un supermercado sin parser registrado use el parser por defecto
+    """
+    assert get_parser("Unknown") is get_parser(None)
+
+def test_register_parser_by_supermarket():
+    """
+    Verifica que el registro use el campo supermarket normalizado
+    """
+    @register_parser("Test Market")
+    def parse_test_market(html: str) -> list[Products]:
+        return []
+
+    try:
+        assert get_parser(" test market ") is parse_test_market
+    finally:
+        del PARSERS["test market"]
+
+@pytest.mark.benchmark
+def test_parse_time_per_kb():
+    """
+    Mide el tiempo de parseo por KB sobre un ticket grande
+    """
+    ticket = build_ticket(2000)
+    kb = len(ticket.encode()) / 1024
+
+    start = time.perf_counter()
+    products = parse_ticket(ticket)
+    elapsed = time.perf_counter() - start
+    print(f"parse: {elapsed / kb * 1_000_000:.1f} us/KB over {kb:.0f} KB")
+
+    assert len(products) == 2000
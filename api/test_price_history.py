@@ -0,0 +1,95 @@
+# Python
+import os
+import time
+from datetime import date
+
+# pytest
+import pytest
+
+# NumPy
+import numpy as np
+
+os.environ.setdefault("JWT_SECRETKEY", "test")
+
+# analytics
+from price_history import PriceHistory
+
+
+def build_history() -> PriceHistory:
+    return PriceHistory.from_super_lists(
+        [
+            {
+                "issue_date": "2023-01-10",
+                "products": [
+                    {"description": "tomato", "units": 2, "price": 10},
+                    {"description": "milk", "units": 1, "price": 5}
+                ]
+            },
+            {
+                "issue_date": "2023-02-10",
+                "products": [
+                    {"description": "tomato", "units": 2, "price": 12},
+                    {"description": "milk", "units": 1, "price": 5}
+                ]
+            },
+            {
+                "issue_date": "2023-02-12",
+                "products": [{"description": "tomato", "units": 1, "price": 18}]
+            }
+        ]
+    )
+
+def test_inflation_index_is_chained_by_spend():
+    """
+    Verifica que el indice mensual pondere cada producto por el gasto del mes anterior
+    """
+    points = build_history().inflation_index()
+
+    # tomato 10 -> 14 (weight 20), milk 5 -> 5 (weight 5)
+    assert [(point.month, point.index, point.products) for point in points] == [
+        ("2023-01", 100.0, 2),
+        ("2023-02", 132.0, 2)
+    ]
+
+def test_volatility_and_moving_average():
+    """
+    Verifica la dispersion de precios por producto y el promedio movil diario
+    """
+    price_history = build_history()
+
+    volatility = price_history.volatility()
+    assert [item.description for item in volatility] == ["tomato", "milk"]
+    assert volatility[1].std_price == 0
+
+    points = price_history.moving_average("tomato", window=3)
+    assert [(point.day, point.price, point.moving_average) for point in points] == [
+        (date(2023, 1, 10), 10.0, 10.0),
+        (date(2023, 2, 10), 12.0, 12.0),
+        (date(2023, 2, 12), 18.0, 15.0)
+    ]
+    assert price_history.moving_average("bread") == []
+
+@pytest.mark.benchmark
+def test_analytics_time_for_100k_line_items():
+    """
+    Verifica que las tres metricas sobre 100k items de un usuario tarden menos de 100 ms
+    """
+    size = 100_000
+    rng = np.random.default_rng(0)
+    days = np.datetime64("2020-01-01") + rng.integers(0, 3 * 365, size)
+    price_history = PriceHistory(
+        descriptions = [f"product {code}" for code in rng.integers(0, 2000, size)],
+        days = days.astype(str),
+        units = rng.integers(1, 5, size),
+        prices = rng.uniform(1, 100, size)
+    )
+
+    start = time.perf_counter()
+    price_history.inflation_index()
+    price_history.volatility()
+    price_history.moving_average("product 7", window=30)
+    elapsed = time.perf_counter() - start
+    print(f"price history analytics: {elapsed * 1000:.1f} ms over {size} line items")
+
+    assert len(price_history) == size
+    assert elapsed < 0.1
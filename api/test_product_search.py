@@ -0,0 +1,68 @@
+# Python
+import os
+import time
+
+# pytest
+import pytest
+
+# NumPy
+import numpy as np
+
+os.environ.setdefault("JWT_SECRETKEY", "test")
+
+# product search
+from product_search import ProductSearchIndex
+
+
+SEARCH_P99 = 0.05 # seconds, per keystroke
+
+
+def test_search_ranks_prefix_word_and_fuzzy_matches():
+    """
+    Verifica que primero aparezcan los prefijos, luego las palabras y luego los parecidos
+    """
+    index = ProductSearchIndex(
+        ["tomato", "tomato sauce", "cherry tomato", "potato", "milk", "tomato"]
+    )
+
+    assert len(index) == 5
+    assert [(match.description, match.match) for match in index.search("Tomat", limit=4)] == [
+        ("tomato", "prefix"),
+        ("tomato sauce", "prefix"),
+        ("cherry tomato", "word")
+    ]
+    assert [match.description for match in index.search("tomatto")][:2] == [
+        "tomato",
+        "tomato sauce"
+    ]
+    assert index.search("xyz") == []
+
+@pytest.mark.benchmark
+def test_search_latency_over_1m_products():
+    """
+    Verifica el p99 de la busqueda sobre un catalogo sintetico de 1M de productos:
+    tiene que alcanzar para buscar mientras se escribe
+    """
+    size = 1_000_000
+    rng = np.random.default_rng(0)
+    words = ["tomato", "milk", "bread", "rice", "cheese", "apple", "coffee", "sugar"]
+    index = ProductSearchIndex(
+        f"{words[word]} brand{brand} {grams}g"
+        for word, brand, grams in zip(
+            rng.integers(0, len(words), size),
+            rng.integers(0, 5000, size),
+            rng.integers(1, 1000, size)
+        )
+    )
+
+    queries = ["tom", "milk brand12", "brnd42", "chese brand4999", "brand123", "cofee 25"]
+    latencies = []
+    for _ in range(20):
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query)
+            latencies.append(time.perf_counter() - start)
+    p99 = np.percentile(latencies, 99)
+    print(f"product search: p99 {p99 * 1000:.1f} ms over {len(index)} products")
+
+    assert p99 < SEARCH_P99
@@ -0,0 +1,129 @@
+# Python
+import os
+import time
+
+# pytest
+import pytest
+
+os.environ.setdefault("JWT_SECRETKEY", "test")
+
+# FastAPI
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# config
+from config import settings
+
+# auth
+from auth import create_access_token
+
+# rate limiting
+from ratelimit import RateLimitMiddleware, TokenBuckets
+
+
+def build_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware)
+
+    @app.post("/login/token")
+    async def login():
+        return {}
+
+    @app.get("/super/")
+    async def super_lists():
+        return {}
+
+    @app.get("/super/{order_id}")
+    async def super_list(order_id: str):
+        return {}
+
+    @app.get("/users/{username}")
+    async def user(username: str):
+        return {}
+
+    @app.get("/metrics")
+    async def metrics():
+        return {}
+
+    return TestClient(app)
+
+def test_token_bucket_refills_and_evicts_lru():
+    """
+    Verifica que el bucket permita la rafaga, calcule la espera y se recargue,
+    y que se descarte la clave menos usada
+    """
+    buckets = TokenBuckets(maxsize=2)
+
+    assert [buckets.acquire("a", rate=2, burst=3, now=0) for _ in range(4)] == [0, 0, 0, 0.5]
+    assert buckets.acquire("a", rate=2, burst=3, now=0.5) == 0
+
+    buckets.acquire("b", rate=2, burst=3, now=0.5)
+    buckets.acquire("a", rate=2, burst=3, now=0.5)
+    buckets.acquire("c", rate=2, burst=3, now=0.5)
+    assert len(buckets) == 2 and "b" not in buckets._buckets
+
+def test_route_budgets_per_client():
+    """
+    Verifica que /login/token tenga su propio presupuesto por IP, que devuelva
+    429 con Retry-After, y que las demas rutas se cuenten por usuario del token
+    """
+    client = build_client()
+    rate, burst = settings.rate_limit_budgets["POST /login/token"]
+
+    responses = [client.post("/login/token") for _ in range(burst + 1)]
+    assert [response.status_code for response in responses[:-1]] == [200] * burst
+    assert responses[-1].status_code == 429
+    assert responses[-1].headers["retry-after"] == str(round(1 / rate))
+    assert client.get("/super/").status_code == 200
+
+    tokens = {
+        username: create_access_token({"sub": username})
+        for username in ("ironman", "hulk")
+    }
+    for _ in range(settings.rate_limit_burst):
+        client.get("/super/", headers={"Authorization": f"Bearer {tokens['ironman']}"})
+    assert client.get(
+        "/super/", headers={"Authorization": f"Bearer {tokens['ironman']}"}
+    ).status_code == 429
+    assert client.get(
+        "/super/", headers={"Authorization": f"Bearer {tokens['hulk']}"}
+    ).status_code == 200
+
+def test_default_buckets_per_router_and_exempt_paths():
+    """
+    Verifica que las rutas sin presupuesto tengan un bucket por metodo y router,
+    compartido por los ids del path, y que /metrics no se limite
+    """
+    client = build_client()
+
+    for order in range(settings.rate_limit_burst):
+        assert client.get(f"/super/{order}").status_code == 200
+    assert client.get("/super/other").status_code == 429
+    assert client.get("/super/").status_code == 429
+
+    assert client.get("/users/ironman").status_code == 200
+    assert all(client.get("/metrics").status_code == 200 for _ in range(settings.rate_limit_burst + 1))
+
+@pytest.mark.benchmark
+def test_rate_limit_overhead_per_request():
+    """
+    Mide el tiempo que agrega el middleware por request con token
+    """
+    middleware = RateLimitMiddleware(app=None)
+    middleware.default = (1e9, 10**9)
+    token = create_access_token({"sub": "ironman"})
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/super/",
+        "client": ("127.0.0.1", 5000),
+        "headers": [(b"host", b"testserver"), (b"authorization", f"Bearer {token}".encode())]
+    }
+
+    start = time.perf_counter()
+    for _ in range(100_000):
+        middleware.buckets.acquire(("*", middleware.client(scope)), *middleware.default)
+    elapsed = time.perf_counter() - start
+    print(f"rate limit: {elapsed / 100_000 * 1e6:.2f} us per request")
+
+    assert len(middleware.buckets) == 1
@@ -0,0 +1,116 @@
+# Python
+import json
+import os
+import time
+from datetime import date, datetime
+
+# pytest
+import pytest
+
+os.environ.setdefault("JWT_SECRETKEY", "test")
+
+# FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+# models
+from db.models.supermarket_list import SuperList, Products
+from db.models.user import UserDB
+
+# serializers
+from db.serializers.super_list import super_list_serializer
+
+# responses
+from responses import ModelResponse
+
+
+def build_super_lists(lists: int, products: int) -> list[dict]:
+    return [
+        SuperList(
+            username = "ironman",
+            order = f"{order:06}",
+            issue_date = date(2023, 12, 30),
+            supermarket = "Carrefour",
+            url = "https://eticket.com/t",
+            products = [
+                Products(description=f"product {product}", units=product % 5 + 1, price=product * 1.25)
+                for product in range(products)
+            ]
+        ).dict()
+        for order in range(lists)
+    ]
+
+def test_orjson_renders_models_like_the_stdlib():
+    """
+    Verifica que ORJSONResponse serialice fechas igual que jsonable_encoder
+    """
+    user = UserDB(
+        username = "ironman",
+        name = "Anthony",
+        lastname = "Stark",
+        email = "tony@starkindustries.com",
+        birth_date = date(2000, 12, 25),
+        created = datetime(2023, 4, 1, 12, 30, 15, 250)
+    ).dict()
+    super_lists = build_super_lists(2, 3)
+
+    for content in (user, super_lists):
+        assert json.loads(ORJSONResponse(content).body) == json.loads(
+            JSONResponse(jsonable_encoder(content)).body
+        )
+
+@pytest.mark.benchmark
+def test_response_encoding_throughput():
+    """
+    Compara el tiempo de serializar 50 listas de 300 productos con json y con orjson
+    """
+    super_lists = build_super_lists(50, 300)
+
+    timings = {}
+    for name, render in (
+        ("jsonable_encoder + json", lambda: JSONResponse(jsonable_encoder(super_lists)).body),
+        ("jsonable_encoder + orjson", lambda: ORJSONResponse(jsonable_encoder(super_lists)).body),
+        ("orjson", lambda: ORJSONResponse(super_lists).body)
+    ):
+        start = time.perf_counter()
+        for _ in range(5):
+            body = render()
+        timings[name] = (time.perf_counter() - start) / 5
+    print(
+        f"{len(body) / 1024:.0f} KB response: "
+        + ", ".join(f"{name} {elapsed * 1000:.1f} ms" for name, elapsed in timings.items())
+    )
+
+    assert json.loads(body) == jsonable_encoder(super_lists)
+    assert timings["orjson"] < timings["jsonable_encoder + json"]
+
+@pytest.mark.benchmark
+def test_trusted_read_path_cpu_per_request():
+    """
+    Compara el CPU por request de leer una lista de 1000 productos validando
+    con Pydantic y construyendola como documento confiable
+    """
+    document = jsonable_encoder(build_super_lists(1, 1000)[0])
+    document["_id"] = "64b7f3c2e1a2b3c4d5e6f701"
+
+    def validated() -> bytes:
+        # db layer, router .dict() and response_model validation
+        super_list = SuperList(**SuperList(**document).dict())
+        return ORJSONResponse(jsonable_encoder(super_list)).body
+
+    def trusted() -> bytes:
+        return ModelResponse(super_list_serializer(document)).body
+
+    timings = {}
+    for name, render in (("validated", validated), ("trusted", trusted)):
+        start = time.process_time()
+        for _ in range(20):
+            body = render()
+        timings[name] = (time.process_time() - start) / 20
+    print(
+        "1000 products: "
+        + ", ".join(f"{name} {elapsed * 1000:.2f} ms CPU" for name, elapsed in timings.items())
+    )
+
+    assert json.loads(trusted()) == json.loads(validated())
+    assert timings["trusted"] < timings["validated"]
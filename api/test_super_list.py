@@ -0,0 +1,217 @@
+# Python
+import asyncio
+import json
+import threading
+import time
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer
+
+# pytest
+import pytest
+
+# models
+from db.models.supermarket_list import SuperList, Products
+
+# tests
+from test_fetcher import StubTicketHandler
+from test_parsers import build_ticket
+
+
+class TicketHandler(StubTicketHandler):
+    def do_GET(self):
+        status = 404 if self.path.startswith("/missing") else 200
+        body = build_ticket(3).encode() if status == 200 else b""
+
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def insert_super_lists(api, count: int, products: int = 3) -> None:
+    asyncio.run(
+        api.db.insert_superlists([
+            SuperList(
+                username = "ironman",
+                order = f"{order:05}",
+                issue_date = date(2023, 1, 1) + timedelta(days=order),
+                products = [
+                    Products(description=f"product {number}", units=1, price=number + 1)
+                    for number in range(products)
+                ]
+            )
+            for order in range(count)
+        ])
+    )
+
+
+@pytest.fixture(scope="module")
+def ticket_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TicketHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+### BULK IMPORT ###
+
+def test_bulk_import_reports_each_ticket(api, ticket_server):
+    """
+    Verifica que la importacion masiva informe el resultado de cada ticket:
+    insertado, orden repetida, sin url, url invalida, host con error y orden existente
+    """
+    headers = api.create_user()
+    assert api.post(
+        "/super/url",
+        headers = headers,
+        json = {"order": "existing", "issue_date": "2023-12-30", "url": f"{ticket_server}/t?o=0"}
+    ).status_code == 201
+
+    tickets = [
+        {"order": "1", "issue_date": "2023-12-30", "url": f"{ticket_server}/t?o=1"},
+        {"order": "1", "issue_date": "2023-12-30", "url": f"{ticket_server}/t?o=1b"},
+        {"order": "2", "issue_date": "2023-12-30"},
+        {"order": "3", "issue_date": "2023-12-30", "url": "www.eticket.com"},
+        {"order": "4", "issue_date": "2023-12-30", "url": f"{ticket_server}/missing"},
+        {"order": "existing", "issue_date": "2023-12-30", "url": f"{ticket_server}/t?o=5"},
+        {"order": "6", "issue_date": "2023-12-30", "url": f"{ticket_server}/t?o=6"}
+    ]
+    response = api.post("/super/url/bulk", headers=headers, json=tickets)
+
+    assert response.status_code == 200
+    statuses = response.json()
+    assert [status["order"] for status in statuses] == [ticket["order"] for ticket in tickets]
+    assert [status["status"] for status in statuses] == [
+        "inserted", "failed", "failed", "failed", "failed", "failed", "inserted"
+    ]
+    assert statuses[1]["errmsg"] == "Order repeated in the request"
+    assert statuses[2]["errmsg"] == "url not recived"
+    assert statuses[3]["errmsg"].startswith("Invalid ticket url")
+    assert statuses[4]["errmsg"] == "Ticket host answered 404"
+    assert statuses[5]["errmsg"] == "Order exists"
+
+    orders = {
+        super_list["order"]
+        for super_list in api.get("/super/", headers=headers).json()["items"]
+    }
+    assert orders == {"existing", "1", "6"}
+
+def test_bulk_import_limit(api):
+    """
+    Verifica que se rechacen mas tickets que bulk_max_tickets
+    """
+    from config import settings
+
+    headers = api.create_user()
+    tickets = [
+        {"order": str(order), "issue_date": "2023-12-30", "url": "http://eticket.com/t"}
+        for order in range(settings.bulk_max_tickets + 1)
+    ]
+
+    assert api.post("/super/url/bulk", headers=headers, json=tickets).status_code == 400
+
+
+### STREAMING ###
+
+@pytest.mark.parametrize("request_stream", [
+    {"params": {"stream": "true"}},
+    {"headers": {"Accept": "application/x-ndjson"}}
+])
+def test_super_lists_stream_as_ndjson(api, request_stream):
+    """
+    Verifica que con ?stream=true o Accept: application/x-ndjson se reciba todo
+    el historial, una lista por linea y en el mismo orden que las paginas
+    """
+    headers = api.create_user()
+    insert_super_lists(api, 7)
+
+    response = api.get(
+        "/super/",
+        headers = {**headers, **request_stream.get("headers", {})},
+        params = {"fields": "order,issue_date", **request_stream.get("params", {})}
+    )
+    paged = api.get(
+        "/super/", headers=headers, params={"fields": "order,issue_date", "limit": 100}
+    ).json()["items"]
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.text.endswith("\n")
+    assert [json.loads(line) for line in response.text.splitlines()] == paged
+    assert len(paged) == 7
+
+def test_super_lists_stream_is_empty_without_history(api):
+    """
+    Verifica que un usuario sin listas reciba un stream vacio
+    """
+    headers = api.create_user()
+
+    response = api.get("/super/", headers=headers, params={"stream": "true"})
+
+    assert response.status_code == 200
+    assert response.text == ""
+
+@pytest.mark.benchmark
+def test_super_lists_stream_time_to_first_byte(api):
+    """
+    Mide el tiempo hasta el primer byte del stream de 5000 listas de 20 productos
+    y lo compara con el tiempo hasta el final de la respuesta
+    """
+    # main
+    from main import app
+
+    headers = api.create_user()
+    insert_super_lists(api, 5000, products=20)
+
+    async def get() -> tuple[float, float, int]:
+        start = time.perf_counter()
+        first_byte = None
+        size = 0
+        sent = asyncio.Event()
+
+        async def receive() -> dict:
+            # the response listens for the disconnect while it streams
+            await sent.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            nonlocal first_byte, size
+            if message["type"] == "http.response.body":
+                if message.get("body"):
+                    first_byte = first_byte or time.perf_counter() - start
+                    size += len(message["body"])
+                if not message.get("more_body"):
+                    sent.set()
+
+        await app(
+            {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": "/super/",
+                "raw_path": b"/super/",
+                "root_path": "",
+                "query_string": b"stream=true",
+                "headers": [
+                    (b"host", b"testserver"),
+                    (b"authorization", headers["Authorization"].encode())
+                ],
+                "client": ("127.0.0.1", 50000),
+                "server": ("testserver", 80)
+            },
+            receive,
+            send
+        )
+        return first_byte, time.perf_counter() - start, size
+
+    first_byte, total, size = asyncio.run(get())
+    print(
+        f"stream of 5000 lists: first byte {first_byte * 1000:.1f} ms, "
+        f"last byte {total * 1000:.1f} ms, {size / 1024:.0f} KB"
+    )
+
+    assert first_byte < total / 2
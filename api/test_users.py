@@ -0,0 +1,119 @@
+# Python
+import asyncio
+import sys
+import time
+
+# pytest
+import pytest
+
+# httpx
+import httpx
+
+# auth
+from auth import user_cache
+
+# metrics
+from metrics import render_metrics
+
+# models
+from db.models.user import User
+
+
+class SlowDB:
+    """
+    Answers get_user_with_username after a round trip of latency seconds,
+    blocking the event loop like pymongo or awaiting like Motor.
+    """
+
+    def __init__(self, latency: float, blocking: bool) -> None:
+        self.latency = latency
+        self.blocking = blocking
+
+    async def get_user_with_username(self, username: str, full_user: bool = False) -> User:
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+
+        return User(
+            username = username,
+            name = "Anthony",
+            lastname = "Stark",
+            email = "tony@starkindustries.com"
+        )
+
+
+def test_user_cache_is_invalidated_on_update_and_delete(api):
+    """
+    Verifica que actualizar o borrar el usuario invalide el usuario cacheado,
+    y que un usuario borrado se rechace en el siguiente request
+    """
+    headers = api.create_user()
+
+    assert api.get("/login/users/me", headers=headers).json()["name"] == "Anthony"
+    assert user_cache.get("ironman").name == "Anthony"
+
+    assert api.patch("/users/ironman", headers=headers, json=[{"name": "Tony"}]).status_code == 200
+    assert user_cache.get("ironman") is None
+    assert api.get("/login/users/me", headers=headers).json()["name"] == "Tony"
+
+    assert api.delete("/users/ironman", headers=headers).status_code == 200
+    response = api.get("/login/users/me", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"]["errmsg"] == "Inactive user"
+
+def test_user_cache_stats_are_exported(api):
+    """
+    Verifica que los aciertos y fallos del cache de usuarios se publiquen en /metrics
+    """
+    headers = api.create_user()
+    for _ in range(3):
+        api.get("/login/users/me", headers=headers)
+
+    metrics = api.get("/metrics").text
+    stats = user_cache.stats()
+
+    assert f'cache_hits_total{{cache="users"}} {float(stats["hits"])}' in metrics
+    assert f'cache_misses_total{{cache="users"}} {float(stats["misses"])}' in metrics
+    assert 'cache_entries{cache="users"} 1.0' in metrics
+    assert render_metrics()[0].count(b'cache="users"') == 3
+
+@pytest.mark.benchmark
+def test_concurrent_request_throughput_blocking_and_async_db(api, monkeypatch):
+    """
+    Compara requests por segundo con 20 clientes concurrentes y una base con 50 ms
+    de latencia, cuando el cliente de la base bloquea el loop y cuando lo espera
+    """
+    # main
+    from main import app
+
+    clients, latency = 20, 0.05
+
+    async def run() -> float:
+        async with httpx.AsyncClient(app=app, base_url="http://testserver") as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(
+                *[client.get(f"/users/user{number}") for number in range(clients)]
+            )
+            elapsed = time.perf_counter() - start
+        assert all(response.status_code == 200 for response in responses)
+
+        return clients / elapsed
+
+    throughput = {}
+    current = api.db
+    for name, blocking in (("blocking", True), ("async", False)):
+        db = SlowDB(latency, blocking)
+        for module in list(sys.modules.values()):
+            if getattr(module, "db_client", None) is current:
+                monkeypatch.setattr(module, "db_client", db)
+        current = db
+        # fresh rate limit buckets for each run
+        app.middleware_stack = None
+        throughput[name] = asyncio.run(run())
+    print(
+        f"{clients} concurrent requests, {latency * 1000:.0f} ms db: "
+        + ", ".join(f"{name} {rate:.0f} requests/s" for name, rate in throughput.items())
+    )
+
+    assert throughput["async"] > 5 * throughput["blocking"]